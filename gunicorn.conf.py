@@ -0,0 +1,40 @@
+# gunicorn settings, loaded automatically when gunicorn starts from the project root
+# migrations run once in the master (prestart) before any worker is forked, so workers boot
+# without touching the schema and each worker logs how long it took to become ready
+
+import os
+import time
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+wsgi_app = 'socialhubapi.wsgi:application'
+
+
+def on_starting(server):
+    # prestart loads the settings here in the master, before socialhubapi.asgi could flag the
+    # gateway, and the workers inherit them: flag it first so uvicorn workers get no persistent
+    # connections (see DB_CONN_MODE in settings.py)
+    if 'uvicorn' in server.cfg.worker_class_str.lower():
+        os.environ.setdefault('SERVER_GATEWAY', 'asgi')
+    # set RUN_PRESTART=false when migrations run in a separate release step
+    if os.environ.get('RUN_PRESTART', 'true').lower() != 'true':
+        return
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialhubapi.settings')
+    import django
+    from django.core.management import call_command
+    from django.db import connections
+
+    django.setup()
+    call_command('prestart')
+    # never hand a master connection down to forked workers
+    connections.close_all()
+
+
+def pre_fork(server, worker):
+    worker.boot_started = time.monotonic()
+
+
+def post_worker_init(worker):
+    elapsed = (time.monotonic() - worker.boot_started) * 1000
+    worker.log.info('worker %s booted in %.0f ms', worker.pid, elapsed)
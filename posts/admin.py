@@ -1,15 +1,15 @@
 from django.contrib import admin
-from .models import Post, Like, Comment, Share
+from .models import Post, Like, Comment, Share, TimelineEntry
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     """Admin interface for Post model."""
     
-    list_display = ['id', 'user', 'title', 'post_type', 'created_datetime']
+    list_display = ['id', 'user', 'title', 'post_type', 'likes_count', 'comments_count', 'shares_count', 'created_datetime']
     list_filter = ['created_datetime', 'post_type', 'user']
     search_fields = ['user__username', 'title', 'content']
-    readonly_fields = ['id', 'created_datetime']
+    readonly_fields = ['id', 'created_datetime', 'likes_count', 'comments_count', 'shares_count']
     ordering = ['-created_datetime']
     
     fieldsets = (
@@ -20,6 +20,10 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('original_post', 'share_comment'),
             'classes': ('collapse',)
         }),
+        ('Engagement', {
+            'fields': ('likes_count', 'comments_count', 'shares_count'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_datetime',),
             'classes': ('collapse',)
@@ -51,4 +55,14 @@ class ShareAdmin(admin.ModelAdmin):
     
     list_display = ['id', 'user', 'post', 'created_datetime']
     list_filter = ['created_datetime', 'user']
-    search_fields = ['user__username', 'post__title']
\ No newline at end of file
+    search_fields = ['user__username', 'post__title']
+
+
+@admin.register(TimelineEntry)
+class TimelineEntryAdmin(admin.ModelAdmin):
+    """Admin interface for TimelineEntry model."""
+    
+    list_display = ['id', 'user', 'post', 'created_datetime']
+    list_filter = ['created_datetime']
+    search_fields = ['user__username', 'post__title']
+    raw_id_fields = ['user', 'post']
\ No newline at end of file
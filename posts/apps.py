@@ -1,7 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'posts'
-    verbose_name = 'Posts'
\ No newline at end of file
+    verbose_name = 'Posts'
+
+    def ready(self):
+        # register counter maintenance and timeline fan-out signal handlers
+        from . import signals  # noqa: F401
+        post_migrate.connect(restore_search_triggers, sender=self)
+
+
+def restore_search_triggers(using='default', **kwargs):
+    # sqlite drops triggers when a migration rebuilds a table, put the search index triggers back
+    from socialhubapi.search import repair_sqlite_triggers
+    repair_sqlite_triggers(using)
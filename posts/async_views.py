@@ -0,0 +1,43 @@
+from django.shortcuts import aget_object_or_404
+
+from socialhubapi.async_views import async_read_view, json_response
+from socialhubapi.pagination import KeysetPaginator
+from socialhubapi.viewer import aviewer_context
+
+from . import originals
+from .models import Post
+from .serializers import PostSerializer
+from .views import POST_ORDERING
+
+
+# native async versions of the hot post read endpoints, served under /careers/async/
+# same parameters and response bodies as post_list and post_detail in views.py
+
+def _posts():
+    # with originals.aattach, everything PostSerializer reads, so serializing never touches the database
+    return Post.objects.feed()
+
+
+@async_read_view
+async def post_list(request):
+    # get /careers/async/ - list posts, newest first
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
+    paginator = KeysetPaginator(request, ordering=POST_ORDERING)
+    posts = await paginator.apaginate_queryset(_posts())
+    await originals.aattach(posts)
+    serializer = PostSerializer(posts, many=True, context=await aviewer_context(request, posts=posts))
+    return json_response(paginator.get_response_data(
+        'posts', serializer.data, 'Posts retrieved successfully', 'All posts retrieved successfully'
+    ))
+
+
+@async_read_view
+async def post_detail(request, pk):
+    # get /careers/async/{id}/ - retrieve post
+    post = await aget_object_or_404(_posts(), pk=pk)
+    await originals.aattach([post])
+    serializer = PostSerializer(post, context=await aviewer_context(request, posts=[post]))
+    return json_response({
+        'message': 'Post retrieved successfully',
+        'data': serializer.data
+    })
@@ -0,0 +1,128 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from users import stats as profile_stats
+
+from .models import Post, Like, Comment, Share
+
+
+# maps each interaction model to the post counter it maintains
+COUNTER_SOURCES = {
+    Like: 'likes_count',
+    Comment: 'comments_count',
+    Share: 'shares_count',
+}
+
+
+_pending = threading.local()
+
+
+@contextmanager
+def batched():
+    # collect counter changes made inside the block (signals included) and apply them on exit,
+    # one UPDATE per distinct delta instead of one per interaction row
+    if getattr(_pending, 'deltas', None) is not None:
+        yield
+        return
+    _pending.deltas = {}
+    try:
+        yield
+        deltas, _pending.deltas = _pending.deltas, None
+        for field, changes in deltas.items():
+            adjust_counters(field, changes)
+    finally:
+        _pending.deltas = None
+
+
+def adjust_counter(post_id, field, delta):
+    # apply a relative change to one counter in a single UPDATE, never going below zero
+    if not post_id or not delta:
+        return
+    deltas = getattr(_pending, 'deltas', None)
+    if deltas is not None:
+        changes = deltas.setdefault(field, {})
+        changes[post_id] = changes.get(post_id, 0) + delta
+        return
+    queryset = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def adjust_counters(field, deltas, model=Post):
+    # apply a {pk: delta} mapping, grouping rows that share the same delta into one UPDATE
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(pk)
+    for delta, pks in by_delta.items():
+        queryset = model.objects.filter(pk__in=pks)
+        if delta < 0:
+            queryset = queryset.filter(**{f'{field}__gte': -delta})
+        queryset.update(**{field: F(field) + delta})
+
+
+def _count_subquery(model):
+    # correlated COUNT(*) of interaction rows for the outer post
+    rows = (
+        model.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def recount(model, post_ids):
+    # set the counter of these posts to their number of interaction rows in one UPDATE; for bulk
+    # inserts with ignore_conflicts, which cannot tell the rows written from the duplicates skipped
+    if post_ids:
+        Post.objects.filter(pk__in=post_ids).update(**{COUNTER_SOURCES[model]: _count_subquery(model)})
+
+
+def with_actual_counts(queryset):
+    # annotate actual_<counter> for every stored counter so drift can be detected in the database
+    return queryset.annotate(**{
+        f'actual_{field}': _count_subquery(model)
+        for model, field in COUNTER_SOURCES.items()
+    })
+
+
+def drifted_posts(queryset=None):
+    # posts whose stored counters no longer match the interaction tables
+    queryset = with_actual_counts(queryset if queryset is not None else Post.objects.all())
+    drift = Q()
+    for field in COUNTER_SOURCES.values():
+        drift |= ~Q(**{field: F(f'actual_{field}')})
+    return queryset.filter(drift)
+
+
+def repair_counters(queryset=None, batch_size=1000, dry_run=False):
+    # recompute drifted counters in pk-ordered batches and return the number of posts that were out of sync
+    fields = list(COUNTER_SOURCES.values())
+    rows = drifted_posts(queryset).order_by('pk').values('pk', *[f'actual_{field}' for field in fields])
+
+    repaired = 0
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1]['pk']
+        repaired += len(batch)
+        if dry_run:
+            continue
+        posts = []
+        for row in batch:
+            post = Post(pk=row['pk'])
+            for field in fields:
+                setattr(post, field, row[f'actual_{field}'])
+            posts.append(post)
+        Post.objects.bulk_update(posts, fields)
+        # repaired counters feed likes_received / comments_received
+        profile_stats.invalidate_post_authors([post.pk for post in posts])
+    return repaired
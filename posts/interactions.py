@@ -0,0 +1,80 @@
+from django.db import transaction
+
+from socialhubapi import response_cache
+from users import stats as profile_stats
+
+from . import counters
+from .models import Post, Like, Share
+
+
+# set-based likes and shares for the bulk interaction endpoint
+# operations are replayed in order against an in-memory copy of the user's current state, so
+# "like, unlike, like" on the same post resolves to one insert; only the net difference is
+# written, with one bulk insert and one delete per model
+
+MAX_OPERATIONS = 500
+
+ACTIONS = {
+    # action: (model, desired state, result when applied, result when already in that state)
+    'like': (Like, True, 'liked', 'already_liked'),
+    'unlike': (Like, False, 'unliked', 'not_liked'),
+    'share': (Share, True, 'shared', 'already_shared'),
+    'unshare': (Share, False, 'unshared', 'not_shared'),
+}
+
+
+def apply_operations(user, operations):
+    # operations: validated [{'post_id': int, 'action': str}], returns one result dict per operation
+    post_ids = {operation['post_id'] for operation in operations}
+    existing_posts = set(Post.objects.filter(pk__in=post_ids).values_list('pk', flat=True))
+
+    current = {
+        model: set(model.objects.filter(user=user, post_id__in=existing_posts).values_list('post_id', flat=True))
+        for model in (Like, Share)
+    }
+    desired = {model: set(rows) for model, rows in current.items()}
+
+    results = []
+    for operation in operations:
+        post_id, action = operation['post_id'], operation['action']
+        model, wanted, applied, unchanged = ACTIONS[action]
+        if post_id not in existing_posts:
+            results.append({'post_id': post_id, 'action': action, 'status': 'post_not_found'})
+            continue
+        state = desired[model]
+        if (post_id in state) == wanted:
+            results.append({'post_id': post_id, 'action': action, 'status': unchanged})
+            continue
+        if wanted:
+            state.add(post_id)
+        else:
+            state.discard(post_id)
+        results.append({'post_id': post_id, 'action': action, 'status': applied})
+
+    with transaction.atomic(), counters.batched():
+        for model in (Like, Share):
+            created = desired[model] - current[model]
+            removed = current[model] - desired[model]
+            if created:
+                # a concurrent request may insert the same row first; ignore_conflicts keeps the batch
+                # going, so the counters are recounted from the rows rather than incremented
+                model.objects.bulk_create(
+                    [model(user=user, post_id=post_id) for post_id in created],
+                    ignore_conflicts=True,
+                )
+                # bulk_create sends no post_save, so update counters and caches here
+                counters.recount(model, created)
+                response_cache.invalidate('posts', *[f'post:{post_id}' for post_id in created])
+                if model is Like:
+                    profile_stats.invalidate_post_authors(created)
+                if model is Like and response_cache.tracks_versions():
+                    response_cache.invalidate(*[
+                        f'user-stats:{username}'
+                        for username in Post.objects.filter(pk__in=created).values_list('user__username', flat=True)
+                        if username
+                    ])
+            if removed:
+                # post_delete still fires per row; counters.batched() folds those into grouped UPDATEs
+                model.objects.filter(user=user, post_id__in=removed).delete()
+
+    return results
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from socialhubapi.benchmark import measure_connection_reuse
+
+
+class Command(BaseCommand):
+    help = 'Compare per-request connection cost with and without persistent database connections (read-only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--max-age', type=int, default=600, help='CONN_MAX_AGE used for the persistent run')
+        parser.add_argument('--url', default=None, help='Path to request (default: first page of the post list)')
+
+    def handle(self, *args, **options):
+        url = options['url'] or reverse('post-list') + '?page_size=1'
+
+        # runs against the configured database (real connect cost, TLS included) and only reads
+        setup_test_environment(debug=False)
+        try:
+            with override_settings(RESPONSE_CACHE_ENABLED=False):
+                results = measure_connection_reuse(url, requests=options['requests'], max_age=options['max_age'])
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f'{connection.vendor} - {url}')
+        self.stdout.write(f"{'mode':<12} {'connections':>11} {'connect ms/req':>15} {'p50 ms':>9} {'p95 ms':>9}")
+        for mode, metrics in results.items():
+            self.stdout.write(
+                f"{mode:<12} {metrics['connections']:>11} {metrics['connect_ms_per_request']:>15.3f} "
+                f"{metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f}"
+            )
+        saved = results['none']['connect_ms_per_request'] - results['persistent']['connect_ms_per_request']
+        self.stdout.write(self.style.SUCCESS(f'persistent connections save {saved:.3f} ms of connect time per request'))
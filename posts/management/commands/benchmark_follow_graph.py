@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from socialhubapi.benchmark import measure_follow_graph
+
+
+class Command(BaseCommand):
+    help = 'Memory and suggestion latency of the in-memory follow graph (users.graph) on synthetic follows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000, help='User ids in the graph')
+        parser.add_argument('--edges', type=int, default=10_000_000, help='Synthetic follows (duplicates are dropped)')
+        parser.add_argument('--heavy-follows', type=int, default=20000, help='Accounts followed by the user timed first')
+        parser.add_argument('--repeats', type=int, default=50, help='Suggestion requests timed per user group')
+
+    def handle(self, *args, **options):
+        result = measure_follow_graph(
+            users=options['users'], edges=options['edges'], heavy_follows=options['heavy_follows'], repeats=options['repeats'],
+        )
+        self.stdout.write(
+            f"{result['edges']} follows between {result['users']} user ids: {result['graph_mb']} MB of arrays "
+            f"(peak {result['build_peak_mb']} MB while building), built in {result['build_s']:.2f} s"
+        )
+        self.stdout.write(
+            f"suggestions, user following {result['heavy_follows']}: p50 {result['heavy_p50_ms']} ms, p95 {result['heavy_p95_ms']} ms"
+        )
+        self.stdout.write(
+            f"suggestions, random users:{' ' * 10}p50 {result['typical_p50_ms']} ms, p95 {result['typical_p95_ms']} ms"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['updates']} incremental follows at {result['update_us']} us each, folded into the arrays in {result['compact_s']:.2f} s"
+        ))
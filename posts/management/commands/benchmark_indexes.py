@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from socialhubapi.benchmark import INDEX_DATASET, compare_index_plans, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seed a large throwaway database and capture EXPLAIN plans of the hot queries without and with the composite indexes'
+
+    def add_arguments(self, parser):
+        for name, default in INDEX_DATASET.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f'Synthetic {name} to seed (default {default})')
+        parser.add_argument('--repeats', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--output', default='index_plans.json', help='Where to write the JSON results')
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in INDEX_DATASET}
+
+        # seeds about a million rows, so run against a throwaway test database
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.stdout.write(f"seeding {sum(dataset.values())} rows on {connection.vendor}...")
+            context = seed_dataset(batch_size=5000, **dataset)
+            queries = compare_index_plans(context, repeats=options['repeats'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {'vendor': connection.vendor, 'dataset': dataset, 'queries': queries}
+        Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+        for name, plans in queries.items():
+            before, after = plans['before'], plans['after']
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{name}: {before['p50_ms']:.2f} ms -> {after['p50_ms']:.2f} ms"
+            ))
+            self.stdout.write('  without indexes:')
+            for line in before['plan'].splitlines():
+                self.stdout.write(f'    {line}')
+            self.stdout.write('  with indexes:')
+            for line in after['plan'].splitlines():
+                self.stdout.write(f'    {line}')
+        self.stdout.write(f"results written to {options['output']}")
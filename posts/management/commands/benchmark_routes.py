@@ -0,0 +1,71 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from socialhubapi.benchmark import DEFAULT_DATASET, RouteFailed, compare_results, run_route_benchmarks, seed_dataset
+
+
+class Command(BaseCommand):
+    help = 'Seed a throwaway database, measure query counts, latency and peak memory per route and compare with a baseline'
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_DATASET.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f'Synthetic {name} to seed (default {default})')
+        parser.add_argument('--repeats', type=int, default=20, help='Timed requests per route')
+        parser.add_argument('--route', action='append', dest='routes', help='Only run this route (repeatable)')
+        parser.add_argument('--output', default='benchmark_results.json', help='Where to write the JSON results')
+        parser.add_argument('--baseline', default=str(settings.BASE_DIR / 'benchmarks' / 'routes_baseline.json'))
+        parser.add_argument('--update-baseline', action='store_true', help='Overwrite the baseline with this run')
+        parser.add_argument('--query-slack', type=int, default=0, help='Extra queries tolerated per route')
+        parser.add_argument('--latency-factor', type=float, default=None, help='Fail when p95 exceeds baseline p95 times this factor')
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in DEFAULT_DATASET}
+
+        # never touch the configured database: seed a fresh test database and drop it afterwards
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # fan out inline so timeline writes are counted against the request that caused them,
+            # and measure the views themselves rather than response cache hits or 304s
+            with override_settings(TIMELINE_FANOUT_MODE='sync', RESPONSE_CACHE_ENABLED=False, CONDITIONAL_REQUESTS_ENABLED=False):
+                context = seed_dataset(**dataset)
+                routes = run_route_benchmarks(context, repeats=options['repeats'], only=options['routes'])
+        except RouteFailed as error:
+            raise CommandError(str(error))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {'vendor': connection.vendor, 'dataset': dataset, 'routes': routes}
+        Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+
+        self.stdout.write(f"{'route':<24} {'status':>6} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'peak kb':>9}")
+        for name, metrics in routes.items():
+            self.stdout.write(
+                f"{name:<24} {metrics['status']:>6} {metrics['queries']:>7} "
+                f"{metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} {metrics['peak_kb']:>9.1f}"
+            )
+        self.stdout.write(f"results written to {options['output']}")
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'baseline updated at {baseline_path}'))
+            return
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'no baseline at {baseline_path}, nothing to compare'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get('dataset') != dataset:
+            self.stdout.write(self.style.WARNING('dataset differs from the baseline, latency comparison is only indicative'))
+        regressions = compare_results(results, baseline, options['query_slack'], options['latency_factor'])
+        if regressions:
+            raise CommandError('performance regressions against baseline:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('no regressions against baseline'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from socialhubapi.benchmark import measure_share_storage
+
+
+class Command(BaseCommand):
+    help = 'Measure the text stored by shares of one viral post with copied content versus references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shares', type=int, default=1000, help='Times the viral post is shared')
+        parser.add_argument('--content-chars', type=int, default=4000, help='Length of the viral post content')
+
+    def handle(self, *args, **options):
+        # seeds its own rows, so run against a throwaway test database
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = measure_share_storage(shares=options['shares'], content_chars=options['content_chars'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{connection.vendor} - {results['shares']} shares of a {results['content_chars']}-character post")
+        self.stdout.write(f"copied content:  {results['chars_before']:>12} characters")
+        self.stdout.write(f"references only: {results['chars_after']:>12} characters")
+        self.stdout.write(self.style.SUCCESS(
+            f"compacted {results['compacted_rows']} rows, saved {results['chars_saved']} characters ({results['saved_ratio']:.1%})"
+        ))
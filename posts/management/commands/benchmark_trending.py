@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from socialhubapi.benchmark import measure_trending_refresh, measure_trending_scoring
+
+
+class Command(BaseCommand):
+    help = 'Time the trending job: numpy scoring of synthetic interactions versus a per-row loop, then a full refresh on a seeded database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interactions', type=int, default=10_000_000, help='Synthetic interactions scored in memory')
+        parser.add_argument('--python-sample', type=int, default=1_000_000, help='Interactions scored by the per-row python loop')
+        parser.add_argument('--db-interactions', type=int, default=1_000_000, help='Comments seeded for the end-to-end refresh (0 skips it)')
+
+    def handle(self, *args, **options):
+        scoring = measure_trending_scoring(interactions=options['interactions'], python_sample=options['python_sample'])
+        self.stdout.write(f"scoring {scoring['interactions']} interactions")
+        self.stdout.write(f"numpy:         {scoring['numpy_s']:>8.2f} s {scoring['numpy_per_s']:>12} interactions/s")
+        self.stdout.write(
+            f"python loop:   {scoring['python_s']:>8.2f} s {scoring['python_per_s']:>12} interactions/s "
+            f"({scoring['python_sample']} sampled)"
+        )
+        self.stdout.write(f"speedup {scoring['speedup']}x, same top posts: {scoring['same_top_posts']}")
+
+        if not options['db_interactions']:
+            return
+        # seeds its own rows, so run against a throwaway test database
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            refresh = measure_trending_refresh(interactions=options['db_interactions'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.stdout.write(self.style.SUCCESS(
+            f"{connection.vendor} refresh over {refresh['interactions']} interactions: {refresh['refresh_s']:.2f} s "
+            f"({refresh['interactions_per_s']} interactions/s), {refresh['ranked']} posts ranked"
+        ))
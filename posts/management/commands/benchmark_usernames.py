@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from socialhubapi.benchmark import measure_username_resolution
+
+
+class Command(BaseCommand):
+    help = 'Compare username-only authentication through get_or_create and through the cached resolver'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--distinct', type=int, default=1000, help='Distinct usernames')
+        parser.add_argument('--requests', type=int, default=10000, help='Authenticated requests per mode')
+
+    def handle(self, *args, **options):
+        if not settings.USERNAME_CACHE_TIMEOUT:
+            self.stdout.write(self.style.WARNING(
+                'USERNAME_CACHE_TIMEOUT is 0 (the default with a process-local default cache), '
+                'the resolver reads the database on every request'
+            ))
+        # creates and deletes users, so run against a throwaway test database
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = measure_username_resolution(distinct=options['distinct'], requests=options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{connection.vendor} - {options['requests']} requests over {options['distinct']} usernames")
+        self.stdout.write(f"{'mode':<14} {'queries':>8} {'queries/req':>12} {'req/s':>10} {'users':>7}")
+        for mode, metrics in results.items():
+            self.stdout.write(
+                f"{mode:<14} {metrics['queries']:>8} {metrics['queries_per_request']:>12.3f} "
+                f"{metrics['requests_per_s']:>10.1f} {metrics['users']:>7}"
+            )
+        speedup = results['resolver']['requests_per_s'] / results['get_or_create']['requests_per_s']
+        self.stdout.write(self.style.SUCCESS(f'resolver handles {speedup:.1f}x the requests per second'))
@@ -0,0 +1,36 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from socialhubapi.transfer import FORMATS, TABLES, export_table
+
+
+class Command(BaseCommand):
+    help = 'Stream users, posts, likes, comments, shares and follows to NDJSON or CSV files, one per table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory to write <table>.<format> files into')
+        parser.add_argument('--format', choices=FORMATS, default='ndjson', help='File format (default ndjson)')
+        parser.add_argument('--table', action='append', dest='tables', choices=list(TABLES), help='Only export this table (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'])
+        directory.mkdir(parents=True, exist_ok=True)
+        fmt = options['format']
+
+        total, elapsed = 0, 0.0
+        for name in TABLES:
+            if options['tables'] and name not in options['tables']:
+                continue
+            path = directory / f'{name}.{fmt}'
+            started = time.perf_counter()
+            with path.open('w', encoding='utf-8', newline='') as stream:
+                count = export_table(name, stream, fmt=fmt, chunk_size=options['chunk_size'])
+            seconds = time.perf_counter() - started
+            total, elapsed = total + count, elapsed + seconds
+            self.stdout.write(f'{name:<10} {count:>10} rows {seconds:>8.2f} s {count / seconds if seconds else 0:>12.0f} rows/s  -> {path}')
+        self.stdout.write(self.style.SUCCESS(
+            f'exported {total} rows in {elapsed:.2f} s ({total / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
@@ -0,0 +1,66 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.counters import repair_counters
+from posts.models import Comment
+from posts.threads import rebuild_paths, repair_reply_counts
+from socialhubapi.transfer import FORMATS, TABLES, import_table
+
+
+class Command(BaseCommand):
+    help = 'Load users, posts, likes, comments, shares and follows from the NDJSON or CSV files written by export_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory holding <table>.ndjson or <table>.csv files')
+        parser.add_argument('--table', action='append', dest='tables', choices=list(TABLES), help='Only import this table (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk INSERT')
+        parser.add_argument('--skip-counters', action='store_true', help='Do not repair post and reply counters afterwards')
+
+    def _find(self, directory, name):
+        for fmt in FORMATS:
+            path = directory / f'{name}.{fmt}'
+            if path.exists():
+                return path, fmt
+        return None, None
+
+    def handle(self, *args, **options):
+        directory = Path(options['directory'])
+        if not directory.is_dir():
+            raise CommandError(f'{directory} is not a directory')
+
+        imported = []
+        total, elapsed = 0, 0.0
+        # tables load in dependency order, so references resolve against rows imported just before
+        for name in TABLES:
+            if options['tables'] and name not in options['tables']:
+                continue
+            path, fmt = self._find(directory, name)
+            if path is None:
+                if options['tables']:
+                    raise CommandError(f'no {name}.ndjson or {name}.csv in {directory}')
+                continue
+            started = time.perf_counter()
+            with path.open(encoding='utf-8', newline='') as stream:
+                counts = import_table(name, stream, fmt=fmt, batch_size=options['batch_size'])
+            seconds = time.perf_counter() - started
+            total, elapsed = total + counts['rows'], elapsed + seconds
+            imported.append(name)
+            self.stdout.write(
+                f"{name:<10} {counts['rows']:>10} rows {seconds:>8.2f} s "
+                f"{counts['rows'] / seconds if seconds else 0:>12.0f} rows/s  ({counts['existing']} existing, {counts['skipped']} skipped, {counts['invalid']} invalid)"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'imported {total} rows in {elapsed:.2f} s ({total / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
+
+        # bulk inserts skip the signals that maintain threads, counters, timelines and caches
+        if 'comments' in imported:
+            self.stdout.write(f'placed {rebuild_paths(Comment)} comments in their threads')
+            if not options['skip_counters']:
+                repair_reply_counts(Comment)
+        if not options['skip_counters'] and set(imported) & {'posts', 'likes', 'comments', 'shares'}:
+            self.stdout.write(f'repaired counters on {repair_counters()} posts')
+        if set(imported) & {'posts', 'follows'}:
+            self.stdout.write(self.style.WARNING('run rebuild_timelines to materialize home timelines for the imported rows'))
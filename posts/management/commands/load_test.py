@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from socialhubapi.benchmark import run_load_test
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of running servers, e.g. the WSGI and ASGI deployments side by side'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls', required=True, help='Full URL to load (repeatable)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent keep-alive clients')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per URL')
+        parser.add_argument('--token', default=None, help='Send Authorization: Bearer <token>')
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f"Bearer {options['token']}"} if options['token'] else None
+        results = {}
+        for url in options['urls']:
+            self.stdout.write(f"loading {url} with {options['concurrency']} clients for {options['duration']}s")
+            results[url] = run_load_test(url, options['concurrency'], options['duration'], headers)
+
+        self.stdout.write(f"{'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}  url")
+        for url, metrics in results.items():
+            self.stdout.write(
+                f"{metrics['requests']:>9} {metrics['errors']:>7} {metrics['throughput_rps']:>9.1f} "
+                f"{metrics['p50_ms'] or 0:>9.2f} {metrics['p95_ms'] or 0:>9.2f}  {url}"
+            )
+        if not any(metrics['requests'] for metrics in results.values()):
+            raise CommandError('no successful requests, is the server running?')
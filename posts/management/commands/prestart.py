@@ -0,0 +1,77 @@
+import time
+import zlib
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+# one advisory lock id shared by every instance of the app
+MIGRATION_LOCK_ID = zlib.crc32(b'socialhubapi.prestart.migrate')
+
+
+class Command(BaseCommand):
+    help = 'Apply pending migrations once, under a database lock, before the web workers start'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--lock-timeout', type=float, default=300, help='Seconds to wait for another instance to finish migrating')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        connection = connections[options['database']]
+
+        if not self.pending_migrations(connection):
+            self.create_cache_tables(options)
+            self.stdout.write(f'no pending migrations ({self.elapsed(started)})')
+            return
+
+        with self.migration_lock(connection, options['lock_timeout']):
+            # another instance may have applied the plan while this one waited
+            pending = self.pending_migrations(connection)
+            if pending:
+                self.stdout.write(f'applying {len(pending)} migrations')
+                call_command('migrate', database=options['database'], interactive=False, verbosity=options['verbosity'])
+            self.create_cache_tables(options)
+        self.stdout.write(self.style.SUCCESS(f'database ready ({self.elapsed(started)})'))
+
+    def create_cache_tables(self, options):
+        # tables of the database cache backends (the shared throttle buckets); existing ones are kept
+        call_command('createcachetable', database=options['database'], verbosity=options['verbosity'])
+
+    def pending_migrations(self, connection):
+        executor = MigrationExecutor(connection)
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    def elapsed(self, started):
+        return f'{(time.perf_counter() - started) * 1000:.0f} ms'
+
+    def migration_lock(self, connection, timeout):
+        return _AdvisoryLock(connection, timeout)
+
+
+class _AdvisoryLock:
+    # session-level postgres advisory lock; other databases run a single instance and need none
+
+    def __init__(self, connection, timeout):
+        self.connection = connection
+        self.timeout = timeout
+
+    def __enter__(self):
+        if self.connection.vendor != 'postgresql':
+            return self
+        deadline = time.monotonic() + self.timeout
+        with self.connection.cursor() as cursor:
+            while True:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [MIGRATION_LOCK_ID])
+                if cursor.fetchone()[0]:
+                    return self
+                if time.monotonic() >= deadline:
+                    raise CommandError(f'timed out after {self.timeout}s waiting for another instance to finish migrating')
+                time.sleep(1)
+
+    def __exit__(self, *exc_info):
+        if self.connection.vendor == 'postgresql':
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID])
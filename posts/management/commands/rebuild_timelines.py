@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized home timelines from posts and follows (initial build or repair)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', action='append', dest='usernames', help='Only rebuild these users (repeatable)')
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+
+        rebuilt = 0
+        for user_id in users.values_list('pk', flat=True).iterator():
+            timeline.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'rebuilt {rebuilt} timelines'))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the trending posts ranking from recent likes, comments and shares (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=trending.CHUNK_SIZE, help='Interactions fetched and scored per batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ranked = trending.refresh(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'ranked {ranked} trending posts in {time.perf_counter() - started:.2f} s'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import drifted_posts, repair_counters
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recompute likes_count, comments_count and shares_count and repair posts whose counters drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Posts updated per bulk UPDATE')
+        parser.add_argument('--post-id', type=int, action='append', dest='post_ids', help='Only check these posts (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted posts without writing')
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        if options['post_ids']:
+            queryset = queryset.filter(pk__in=options['post_ids'])
+
+        if options['verbosity'] > 1:
+            for row in drifted_posts(queryset).order_by('pk').values(
+                'pk', 'likes_count', 'actual_likes_count', 'comments_count',
+                'actual_comments_count', 'shares_count', 'actual_shares_count',
+            ):
+                self.stdout.write(
+                    f"post {row['pk']}: likes {row['likes_count']}->{row['actual_likes_count']}, "
+                    f"comments {row['comments_count']}->{row['actual_comments_count']}, "
+                    f"shares {row['shares_count']}->{row['actual_shares_count']}"
+                )
+
+        repaired = repair_counters(queryset, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write(f'{repaired} posts have drifted counters (dry run, nothing written)')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'repaired counters on {repaired} posts'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from socialhubapi import response_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counters of the anonymous response cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        counts = response_cache.stats()
+        self.stdout.write(f"hits {counts['hits']}  misses {counts['misses']}  hit ratio {counts['hit_ratio']:.2%}")
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('counters reset'))
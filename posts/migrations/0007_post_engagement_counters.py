@@ -0,0 +1,42 @@
+# Generated by Django 5.0.8 on 2026-10-17 03:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    # populate the new counters from the interaction tables in one UPDATE
+    Post = apps.get_model('posts', 'Post')
+    updates = {}
+    for model_name, field in (('Like', 'likes_count'), ('Comment', 'comments_count'), ('Share', 'shares_count')):
+        model = apps.get_model('posts', model_name)
+        rows = model.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(total=Count('pk')).values('total')
+        updates[field] = Coalesce(Subquery(rows), Value(0))
+    Post.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_alter_comment_content_alter_post_content_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of comments'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of likes'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='shares_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of shares'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.8 on 2026-10-17 09:12
+
+from django.db import migrations
+
+from socialhubapi import search
+
+
+# columns frozen here so later changes to search.INDEXED_FIELDS need their own migration
+POST_FIELDS = (('title', 'A'), ('content', 'B'))
+COMMENT_FIELDS = (('content', 'A'),)
+
+
+def create_indexes(apps, schema_editor):
+    search.create_index(schema_editor, 'posts_post', POST_FIELDS)
+    search.create_index(schema_editor, 'posts_comment', COMMENT_FIELDS)
+
+
+def drop_indexes(apps, schema_editor):
+    search.drop_index(schema_editor, 'posts_post', POST_FIELDS)
+    search.drop_index(schema_editor, 'posts_comment', COMMENT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.8 on 2026-10-17 10:05
+
+from django.db import migrations
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+
+# frozen copies of posts.originals.compact_shared_posts / expand_shared_posts as of this migration,
+# so later changes to those helpers do not change what it does
+
+
+def compact(apps, schema_editor):
+    # drop the copied title and content from shared posts that reference their original
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.filter(post_type='shared', original_post__isnull=False).exclude(title='', content='').update(title='', content='')
+
+
+def expand(apps, schema_editor):
+    # copy title and content back from the originals
+    Post = apps.get_model('posts', 'Post')
+    originals = Post.objects.filter(pk=OuterRef('original_post_id'))
+    Post.objects.filter(post_type='shared', original_post__isnull=False, content='').update(
+        title=Concat(Value('Shared: '), Subquery(originals.values('title')), output_field=CharField()),
+        content=Subquery(originals.values('content')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact, expand),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.8 on 2026-10-17 05:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_query_pattern_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.post')),
+                ('rank', models.PositiveIntegerField(help_text='Position in the ranking, 1 is the hottest post', unique=True)),
+                ('score', models.FloatField(help_text='Time-decayed engagement score')),
+                ('computed_at', models.DateTimeField(help_text='When the ranking was computed')),
+            ],
+            options={
+                'verbose_name': 'Trending post',
+                'verbose_name_plural': 'Trending posts',
+                'ordering': ['rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.8 on 2026-10-17 05:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, LPad
+
+
+# frozen from posts.threads as of this migration, so later changes there do not change what it does
+SEGMENT_WIDTH = 10
+
+
+def place_comments(apps, schema_editor):
+    # existing comments have no parent yet: each one becomes a thread root whose path is its own id
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.filter(path='').update(
+        path=LPad(Cast('pk', output_field=CharField()), SEGMENT_WIDTH, Value('0')),
+        depth=0,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_trendingpost'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['path'], 'verbose_name': 'Comment', 'verbose_name_plural': 'Comments'},
+        ),
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_post_oldest_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Number of ancestors'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, help_text='Comment this one replies to', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, help_text='Ids from the thread root down to this comment', max_length=210),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='replies_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of direct replies'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(place_comments, migrations.RunPython.noop),
+    ]
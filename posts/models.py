@@ -1,7 +1,17 @@
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
-from django.core.exceptions import ValidationError
+
+from . import threads, validators
+
+
+class PostQuerySet(models.QuerySet):
+    # post querysets for the read endpoints
+    
+    def feed(self):
+        # join the author so username never queries per row; originals of shared posts are
+        # attached by PostSerializer from posts.originals (cached, one lookup per page)
+        return self.select_related('user')
 
 
 class Post(models.Model):
@@ -20,30 +30,39 @@ class Post(models.Model):
     share_comment = models.TextField(blank=True, help_text="Additional comment when sharing")
     created_datetime = models.DateTimeField(auto_now_add=True, help_text="Creation timestamp")
     
+    # denormalized engagement counters, kept in sync by posts.signals and repaired by repair_post_counters
+    likes_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of likes")
+    comments_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of comments")
+    shares_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of shares")
+    
+    # counters are only ever written through F() updates, never from a possibly stale instance
+    COUNTER_FIELDS = ('likes_count', 'comments_count', 'shares_count')
+    
+    objects = PostQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_datetime']
+        # composite indexes follow the keyset orderings in posts.views, primary key tiebreak included
+        indexes = [
+            models.Index(fields=['-created_datetime', '-id'], name='post_recent_idx'),
+            models.Index(fields=['user', '-created_datetime', '-id'], name='post_user_recent_idx'),
+        ]
         verbose_name = "Post"
         verbose_name_plural = "Posts"
     
     def clean(self):
-        # validate title length
-        if self.title and len(self.title) > 200:
-            raise ValidationError({'title': f'Título muito longo! Máximo 200 caracteres. Atual: {len(self.title)} caracteres.'})
-        
-        # validate content length
-        if self.content and len(self.content) > 5000:
-            raise ValidationError({'content': f'Conteúdo muito longo! Máximo 5000 caracteres. Atual: {len(self.content)} caracteres.'})
-        
-        # validate title is not empty
-        if self.title and len(self.title.strip()) == 0:
-            raise ValidationError({'title': 'Título não pode estar vazio.'})
-        
-        # validate content is not empty
-        if self.content and len(self.content.strip()) == 0:
-            raise ValidationError({'content': 'Conteúdo não pode estar vazio.'})
-    
-    def save(self, *args, **kwargs):
-        self.full_clean()
+        # length and emptiness rules, see posts.validators
+        validators.validate_post(self)
+    
+    def save(self, *args, validate=True, **kwargs):
+        # the rules run in plain python; trusted callers that already validated pass validate=False
+        if validate:
+            validators.validate_post(self)
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in self.COUNTER_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -51,21 +70,6 @@ class Post(models.Model):
             return f"{self.user.username} shared: {self.original_post.title if self.original_post else 'Unknown'}"
         return f"{self.user.username}: {self.title}"
 
-    @property
-    def likes_count(self):
-        # return the number of likes for this post
-        return self.likes.count()
-
-    @property
-    def comments_count(self):
-        # return the number of comments for this post
-        return self.comments.count()
-
-    @property
-    def shares_count(self):
-        # return the number of shares for this post
-        return self.share_actions.count()
-
     @property
     def original_author(self):
         # return the original author if this is a shared post
@@ -98,6 +102,11 @@ class Like(models.Model):
     class Meta:
         unique_together = ['post', 'user']  # prevent duplicate likes from same user
         ordering = ['-created_datetime']
+        indexes = [
+            models.Index(fields=['post', '-created_datetime', '-id'], name='like_post_recent_idx'),
+            # Post.filter(likes__user=...) and the viewer's liked flags start from the user
+            models.Index(fields=['user', 'post'], name='like_user_post_idx'),
+        ]
         verbose_name = "Like"
         verbose_name_plural = "Likes"
 
@@ -107,29 +116,45 @@ class Like(models.Model):
 
 class Comment(models.Model):
     # comment model for posts with foreign key to post, user and content
+    # replies point at their parent; path and depth place them in the thread (see posts.threads)
     
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='comments', null=True, blank=True)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, related_name='replies', null=True, blank=True, help_text="Comment this one replies to")
     content = models.TextField(help_text="Comment content (max 1000 characters)")
+    path = models.CharField(max_length=threads.PATH_MAX_LENGTH, default='', editable=False, help_text="Ids from the thread root down to this comment")
+    depth = models.PositiveSmallIntegerField(default=0, editable=False, help_text="Number of ancestors")
+    replies_count = models.PositiveIntegerField(default=0, editable=False, help_text="Number of direct replies")
     created_datetime = models.DateTimeField(auto_now_add=True, help_text="When the comment was created")
     
     class Meta:
-        ordering = ['created_datetime']  # oldest comments first
+        ordering = ['path']  # threads depth-first, oldest threads and replies first
+        indexes = [
+            # a post's threads and any subtree are one range scan over (post, path)
+            models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ]
         verbose_name = "Comment"
         verbose_name_plural = "Comments"
     
     def clean(self):
-        # validate content length
-        if self.content and len(self.content) > 1000:
-            raise ValidationError({'content': f'Comentário muito longo! Máximo 1000 caracteres. Atual: {len(self.content)} caracteres.'})
-        
-        # validate content is not empty
-        if self.content and len(self.content.strip()) == 0:
-            raise ValidationError({'content': 'Comentário não pode estar vazio.'})
-    
-    def save(self, *args, **kwargs):
-        self.full_clean()
+        # length and emptiness rules, see posts.validators
+        validators.validate_comment(self)
+    
+    def save(self, *args, validate=True, **kwargs):
+        # the rules run in plain python; trusted callers that already validated pass validate=False
+        if validate:
+            validators.validate_comment(self)
+        if not self._state.adding or self.path:
+            super().save(*args, **kwargs)
+            return
+        # the path ends with the comment's own id, so it is written right after the insert; a row
+        # left without one (like a reply to a parent still waiting for it) is what rebuild_paths places
+        parent_path = self.parent.path if self.parent_id else ''
+        self.depth = self.parent.depth + 1 if self.parent_id else 0
         super().save(*args, **kwargs)
+        if parent_path or not self.parent_id:
+            self.path = threads.child_path(parent_path, self.pk)
+            type(self)._base_manager.using(self._state.db).filter(pk=self.pk).update(path=self.path)
     
     def __str__(self):
         return f"{self.user.username} commented on {self.post.title}"
@@ -145,8 +170,49 @@ class Share(models.Model):
     class Meta:
         unique_together = ['post', 'user']  # prevent duplicate shares from same user
         ordering = ['-created_datetime']
+        indexes = [
+            models.Index(fields=['post', '-created_datetime', '-id'], name='share_post_recent_idx'),
+            # Post.filter(share_actions__user=...) and the viewer's shared flags start from the user
+            models.Index(fields=['user', 'post'], name='share_user_post_idx'),
+        ]
         verbose_name = "Share"
         verbose_name_plural = "Shares"
 
     def __str__(self):
-        return f"{self.user.username} shared {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} shared {self.post.title}"
+
+class TimelineEntry(models.Model):
+    # materialized home timeline row: a post delivered to one reader's feed by posts.timeline
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline_entries', help_text="Reader whose feed contains the post")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_datetime = models.DateTimeField(help_text="Copy of the post creation time, used for feed ordering")
+    
+    class Meta:
+        unique_together = ['user', 'post']  # a post is delivered to a feed once
+        ordering = ['-created_datetime']
+        indexes = [
+            models.Index(fields=['user', '-created_datetime', '-post'], name='timeline_user_recent_idx'),
+        ]
+        verbose_name = "Timeline entry"
+        verbose_name_plural = "Timeline entries"
+    
+    def __str__(self):
+        return f"post {self.post_id} in feed of user {self.user_id}"
+
+
+class TrendingPost(models.Model):
+    # ranking row written by posts.trending.refresh, read by the trending endpoint
+    
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    rank = models.PositiveIntegerField(unique=True, help_text="Position in the ranking, 1 is the hottest post")
+    score = models.FloatField(help_text="Time-decayed engagement score")
+    computed_at = models.DateTimeField(help_text="When the ranking was computed")
+    
+    class Meta:
+        ordering = ['rank']
+        verbose_name = "Trending post"
+        verbose_name_plural = "Trending posts"
+    
+    def __str__(self):
+        return f"#{self.rank} post {self.post_id} ({self.score:.2f})"
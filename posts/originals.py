@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import CharField, OuterRef, Subquery, Value
+from django.db.models.functions import Concat
+
+from .models import Post
+
+
+# shared posts are stored as references: post_type='shared', original_post and share_comment, with
+# empty title and content; the original's title, content and author are resolved on read
+# resolved originals are kept in the default cache, so a page full of shares of the same viral post
+# costs one lookup for the page, and none while the original stays cached
+
+CACHE_PREFIX = 'original-post:'
+ORIGINAL_FIELDS = ('title', 'content', 'post_type', 'created_datetime', 'user__username')
+_FIELD = Post._meta.get_field('original_post')
+
+
+def _cache_key(post_id):
+    return f'{CACHE_PREFIX}{post_id}'
+
+
+def _pending(posts):
+    # shared posts whose original is not loaded yet
+    return [post for post in posts if post.original_post_id and not _FIELD.is_cached(post)]
+
+
+def _assign(pending, found):
+    for post in pending:
+        original = found.get(post.original_post_id)
+        if original is not None:
+            _FIELD.set_cached_value(post, original)
+
+
+def _originals():
+    return Post.objects.select_related('user').only(*ORIGINAL_FIELDS)
+
+
+def attach(posts):
+    # set original_post on every shared post: cached originals first, the misses in one query
+    pending = _pending(posts)
+    if not pending:
+        return
+    timeout = settings.ORIGINAL_POST_CACHE_TIMEOUT
+    post_ids = {post.original_post_id for post in pending}
+    found = {}
+    if timeout:
+        found = {original.pk: original for original in cache.get_many([_cache_key(pk) for pk in post_ids]).values()}
+    missing = post_ids - set(found)
+    if missing:
+        loaded = _originals().in_bulk(missing)
+        if timeout and loaded:
+            cache.set_many({_cache_key(pk): original for pk, original in loaded.items()}, timeout)
+        found.update(loaded)
+    _assign(pending, found)
+
+
+async def aattach(posts):
+    # attach for the async views, so PostSerializer finds every original already loaded
+    pending = _pending(posts)
+    if not pending:
+        return
+    timeout = settings.ORIGINAL_POST_CACHE_TIMEOUT
+    post_ids = {post.original_post_id for post in pending}
+    found = {}
+    if timeout:
+        found = {original.pk: original for original in (await cache.aget_many([_cache_key(pk) for pk in post_ids])).values()}
+    missing = post_ids - set(found)
+    if missing:
+        loaded = await _originals().ain_bulk(missing)
+        if timeout and loaded:
+            await cache.aset_many({_cache_key(pk): original for pk, original in loaded.items()}, timeout)
+        found.update(loaded)
+    _assign(pending, found)
+
+
+def forget(*post_ids):
+    # drop cached originals once the change commits
+    keys = [_cache_key(post_id) for post_id in post_ids if post_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+# ============================================================================
+# COMPACTION (used by the storage benchmark; migration 0010 keeps its own frozen copy)
+# ============================================================================
+
+def compact_shared_posts(model):
+    # drop the copied title and content from shared posts that reference their original
+    return model.objects.filter(post_type='shared', original_post__isnull=False).exclude(title='', content='').update(title='', content='')
+
+
+def expand_shared_posts(model):
+    # copy title and content back from the originals (the pre-compaction layout)
+    originals = model.objects.filter(pk=OuterRef('original_post_id'))
+    return model.objects.filter(post_type='shared', original_post__isnull=False, content='').update(
+        title=Concat(Value('Shared: '), Subquery(originals.values('title')), output_field=CharField()),
+        content=Subquery(originals.values('content')),
+    )
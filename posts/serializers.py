@@ -1,11 +1,24 @@
+from django.db import models
 from rest_framework import serializers
+from users import usernames
+from . import originals, threads, validators
 from .models import Post, Like, Comment, Share
+from .interactions import MAX_OPERATIONS
 
 
 # ============================================================================
 # SERIALIZERS FOR POSTS
 # ============================================================================
 
+class PostListSerializer(serializers.ListSerializer):
+    # resolve the originals of every shared post on the page at once
+    
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        originals.attach(rows)
+        return super().to_representation(rows)
+
+
 class PostSerializer(serializers.ModelSerializer):
     # serializer for post model with proper field validation and read-only field handling
     
@@ -22,9 +35,24 @@ class PostSerializer(serializers.ModelSerializer):
         model = Post
         fields = ['id', 'username', 'title', 'content', 'post_type', 'original_post', 'share_comment', 'created_datetime', 'likes_count', 'comments_count', 'shares_count', 'original_author', 'original_content', 'original_title', 'is_liked']
         read_only_fields = ['id', 'username', 'created_datetime', 'likes_count', 'comments_count', 'shares_count', 'original_author', 'original_content', 'original_title', 'is_liked']
+        list_serializer_class = PostListSerializer
+    
+    def to_representation(self, instance):
+        originals.attach([instance])
+        data = super().to_representation(instance)
+        if instance.post_type == 'shared' and instance.original_post_id:
+            # shared posts store no copy, render the original's title and content as before
+            data['title'] = data['title'] or f"Shared: {data['original_title']}"
+            data['content'] = data['content'] or data['original_content']
+        return data
     
     def get_is_liked(self, obj):
-        # check if the current user has liked this post
+        # check if the current user has liked this post, using the page's preloaded likes when available
+        viewer = self.context.get('viewer')
+        if viewer is not None:
+            liked = viewer.has_liked(obj)
+            if liked is not None:
+                return liked
         request = self.context.get('request')
         if request and hasattr(request, 'user') and request.user.is_authenticated:
             return obj.likes.filter(user=request.user).exists()
@@ -32,25 +60,11 @@ class PostSerializer(serializers.ModelSerializer):
     
     def validate_title(self, value):
         # validate title field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Título não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 200:
-            raise serializers.ValidationError(f"Título muito longo! Máximo 200 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_title(value)
     
     def validate_content(self, value):
         # validate content field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Conteúdo não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 5000:
-            raise serializers.ValidationError(f"Conteúdo muito longo! Máximo 5000 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_content(value)
     
     def validate_username(self, value):
         # validate username field
@@ -70,36 +84,20 @@ class PostCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         # get or create user by username
-        from users.models import User
         username = validated_data.pop('username')
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={'email': f'{username}@example.com'}  # temporary email
-        )
-        validated_data['user'] = user
-        return super().create(validated_data)
+        validated_data['user'] = usernames.get_or_create_user(username)
+        # title and content went through the same rules in validate_title / validate_content
+        post = Post(**validated_data)
+        post.save(validate=False)
+        return post
     
     def validate_title(self, value):
         # validate title field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Título não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 200:
-            raise serializers.ValidationError(f"Título muito longo! Máximo 200 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_title(value)
     
     def validate_content(self, value):
         # validate content field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Conteúdo não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 5000:
-            raise serializers.ValidationError(f"Conteúdo muito longo! Máximo 5000 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_content(value)
 
 
 class PostUpdateSerializer(serializers.ModelSerializer):
@@ -111,25 +109,11 @@ class PostUpdateSerializer(serializers.ModelSerializer):
     
     def validate_title(self, value):
         # validate title field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Título não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 200:
-            raise serializers.ValidationError(f"Título muito longo! Máximo 200 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_title(value)
     
     def validate_content(self, value):
         # validate content field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Conteúdo não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 5000:
-            raise serializers.ValidationError(f"Conteúdo muito longo! Máximo 5000 caracteres. Atual: {len(value)} caracteres.")
-        
-        return value
+        return validators.clean_content(value)
 
 
 # ============================================================================
@@ -152,21 +136,26 @@ class CommentSerializer(serializers.ModelSerializer):
     
     username = serializers.CharField(source='user.username', read_only=True)
     user = serializers.CharField(write_only=True)
+    parent = serializers.PrimaryKeyRelatedField(queryset=Comment.objects.all(), required=False, allow_null=True)
     
     class Meta:
         model = Comment
-        fields = ['id', 'username', 'user', 'content', 'created_datetime']
-        read_only_fields = ['id', 'username', 'created_datetime']
+        fields = ['id', 'username', 'user', 'parent', 'depth', 'replies_count', 'content', 'created_datetime']
+        read_only_fields = ['id', 'username', 'depth', 'replies_count', 'created_datetime']
     
     def validate_content(self, value):
         # validate content field
-        if not value or not value.strip():
-            raise serializers.ValidationError("Conteúdo não pode estar vazio.")
-        
-        value = value.strip()
-        if len(value) > 1000:
-            raise serializers.ValidationError(f"Comentário muito longo! Máximo 1000 caracteres. Atual: {len(value)} caracteres.")
-        
+        return validators.clean_comment(value)
+    
+    def validate_parent(self, value):
+        # replies stay on the parent's post and within the path's depth limit
+        if value is None:
+            return value
+        post = self.context.get('post')
+        if post is not None and value.post_id != post.pk:
+            raise serializers.ValidationError("Parent comment belongs to another post.")
+        if value.depth >= threads.MAX_DEPTH:
+            raise serializers.ValidationError(f"Replies cannot be nested more than {threads.MAX_DEPTH} levels deep.")
         return value
     
     def validate_user(self, value):
@@ -177,16 +166,13 @@ class CommentSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         # get or create user
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
         username = validated_data.pop('user')
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={'email': f'{username}@example.com'}
-        )
+        user = usernames.get_or_create_user(username)
         
-        # create comment with user
-        return Comment.objects.create(user=user, **validated_data)
+        # create comment with user, its content already passed validate_content
+        comment = Comment(user=user, **validated_data)
+        comment.save(validate=False)
+        return comment
 
 
 class ShareSerializer(serializers.ModelSerializer):
@@ -242,4 +228,16 @@ class PostShareSerializer(serializers.ModelSerializer):
         # validate share comment field (optional)
         if value:
             return value.strip()
-        return value
\ No newline at end of file
+        return value
+
+class InteractionOperationSerializer(serializers.Serializer):
+    # one operation of a bulk interaction request
+    
+    post_id = serializers.IntegerField(min_value=1)
+    action = serializers.ChoiceField(choices=['like', 'unlike', 'share', 'unshare'])
+
+
+class BulkInteractionSerializer(serializers.Serializer):
+    # bulk interaction payload, items are validated one by one so a bad item does not reject the batch
+    
+    operations = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=MAX_OPERATIONS)
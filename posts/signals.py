@@ -0,0 +1,312 @@
+import threading
+
+from django.db import transaction
+from django.db.models import F, Q, QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from socialhubapi import response_cache
+from users import stats as profile_stats
+from users.models import Follow, User
+
+from . import originals, timeline
+from .models import Post, Like, Comment, Share
+from .counters import COUNTER_SOURCES, adjust_counter, adjust_counters
+
+
+# ============================================================================
+# CASCADE DELETES
+# ============================================================================
+
+# deleting posts or users cascades to their likes, comments and shares, and the receivers below
+# would update a counter and the caches once per row: deleting a popular post cost a query per like.
+# inside such a cascade the rows only note what changed, and once the last row of the delete is gone
+# (the collector sends every pre_delete first, so the rows are counted up front) the changes are
+# applied set-based, leaving out the posts and comments deleted along with them
+
+_cascade = threading.local()
+
+
+def _cascade_changes(origin):
+    # changes pending for the post or user delete started from `origin`, None for any other delete
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if model not in (Post, User):
+        return None
+    state = getattr(_cascade, 'state', None)
+    if state is None or state['origin'] is not origin:
+        # a delete that failed leaves its changes behind, they were rolled back with it
+        state = _cascade.state = {
+            'origin': origin,
+            'pending': 0,
+            'counters': {},
+            'replies': {},
+            'interacted': set(),
+            'commented': set(),
+            'received': set(),
+            'deleted_posts': set(),
+            'deleted_comments': set(),
+        }
+    return state
+
+
+@receiver(pre_delete, sender=User)
+@receiver(pre_delete, sender=Post)
+@receiver(pre_delete, sender=Like)
+@receiver(pre_delete, sender=Comment)
+@receiver(pre_delete, sender=Share)
+def note_cascaded_row(sender, instance, origin=None, **kwargs):
+    changes = _cascade_changes(origin)
+    if changes is None:
+        return
+    changes['pending'] += 1
+    if sender is Post:
+        changes['deleted_posts'].add(instance.pk)
+    elif sender is Comment:
+        changes['deleted_comments'].add(instance.pk)
+
+
+# ============================================================================
+# ENGAGEMENT COUNTERS
+# ============================================================================
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Share)
+def increment_post_counter(sender, instance, created, raw=False, **kwargs):
+    # new interaction rows bump the matching counter on their post
+    if created and not raw:
+        adjust_counter(instance.post_id, COUNTER_SOURCES[sender], 1)
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Share)
+def decrement_post_counter(sender, instance, origin=None, **kwargs):
+    # deleted rows release their count, cascades from users and posts all at once
+    changes = _cascade_changes(origin)
+    if changes is not None:
+        deltas = changes['counters'].setdefault(COUNTER_SOURCES[sender], {})
+        deltas[instance.post_id] = deltas.get(instance.post_id, 0) - 1
+        return
+    adjust_counter(instance.post_id, COUNTER_SOURCES[sender], -1)
+
+
+@receiver(post_save, sender=Comment)
+def increment_reply_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.parent_id:
+        Comment.objects.filter(pk=instance.parent_id).update(replies_count=F('replies_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_reply_count(sender, instance, origin=None, **kwargs):
+    # replies deleted with their parent find no row to update
+    changes = _cascade_changes(origin)
+    if changes is not None and instance.parent_id:
+        changes['replies'][instance.parent_id] = changes['replies'].get(instance.parent_id, 0) - 1
+    elif instance.parent_id:
+        Comment.objects.filter(pk=instance.parent_id, replies_count__gt=0).update(replies_count=F('replies_count') - 1)
+
+
+# ============================================================================
+# HOME TIMELINE FAN-OUT
+# ============================================================================
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    # new original and shared posts are delivered to followers in the background
+    if created and not raw:
+        timeline.enqueue(timeline.fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.enqueue(timeline.backfill, instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.enqueue(timeline.prune, instance.follower_id, instance.following_id)
+
+
+# ============================================================================
+# PROFILE STATS CACHE
+# ============================================================================
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_author_stats(sender, instance, **kwargs):
+    profile_stats.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_received_stats(sender, instance, **kwargs):
+    # likes_received / comments_received of the post's author, without a lookup when the post is loaded
+    changes = _cascade_changes(kwargs.get('origin'))
+    if changes is not None:
+        changes['received'].add(instance.post_id)
+    elif sender.post.is_cached(instance):
+        profile_stats.invalidate(instance.post.user_id)
+    else:
+        profile_stats.invalidate_post_authors([instance.post_id])
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_stats(sender, instance, **kwargs):
+    profile_stats.invalidate(instance.follower_id, instance.following_id)
+
+
+# ============================================================================
+# SHARED POST ORIGINALS
+# ============================================================================
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def forget_original(sender, instance, **kwargs):
+    # shares render the original's title and content from the cache
+    originals.forget(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def forget_originals_by_author(sender, instance, created=False, update_fields=None, **kwargs):
+    # cached originals carry their author's username
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    originals.forget(*Post.objects.filter(user_id=instance.pk, shares__isnull=False).values_list('pk', flat=True).distinct())
+
+
+# ============================================================================
+# RESPONSE CACHE INVALIDATION
+# ============================================================================
+
+def _author_stats_tags(post_ids):
+    return [
+        f'user-stats:{username}'
+        for username in Post.objects.filter(pk__in=post_ids).values_list('user__username', flat=True)
+        if username
+    ]
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_responses(sender, instance, **kwargs):
+    if not response_cache.tracks_versions():
+        return
+    tags = ['posts', f'post:{instance.pk}']
+    if instance.user_id is not None:
+        # the author may already be gone when the post is deleted through the user's cascade
+        username = instance.user.username if Post.user.is_cached(instance) else (
+            User.objects.filter(pk=instance.user_id).values_list('username', flat=True).first()
+        )
+        if username:
+            tags.append(f'user-stats:{username}')
+    if 'created' not in kwargs:
+        # deleted: its comments went with it, without invalidating the comment lists one by one
+        tags.append(f'comments:{instance.pk}')
+    elif not kwargs['created']:
+        # shared copies render the original's title and content
+        tags.extend(f'post:{pk}' for pk in Post.objects.filter(original_post_id=instance.pk).values_list('pk', flat=True))
+    response_cache.invalidate(*tags)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+@receiver(post_save, sender=Share)
+@receiver(post_delete, sender=Share)
+def invalidate_interaction_responses(sender, instance, **kwargs):
+    changes = _cascade_changes(kwargs.get('origin'))
+    if changes is not None:
+        changes['interacted'].add(instance.post_id)
+        return
+    response_cache.invalidate('posts', f'post:{instance.post_id}')
+    if sender is Like and response_cache.tracks_versions():
+        # likes_received on the author's public stats
+        transaction.on_commit(lambda: response_cache.bump(*_author_stats_tags([instance.post_id])))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    changes = _cascade_changes(kwargs.get('origin'))
+    if changes is not None:
+        changes['interacted'].add(instance.post_id)
+        changes['commented'].add(instance.post_id)
+        return
+    response_cache.invalidate('posts', f'post:{instance.post_id}', f'comments:{instance.post_id}')
+    if response_cache.tracks_versions():
+        transaction.on_commit(lambda: response_cache.bump(*_author_stats_tags([instance.post_id])))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_responses(sender, instance, **kwargs):
+    if response_cache.tracks_versions():
+        user_ids = [instance.follower_id, instance.following_id]
+        transaction.on_commit(lambda: response_cache.bump(*[
+            f'user-stats:{username}' for username in User.objects.filter(pk__in=user_ids).values_list('username', flat=True)
+        ]))
+
+
+def _rename_tags(user_id, old_username):
+    # every response rendering the old name: the user's posts, shares of them and comment lists
+    posts = Post.objects.filter(Q(user_id=user_id) | Q(original_post__user_id=user_id)).values_list('pk', flat=True)
+    commented = Comment.objects.filter(user_id=user_id).values_list('post_id', flat=True).distinct()
+    return [
+        f'user-stats:{old_username}',
+        *(f'post:{pk}' for pk in posts),
+        *(f'comments:{post_id}' for post_id in commented),
+    ]
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_responses(sender, instance, created=False, update_fields=None, **kwargs):
+    # usernames are rendered on posts and comments; logins only touch last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    tags = ['posts', f'user-stats:{instance.username}']
+    old_username = getattr(instance, '_loaded_username', None)
+    if not created and old_username not in (None, instance.username) and response_cache.tracks_versions():
+        tags.extend(_rename_tags(instance.pk, old_username))
+    instance._loaded_username = instance.username
+    response_cache.invalidate(*tags)
+
+
+# ============================================================================
+# CASCADE DELETES, APPLIED
+# ============================================================================
+
+# connected after every other post_delete receiver of this module, so the last row has been noted
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Share)
+def apply_cascade_changes(sender, instance, origin=None, **kwargs):
+    state = getattr(_cascade, 'state', None)
+    if state is None or state['origin'] is not origin:
+        return
+    state['pending'] -= 1
+    if state['pending']:
+        return
+    _cascade.state = None
+
+    def live(post_ids):
+        return [post_id for post_id in post_ids if post_id not in state['deleted_posts']]
+
+    for field, deltas in state['counters'].items():
+        adjust_counters(field, {post_id: deltas[post_id] for post_id in live(deltas)})
+    adjust_counters('replies_count', {
+        comment_id: delta for comment_id, delta in state['replies'].items() if comment_id not in state['deleted_comments']
+    }, model=Comment)
+    interacted = live(state['interacted'])
+    if interacted:
+        response_cache.invalidate('posts', *(f'post:{pk}' for pk in interacted), *(f'comments:{pk}' for pk in live(state['commented'])))
+    received = live(state['received'])
+    if received:
+        profile_stats.invalidate_post_authors(received)
+        if response_cache.tracks_versions():
+            transaction.on_commit(lambda: response_cache.bump(*_author_stats_tags(received)))
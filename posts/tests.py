@@ -1,9 +1,10 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Post, Like, Comment, Share
-from users.models import User
+from .models import Post, Like, Comment, Share, TimelineEntry
+from users.models import User, Follow
 
 
 class UserModelTest(TestCase):
@@ -450,7 +451,9 @@ class PostSharingAPITest(APITestCase):
         self.assertIsNotNone(shared_post)
         self.assertEqual(shared_post.user.username, 'sharer')
         self.assertEqual(shared_post.share_comment, 'This is amazing!')
-        self.assertEqual(shared_post.title, 'Shared: Original Post')
+        # stored as a reference, the title is rendered from the original
+        self.assertEqual((shared_post.title, shared_post.content), ('', ''))
+        self.assertEqual(response.data['data']['title'], 'Shared: Original Post')
     
     def test_share_post_without_comment(self):
         # test creating a shared post without comment
@@ -636,3 +639,1337 @@ class EdgeCasesTest(APITestCase):
         self.assertEqual(self.post.likes_count, 1)
         self.assertEqual(self.post.comments_count, 1)
         self.assertEqual(self.post.shares_count, 1)
+
+
+class PostCounterTest(APITestCase):
+    # test denormalized engagement counters and their repair command
+    
+    def setUp(self):
+        # setup test data
+        self.author = User.objects.create(username="author", email="author@example.com")
+        self.fan = User.objects.create(username="fan", email="fan@example.com")
+        self.post = Post.objects.create(user=self.author, title="Counted", content="Counted content")
+    
+    def test_counters_follow_creates_and_deletes(self):
+        # test counters move with interaction rows
+        like = Like.objects.create(post=self.post, user=self.fan)
+        Comment.objects.create(post=self.post, user=self.fan, content="Nice")
+        Share.objects.create(post=self.post, user=self.fan)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count, self.post.shares_count), (1, 1, 1))
+        
+        like.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+    
+    def test_counters_follow_cascades(self):
+        # test deleting a user releases the counts of their interactions
+        Like.objects.create(post=self.post, user=self.fan)
+        Comment.objects.create(post=self.post, user=self.fan, content="Nice")
+        self.fan.delete()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (0, 0))
+    
+    def test_deleting_a_popular_post_does_not_update_per_like(self):
+        # test the cascade from a post with many likes costs the same queries as one with a few
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        fans = User.objects.bulk_create([User(username=f"fan{index}", email=f"fan{index}@example.com") for index in range(60)])
+        quiet = Post.objects.create(user=self.author, title="Quiet", content="Quiet content")
+        Like.objects.bulk_create([Like(post=self.post, user=fan) for fan in fans])
+        Like.objects.bulk_create([Like(post=quiet, user=fan) for fan in fans[:2]])
+        totals, updates = [], []
+        for post in (quiet, self.post):
+            with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+                post.delete()
+            totals.append(len(queries))
+            updates.extend(query['sql'] for query in queries if query['sql'].startswith('UPDATE'))
+        self.assertEqual(totals[0], totals[1])
+        self.assertEqual(updates, [])
+    
+    def test_user_cascade_recounts_surviving_posts_at_once(self):
+        # test deleting users updates the counters of the posts they interacted with in grouped updates
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        fans = User.objects.bulk_create([User(username=f"fan{index}", email=f"fan{index}@example.com") for index in range(20)])
+        parent = Comment.objects.create(post=self.post, user=self.author, content="Thread")
+        for fan in fans:
+            Like.objects.create(post=self.post, user=fan)
+            Comment.objects.create(post=self.post, user=fan, parent=parent, content="Reply")
+        with CaptureQueriesContext(connection) as queries:
+            User.objects.filter(pk__in=[fan.pk for fan in fans]).delete()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "posts_')]), 3)
+        self.post.refresh_from_db()
+        parent.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count, parent.replies_count), (0, 1, 0))
+    
+    def test_stale_instance_save_keeps_counters(self):
+        # test saving an instance loaded before a like does not overwrite the counter
+        stale = Post.objects.get(pk=self.post.pk)
+        Like.objects.create(post=self.post, user=self.fan)
+        stale.title = "Renamed"
+        stale.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(self.post.title, "Renamed")
+    
+    def test_repair_command_fixes_drift(self):
+        # test the management command recomputes drifted counters
+        from io import StringIO
+        from django.core.management import call_command
+        Like.objects.create(post=self.post, user=self.fan)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=7, comments_count=3)
+        
+        out = StringIO()
+        call_command('repair_post_counters', '--dry-run', stdout=out)
+        self.assertIn('1 posts have drifted', out.getvalue())
+        
+        call_command('repair_post_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 0))
+    
+    def test_post_list_does_not_count_per_row(self):
+        # test serializing a page reads stored counters instead of issuing COUNT queries
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for index in range(5):
+            Post.objects.create(user=self.author, title=f"Post {index}", content="Body")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'), {'batch_size': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        interaction_counts = [q['sql'] for q in queries if 'COUNT(' in q['sql'].upper() and 'posts_like' in q['sql']]
+        self.assertEqual(interaction_counts, [])
+
+
+class KeysetPaginationTest(APITestCase):
+    # test cursor pagination on list endpoints
+    
+    def setUp(self):
+        # setup test data
+        self.user = User.objects.create(username="pager", email="pager@example.com")
+        self.posts = [
+            Post.objects.create(user=self.user, title=f"Post {index}", content="Body")
+            for index in range(5)
+        ]
+    
+    def test_walk_forward_and_back(self):
+        # test next links visit every post once, newest first, and previous links come back
+        url = reverse('post-list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['previous'])
+        
+        seen = [post['id'] for post in response.data['posts']]
+        pages = [response]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(response)
+            seen.extend(post['id'] for post in response.data['posts'])
+        expected = [post.id for post in sorted(self.posts, key=lambda p: (p.created_datetime, p.id), reverse=True)]
+        self.assertEqual(seen, expected)
+        
+        back = self.client.get(pages[-1].data['previous'])
+        self.assertEqual(
+            [post['id'] for post in back.data['posts']],
+            [post['id'] for post in pages[-2].data['posts']]
+        )
+    
+    def test_include_total(self):
+        # test the optional total in page_info
+        response = self.client.get(reverse('post-list'), {'page_size': 2, 'include_total': 'exact'})
+        self.assertEqual(response.data['page_info']['total_posts'], 5)
+        self.assertFalse(response.data['page_info']['total_is_approximate'])
+    
+    def test_invalid_cursor(self):
+        # test a tampered cursor is rejected
+        response = self.client.get(reverse('post-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_batch_compatibility_mode(self):
+        # test legacy batch parameters keep the batch_info shape
+        response = self.client.get(reverse('post-list'), {'batch_size': 2, 'batch_number': 2})
+        self.assertEqual(response.data['batch_info'], {
+            'current_batch': 2,
+            'batch_size': 2,
+            'total_posts': 5,
+            'total_batches': 3,
+            'posts_in_current_batch': 1,
+        })
+    
+    def test_comments_oldest_first(self):
+        # test comment pages follow the ascending ordering
+        post = self.posts[0]
+        for index in range(3):
+            Comment.objects.create(post=post, user=self.user, content=f"Comment {index}")
+        url = reverse('post-comments-list', kwargs={'post_id': post.id})
+        first = self.client.get(url, {'page_size': 2})
+        second = self.client.get(first.data['next'])
+        contents = [c['content'] for c in first.data['comments'] + second.data['comments']]
+        self.assertEqual(contents, ['Comment 0', 'Comment 1', 'Comment 2'])
+        self.assertIsNone(second.data['next'])
+
+
+class ViewerStateTest(APITestCase):
+    # test is_liked comes from one preloaded query per page
+    
+    def setUp(self):
+        # setup test data
+        self.viewer = User.objects.create(username="viewer", email="viewer@example.com")
+        self.author = User.objects.create(username="writer", email="writer@example.com")
+        self.posts = [
+            Post.objects.create(user=self.author, title=f"Post {index}", content="Body")
+            for index in range(4)
+        ]
+        Like.objects.create(post=self.posts[0], user=self.viewer)
+        Like.objects.create(post=self.posts[2], user=self.viewer)
+        self.client.force_authenticate(user=self.viewer)
+    
+    def test_is_liked_uses_single_query(self):
+        # test liked flags are correct and the like table is read once for the page
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'), {'page_size': 10})
+        liked = {post['id']: post['is_liked'] for post in response.data['posts']}
+        self.assertEqual(liked, {
+            self.posts[0].id: True,
+            self.posts[1].id: False,
+            self.posts[2].id: True,
+            self.posts[3].id: False,
+        })
+        like_queries = [q['sql'] for q in queries if 'posts_like' in q['sql']]
+        self.assertEqual(len(like_queries), 1)
+    
+    def test_anonymous_viewer_skips_like_queries(self):
+        # test anonymous listings never touch the like table
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.force_authenticate(user=None)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post-list'))
+        self.assertTrue(all(post['is_liked'] is False for post in response.data['posts']))
+        self.assertFalse([q for q in queries if 'posts_like' in q['sql']])
+
+
+class BenchmarkHarnessTest(TestCase):
+    # test the route benchmark harness and its baseline comparison
+    
+    def test_seed_and_measure(self):
+        # test a tiny seeded run reports metrics for the requested routes
+        from socialhubapi.benchmark import run_route_benchmarks, seed_dataset
+        context = seed_dataset(users=10, posts=30, likes=60, comments=20, follows=15)
+        self.assertEqual(Post.objects.get(pk=context['hot_post_id']).likes_count, Like.objects.filter(post_id=context['hot_post_id']).count())
+        
+        results = run_route_benchmarks(context, repeats=2, only={'post-detail', 'user-list'})
+        self.assertEqual(set(results), {'post-detail', 'user-list'})
+        for metrics in results.values():
+            self.assertEqual(metrics['status'], 200)
+            self.assertGreater(metrics['queries'], 0)
+            self.assertLessEqual(metrics['p50_ms'], metrics['p95_ms'])
+    
+    def test_route_table_covers_every_route(self):
+        # test every named api route is benchmarked and write routes repeat the same work
+        from posts.urls import urlpatterns as post_urls
+        from socialhubapi.benchmark import route_table, run_route_benchmarks, seed_dataset
+        from users.async_urls import urlpatterns as async_user_urls
+        from users.urls import urlpatterns as user_urls
+        context = seed_dataset(users=10, posts=30, likes=60, comments=20, follows=15)
+        routes = route_table(context)
+        self.assertEqual(
+            {url_name for _name, url_name, *_rest in routes},
+            {pattern.name for pattern in post_urls} | {f'users:{pattern.name}' for pattern in user_urls}
+            | {f'users-async:{pattern.name}' for pattern in async_user_urls},
+        )
+        
+        writes = {'post-delete', 'post-like', 'post-unlike', 'post-share', 'unfollow-user', 'user-register', 'user-logout'}
+        results = run_route_benchmarks(context, repeats=2, only=writes)
+        self.assertEqual({name: metrics['status'] for name, metrics in results.items()}, {
+            'post-delete': 204, 'post-like': 201, 'post-unlike': 204, 'post-share': 201,
+            'unfollow-user': 200, 'user-register': 201, 'user-logout': 200,
+        })
+    
+    def test_error_responses_fail_the_run(self):
+        # test a route answering with an error cannot be measured into a baseline
+        from unittest import mock
+        from socialhubapi import benchmark
+        context = benchmark.seed_dataset(users=5, posts=5, likes=5, comments=4, follows=5)
+        missing = [('post-detail', 'post-detail', 'get', {'pk': 0}, {}, False)]
+        with mock.patch.object(benchmark, 'route_table', return_value=missing):
+            with self.assertRaisesMessage(benchmark.RouteFailed, 'post-detail: status 404'):
+                benchmark.run_route_benchmarks(context, repeats=1)
+    
+    def test_prestart_skips_applied_plan(self):
+        # test the startup phase does no migration work when the schema is current
+        from django.core.management import call_command
+        from io import StringIO
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('prestart', stdout=out)
+        self.assertIn('no pending migrations', out.getvalue())
+        self.assertTrue(all(query['sql'].strip().upper().startswith('SELECT') for query in queries))
+    
+    def test_gunicorn_uvicorn_workers_get_no_persistent_connections(self):
+        # test settings loaded by the gunicorn master for uvicorn workers keep connections per request
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        script = '\n'.join([
+            'import runpy, types',
+            'from unittest import mock',
+            "hooks = runpy.run_path('gunicorn.conf.py')",
+            "server = types.SimpleNamespace(cfg=types.SimpleNamespace(worker_class_str='uvicorn.workers.UvicornWorker'))",
+            "with mock.patch('django.core.management.call_command'):",
+            "    hooks['on_starting'](server)",
+            'import socialhubapi.asgi',
+            'from django.conf import settings',
+            "print(settings.DB_CONN_MODE, settings.DATABASES['default']['CONN_MAX_AGE'])",
+        ])
+        env = {key: value for key, value in os.environ.items() if key not in ('SERVER_GATEWAY', 'DB_CONN_MODE', 'RUN_PRESTART')}
+        env['DJANGO_SETTINGS_MODULE'] = 'socialhubapi.settings'
+        output = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split(), ['none', '0'])
+    
+    def test_compare_results_flags_query_regressions(self):
+        # test extra queries, status changes and slow p95 are reported
+        from socialhubapi.benchmark import compare_results
+        baseline = {'routes': {'post-list': {'status': 200, 'queries': 3, 'p95_ms': 10.0}}}
+        current = {'routes': {'post-list': {'status': 200, 'queries': 300, 'p95_ms': 50.0}}}
+        self.assertEqual(compare_results(current, baseline), ['post-list: queries 3 -> 300'])
+        self.assertEqual(len(compare_results(current, baseline, latency_factor=2)), 2)
+        self.assertEqual(compare_results(baseline, baseline, latency_factor=1), [])
+
+    def test_hot_queries_use_composite_indexes(self):
+        # test the keyset queries are served by the composite indexes instead of a sort
+        from django.db import connection
+        from socialhubapi.benchmark import measure_query_plans, seed_dataset
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan text is sqlite specific')
+        context = seed_dataset(users=10, posts=30, likes=60, comments=20, follows=15)
+        plans = {name: result['plan'] for name, result in measure_query_plans(context, repeats=1).items()}
+        expected = {
+            'post-feed': 'post_recent_idx',
+            'user-posts': 'post_user_recent_idx',
+            'post-comments': 'comment_post_path_idx',
+            'comment-replies': 'comment_post_path_idx',
+            'post-likes': 'like_post_recent_idx',
+            'post-shares': 'share_post_recent_idx',
+            'user-followers': 'follow_following_recent_idx',
+            'liked-posts': 'like_user_post_idx',
+        }
+        self.assertEqual(set(plans), set(expected))
+        for name, index in expected.items():
+            self.assertIn(index, plans[name], name)
+        for name in ('post-feed', 'user-posts', 'post-comments', 'comment-replies', 'post-likes', 'post-shares', 'user-followers'):
+            self.assertNotIn('TEMP B-TREE FOR ORDER BY', plans[name], name)
+
+
+
+class FeedQueryCountTest(APITestCase):
+    # test post lists render shared posts without per-row queries
+    
+    def setUp(self):
+        # setup test data: every post by a different author, half of them shares of another author's post
+        self.viewer = User.objects.create(username="feedviewer", email="feedviewer@example.com")
+        for index in range(12):
+            author = User.objects.create(username=f"feedauthor{index}", email=f"feedauthor{index}@example.com")
+            original = Post.objects.create(user=author, title=f"Original {index}", content="Body")
+            sharer = User.objects.create(username=f"feedsharer{index}", email=f"feedsharer{index}@example.com")
+            Post.objects.create(user=sharer, title=f"Shared: Original {index}", content="Body", post_type='shared', original_post=original)
+            Like.objects.create(post=original, user=self.viewer)
+    
+    def _queries(self, url, params):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+    
+    def test_constant_queries_regardless_of_page_size(self):
+        # test the query count for 2 and 20 rows is the same on every post list
+        urls = [
+            reverse('post-list'),
+            reverse('user-liked-posts', kwargs={'username': 'feedviewer'}),
+        ]
+        for url in urls:
+            small, _ = self._queries(url, {'page_size': 2})
+            large, response = self._queries(url, {'page_size': 20})
+            self.assertEqual(small, large, url)
+            self.assertGreaterEqual(len(response.data['posts']), 12)
+    
+    def test_shared_fields_resolved_once_per_page(self):
+        # test the originals of a page of shares load in one query, then come from the cache
+        from .serializers import PostSerializer
+        cache.clear()
+        posts = list(Post.objects.feed().filter(post_type='shared'))
+        with self.assertNumQueries(1):
+            data = PostSerializer(posts, many=True).data
+        self.assertEqual({row['original_author'] for row in data}, {f"feedauthor{index}" for index in range(12)})
+        self.assertTrue(all(row['original_title'].startswith('Original') for row in data))
+        with override_settings(ORIGINAL_POST_CACHE_TIMEOUT=60):
+            PostSerializer(list(Post.objects.feed().filter(post_type='shared')), many=True).data
+            posts = list(Post.objects.feed().filter(post_type='shared'))
+            with self.assertNumQueries(0):
+                PostSerializer(posts, many=True).data
+
+
+class SharedPostReferenceTest(APITestCase):
+    # test shared posts store a reference and render the current original
+    
+    def setUp(self):
+        # setup test data
+        self.author = User.objects.create(username="refauthor", email="refauthor@example.com")
+        self.original = Post.objects.create(user=self.author, title="Original", content="First version")
+        response = self.client.post(reverse('post-share-create', kwargs={'post_id': self.original.pk}), {'username': 'refsharer', 'share_comment': 'Look'}, format='json')
+        self.shared = Post.objects.get(pk=response.data['data']['id'])
+    
+    def test_edits_to_the_original_reach_shares(self):
+        # test the shared post renders the original's latest title and content
+        self.original.content = "Second version"
+        self.original.save()
+        data = self.client.get(reverse('post-detail', kwargs={'pk': self.shared.pk})).data['data']
+        self.assertEqual(data['content'], "Second version")
+        self.assertEqual(data['original_content'], "Second version")
+        self.assertEqual(data['title'], "Shared: Original")
+        self.assertEqual(data['original_author'], "refauthor")
+        self.assertEqual(data['share_comment'], "Look")
+    
+    def test_compaction_round_trip(self):
+        # test the data migration helpers drop and restore copied content
+        from .originals import compact_shared_posts, expand_shared_posts
+        self.assertEqual(expand_shared_posts(Post), 1)
+        self.shared.refresh_from_db()
+        self.assertEqual((self.shared.title, self.shared.content), ("Shared: Original", "First version"))
+        self.assertEqual(compact_shared_posts(Post), 1)
+        self.assertEqual(compact_shared_posts(Post), 0)
+        self.shared.refresh_from_db()
+        self.assertEqual((self.shared.title, self.shared.content), ("", ""))
+    
+    def test_storage_benchmark(self):
+        # test the viral-post benchmark reports the copied text as saved
+        from socialhubapi.benchmark import measure_share_storage
+        results = measure_share_storage(shares=5, content_chars=100)
+        self.assertEqual(results['compacted_rows'], 5)
+        self.assertEqual(results['chars_after'], 0)
+        self.assertEqual(results['chars_before'], 5 * (100 + len('Shared: Viral post')))
+
+
+class DataTransferTest(TestCase):
+    # test export_data and import_data round trips and reference resolution
+
+    def setUp(self):
+        # setup a small graph with every exported table
+        import shutil
+        import tempfile
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.alice = User.objects.create(username="alice_io", email="alice_io@example.com", bio="Hi")
+        self.bob = User.objects.create(username="bob_io", email="bob_io@example.com")
+        self.post = Post.objects.create(user=self.alice, title="Exported", content="Body")
+        self.repost = Post.objects.create(user=self.bob, title="", content="", post_type='shared', original_post=self.post, share_comment="Nice")
+        Like.objects.create(post=self.post, user=self.bob)
+        first = Comment.objects.create(post=self.post, user=self.bob, content="First")
+        Comment.objects.create(post=self.post, user=self.alice, parent=first, content="Reply")
+        Share.objects.create(post=self.post, user=self.bob)
+        Follow.objects.create(follower=self.bob, following=self.alice)
+
+    def _run(self, command, *args):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command(command, self.directory, *args, stdout=out)
+        return out.getvalue()
+
+    def _snapshot(self):
+        return {
+            'users': list(User.objects.order_by('username').values_list('username', 'email', 'bio', 'created_at')),
+            'posts': list(Post.objects.order_by('pk').values_list('pk', 'user__username', 'post_type', 'original_post_id', 'share_comment', 'created_datetime', 'likes_count', 'comments_count', 'shares_count')),
+            'likes': list(Like.objects.values_list('post_id', 'user__username', 'created_datetime')),
+            'comments': list(Comment.objects.values_list('pk', 'post_id', 'parent_id', 'path', 'depth', 'replies_count', 'user__username', 'content', 'created_datetime')),
+            'shares': list(Share.objects.values_list('post_id', 'user__username', 'created_datetime')),
+            'follows': list(Follow.objects.values_list('follower__username', 'following__username', 'created_at')),
+        }
+
+    def test_round_trip(self):
+        # test every format restores the same rows, ids, threads, timestamps and counters
+        from pathlib import Path
+        for fmt in ('ndjson', 'csv'):
+            with self.subTest(fmt=fmt):
+                before = self._snapshot()
+                output = self._run('export_data', '--format', fmt)
+                self.assertIn('exported 9 rows', output)
+                User.objects.all().delete()
+                self.assertEqual(Post.objects.count(), 0)
+
+                output = self._run('import_data')
+                self.assertIn('imported 9 rows', output)
+                self.assertEqual(self._snapshot(), before)
+                self.assertFalse(User.objects.get(username="bob_io").has_usable_password())
+
+                # importing again leaves existing rows alone
+                self._run('import_data')
+                self.assertEqual(self._snapshot(), before)
+                for path in Path(self.directory).iterdir():
+                    path.unlink()
+
+    def test_unknown_references_are_skipped(self):
+        # test rows pointing at missing users or posts are counted and dropped
+        from pathlib import Path
+        Path(self.directory, 'likes.csv').write_text(
+            f"post,user,created_datetime\n{self.repost.pk},alice_io,\n{self.post.pk},nobody,\n999999,alice_io,\n"
+        )
+        output = self._run('import_data', '--table', 'likes')
+        self.assertIn('(0 existing, 2 skipped, 0 invalid)', output)
+        self.assertTrue(Like.objects.filter(post=self.repost, user=self.alice).exists())
+        self.assertEqual(Post.objects.get(pk=self.repost.pk).likes_count, 1)
+    
+    def test_rows_pointing_at_dropped_rows_of_the_chunk(self):
+        # test a repost of an invalid post in the same chunk is skipped instead of failing the insert
+        import json
+        from pathlib import Path
+        rows = [
+            {'id': 100, 'user': 'alice_io', 'title': '', 'content': 'No title', 'post_type': 'original'},
+            {'id': 101, 'user': 'bob_io', 'title': '', 'content': '', 'post_type': 'shared', 'original_post': 100},
+            {'id': 102, 'user': 'bob_io', 'title': '', 'content': '', 'post_type': 'shared', 'original_post': 101},
+            {'id': 103, 'user': 'alice_io', 'title': 'Kept', 'content': 'Body', 'post_type': 'original'},
+            {'id': self.post.pk, 'user': 'alice_io', 'title': 'Again', 'content': 'Body', 'post_type': 'original'},
+        ]
+        Path(self.directory, 'posts.ndjson').write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        output = self._run('import_data', '--table', 'posts')
+        self.assertIn('posts               1 rows', output)
+        self.assertIn('(1 existing, 2 skipped, 1 invalid)', output)
+        self.assertFalse(Post.objects.filter(pk__in=[100, 101, 102]).exists())
+        self.assertTrue(Post.objects.filter(pk=103).exists())
+    
+    def test_replies_to_dropped_comments_are_skipped(self):
+        # test a reply whose parent in the same chunk is invalid does not fail the insert
+        import json
+        from pathlib import Path
+        rows = [
+            {'id': 200, 'post': self.post.pk, 'user': 'bob_io', 'content': '   '},
+            {'id': 201, 'post': self.post.pk, 'parent': 200, 'user': 'alice_io', 'content': 'Reply'},
+            {'id': 202, 'post': self.post.pk, 'user': 'alice_io', 'content': 'Kept'},
+            {'id': 203, 'post': self.post.pk, 'parent': 202, 'user': 'bob_io', 'content': 'Kept reply'},
+        ]
+        Path(self.directory, 'comments.ndjson').write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        output = self._run('import_data', '--table', 'comments')
+        self.assertIn('(0 existing, 1 skipped, 1 invalid)', output)
+        self.assertEqual(set(Comment.objects.filter(pk__gte=200).values_list('pk', flat=True)), {202, 203})
+        self.assertEqual(Comment.objects.get(pk=203).depth, 1)
+
+
+class PostValidationTest(TestCase):
+    # test the plain python validation layer used by save, the serializers and bulk inserts
+
+    def setUp(self):
+        # setup test data
+        self.user = User.objects.create(username="validuser", email="validuser@example.com")
+        self.post = Post.objects.create(user=self.user, title="Valid", content="Valid content")
+
+    def test_rules_run_without_queries(self):
+        # test checking a post or comment never touches the database
+        from django.core.exceptions import ValidationError
+        from .validators import validate_comment, validate_post
+        with self.assertNumQueries(0):
+            validate_post(Post(user_id=self.user.pk, title="Fine", content="Fine"))
+            validate_comment(Comment(post_id=self.post.pk, user_id=self.user.pk, content="Fine"))
+            with self.assertRaises(ValidationError) as raised:
+                validate_post(Post(user_id=self.user.pk, title="x" * 201, content="   "))
+        self.assertEqual(set(raised.exception.message_dict), {'title', 'content'})
+
+    def test_save_validates_unless_trusted(self):
+        # test save rejects broken rows and trusted callers can opt out
+        from django.core.exceptions import ValidationError
+        with self.assertRaises(ValidationError):
+            Post(user=self.user, title="Title", content="").save()
+        with self.assertRaises(ValidationError):
+            Comment(post=self.post, user=self.user, content="c" * 1001).save()
+        Comment(post=self.post, user=self.user, content="c" * 1001).save(validate=False)
+        Post(user=self.user, post_type='shared', original_post=self.post).save()
+        self.assertEqual(Post.objects.filter(original_post=self.post).count(), 1)
+
+    def test_batch_validation(self):
+        # test the batch validators report the offending rows by index
+        from .validators import invalid_comments, invalid_posts
+        posts = [
+            Post(user=self.user, title="Fine", content="Fine"),
+            Post(user=self.user, title="", content="Fine"),
+            Post(user=self.user, post_type='shared', original_post=self.post),
+            Post(user=self.user, title="Fine", content="x" * 5001, post_type='poll'),
+        ]
+        errors = invalid_posts(posts)
+        self.assertEqual(set(errors), {1, 3})
+        self.assertEqual(set(errors[3]), {'content', 'post_type'})
+        comments = [Comment(content="Fine"), Comment(content=" "), Comment(content="y" * 1001)]
+        self.assertEqual(set(invalid_comments(comments)), {1, 2})
+
+
+@override_settings(TRENDING_WINDOW_HOURS=72, TRENDING_HALF_LIFE_HOURS=12, TRENDING_SIZE=10)
+class TrendingPostsTest(APITestCase):
+    # test the decayed trending ranking and its endpoint
+
+    def setUp(self):
+        # setup posts with fresh, old and expired interactions
+        from datetime import timedelta
+        from django.utils import timezone
+        now = timezone.now()
+        self.author = User.objects.create(username="trendauthor", email="trendauthor@example.com")
+        self.fans = [User.objects.create(username=f"trendfan{index}", email=f"trendfan{index}@example.com") for index in range(5)]
+        self.fresh = Post.objects.create(user=self.author, title="Fresh", content="Liked now")
+        self.old = Post.objects.create(user=self.author, title="Old", content="Liked two days ago")
+        self.discussed = Post.objects.create(user=self.author, title="Discussed", content="Commented now")
+        Post.objects.create(user=self.author, title="Quiet", content="No interactions")
+        for fan in self.fans[:3]:
+            Like.objects.create(post=self.fresh, user=fan)
+        for fan in self.fans:
+            Like.objects.create(post=self.old, user=fan)
+        Like.objects.filter(post=self.old).update(created_datetime=now - timedelta(hours=48))
+        Comment.objects.create(post=self.discussed, user=self.fans[0], content="Hot take")
+        Like.objects.create(post=self.discussed, user=self.fans[0])
+        Like.objects.filter(post=self.discussed).update(created_datetime=now - timedelta(hours=96))
+
+    def test_refresh_ranks_by_decayed_score(self):
+        # test likes count 1, comments 2, halved every half-life and dropped outside the window
+        from .models import TrendingPost
+        from .trending import refresh
+        self.assertEqual(refresh(), 3)
+        ranking = list(TrendingPost.objects.values_list('post_id', 'rank', 'score'))
+        self.assertEqual([(post_id, rank) for post_id, rank, _score in ranking], [(self.fresh.pk, 1), (self.discussed.pk, 2), (self.old.pk, 3)])
+        self.assertAlmostEqual(ranking[0][2], 3.0, places=2)
+        self.assertAlmostEqual(ranking[1][2], 2.0, places=2)
+        self.assertAlmostEqual(ranking[2][2], 5 / 16, places=3)
+
+        # a second run replaces the table instead of appending
+        self.assertEqual(refresh(), 3)
+        self.assertEqual(TrendingPost.objects.count(), 3)
+
+    def test_scores_are_sized_by_posts_not_ids(self):
+        # test huge post ids cost one slot per interacted post, merged across chunks
+        import numpy as np
+        from .trending import decayed_scores, empty_scores, merge_scores, top_posts
+        scores = empty_scores()
+        for post_ids in ([10 ** 12, 5, 10 ** 12], [5, 7]):
+            post_ids = np.array(post_ids, dtype=np.int64)
+            scores = merge_scores(scores, decayed_scores(post_ids, np.zeros(len(post_ids)), 1.0, 0.0, 3600.0))
+        self.assertEqual(scores[0].tolist(), [5, 7, 10 ** 12])
+        self.assertEqual(top_posts(scores, 2), [(5, 2.0), (10 ** 12, 2.0)])
+    
+    def test_endpoint_pages_through_the_ranking(self):
+        # test the endpoint returns ranked posts in keyset pages
+        from .trending import refresh
+        refresh()
+        url = reverse('trending-posts')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data['posts']], [self.fresh.pk, self.discussed.pk])
+        self.assertEqual([post['trending_rank'] for post in response.data['posts']], [1, 2])
+        self.assertEqual(response.data['posts'][0]['trending_score'], 3.0)
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['id'] for post in response.data['posts']], [self.old.pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_scoring_benchmark_matches_python_loop(self):
+        # test the numpy scoring ranks like the per-row loop it replaces
+        from socialhubapi.benchmark import measure_trending_scoring
+        results = measure_trending_scoring(interactions=20000, posts=500, python_sample=20000)
+        self.assertTrue(results['same_top_posts'])
+        self.assertEqual(results['interactions'], 20000)
+
+
+class ThreadedCommentsTest(APITestCase):
+    # test comment replies stored as materialized paths
+    
+    def setUp(self):
+        # setup a post with two threads: first -> reply -> nested, and second
+        self.user = User.objects.create(username="threadauthor", email="threadauthor@example.com")
+        self.post = Post.objects.create(user=self.user, title="Threads", content="Discuss")
+        self.first = Comment.objects.create(post=self.post, user=self.user, content="First")
+        self.second = Comment.objects.create(post=self.post, user=self.user, content="Second")
+        self.reply = Comment.objects.create(post=self.post, user=self.user, parent=self.first, content="Reply")
+        self.nested = Comment.objects.create(post=self.post, user=self.user, parent=self.reply, content="Nested")
+    
+    def _ids(self, response):
+        return [comment['id'] for comment in response.data['comments']]
+    
+    def test_paths_depths_and_reply_counts(self):
+        # test replies extend their parent's path and bump its reply count
+        from .threads import segment
+        self.assertEqual(self.nested.path, segment(self.first.pk) + segment(self.reply.pk) + segment(self.nested.pk))
+        self.assertEqual([self.first.depth, self.reply.depth, self.nested.depth], [0, 1, 2])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.replies_count, 1)
+        
+        self.nested.delete()
+        self.reply.refresh_from_db()
+        self.assertEqual(self.reply.replies_count, 0)
+    
+    def test_list_returns_threads_depth_first(self):
+        # test replies follow their parent and max_depth trims the tree
+        url = reverse('post-comments-list', kwargs={'post_id': self.post.id})
+        response = self.client.get(url, {'page_size': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._ids(response), [self.first.pk, self.reply.pk, self.nested.pk, self.second.pk])
+        self.assertEqual(response.data['comments'][1]['parent'], self.first.pk)
+        self.assertEqual(response.data['comments'][0]['replies_count'], 1)
+        
+        response = self.client.get(url, {'page_size': 10, 'max_depth': 0})
+        self.assertEqual(self._ids(response), [self.first.pk, self.second.pk])
+        response = self.client.get(url, {'max_depth': 'deep'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_replies_page_through_a_subtree(self):
+        # test the replies endpoint returns one subtree in keyset pages
+        url = reverse('comment-replies', kwargs={'post_id': self.post.id, 'comment_id': self.first.id})
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._ids(response), [self.reply.pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self._ids(response), [self.nested.pk])
+        self.assertIsNone(response.data['next'])
+        
+        response = self.client.get(url, {'page_size': 10, 'max_depth': 0})
+        self.assertEqual(self._ids(response), [self.reply.pk])
+        url = reverse('comment-replies', kwargs={'post_id': self.post.id, 'comment_id': self.second.id})
+        self.assertEqual(self._ids(self.client.get(url, {'page_size': 10})), [])
+    
+    def test_unplaced_comment_has_no_replies_page(self):
+        # test a comment still waiting for rebuild_paths is not treated as the root of every thread
+        Comment.objects.filter(pk=self.second.pk).update(path='')
+        url = reverse('comment-replies', kwargs={'post_id': self.post.id, 'comment_id': self.second.id})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_reply_through_the_api(self):
+        # test replies must stay on the parent's post
+        url = reverse('post-comment', kwargs={'post_id': self.post.id})
+        response = self.client.post(url, {'user': 'replier', 'content': 'Agreed', 'parent': self.second.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['depth'], 1)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.replies_count, 1)
+        
+        other = Post.objects.create(user=self.user, title="Other", content="Elsewhere")
+        url = reverse('post-comment', kwargs={'post_id': other.id})
+        response = self.client.post(url, {'user': 'replier', 'content': 'Lost', 'parent': self.second.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data['errors'])
+    
+    def test_rebuild_places_bulk_inserted_replies(self):
+        # test rebuild_paths and repair_reply_counts fix rows inserted without save()
+        from .threads import rebuild_paths, repair_reply_counts
+        late = Comment.objects.bulk_create([Comment(post=self.post, user=self.user, parent=self.nested, content="Late")])[0]
+        self.assertEqual(rebuild_paths(Comment), 1)
+        repair_reply_counts(Comment)
+        late.refresh_from_db()
+        self.nested.refresh_from_db()
+        self.assertEqual((late.depth, late.path[:len(self.nested.path)]), (3, self.nested.path))
+        self.assertEqual(self.nested.replies_count, 1)
+
+
+@override_settings(THROTTLE_ENABLED=True, THROTTLE_RATES={
+    'posts': '30/min', 'comments': '2/min', 'interactions': '120/min', 'follows': '60/min', 'search': '1/min',
+})
+class ThrottleTest(APITestCase):
+    # test the token-bucket throttles of the write and search endpoints
+    
+    def setUp(self):
+        # setup an empty bucket store and a post to comment on
+        from django.core.cache import caches
+        caches['throttle'].clear()
+        self.user = User.objects.create(username="throttled", email="throttled@example.com")
+        self.post = Post.objects.create(user=self.user, title="Busy", content="Everyone comments here")
+    
+    def test_bucket_refills_one_request_per_interval(self):
+        # test a 2/min bucket admits a burst of 2, then one request every 30 seconds
+        from socialhubapi.throttling import consume
+        self.assertEqual([consume('unit', '2/min', now=1000.0) for _ in range(3)], [0.0, 0.0, 30.0])
+        self.assertEqual(consume('unit', '2/min', now=1029.0), 1.0)
+        self.assertEqual(consume('unit', '2/min', now=1030.0), 0.0)
+        self.assertEqual(consume('other', '2/min', now=1030.0), 0.0)
+    
+    def test_busy_bucket_fails_closed(self):
+        # test a request that cannot lock its bucket is rejected, not admitted for free
+        from django.core.cache import caches
+        from socialhubapi.throttling import consume
+        caches['throttle'].add('throttle:unit:lock', 1, timeout=1)
+        self.assertEqual(consume('unit', '2/min', now=1000.0), 30.0)
+        caches['throttle'].delete('throttle:unit:lock')
+        self.assertEqual(consume('unit', '2/min', now=1000.0), 0.0)
+    
+    def test_writes_get_429_with_retry_after(self):
+        # test the third comment from one client is rejected until the bucket refills
+        url = reverse('post-comment', kwargs={'post_id': self.post.id})
+        for _ in range(2):
+            response = self.client.post(url, {'user': 'chatty', 'content': 'Again'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {'user': 'chatty', 'content': 'Again'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        
+        # another client has its own bucket, and reads are not throttled
+        response = self.client.post(url, {'user': 'quiet', 'content': 'Hi'}, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(reverse('post-comments-list', kwargs={'post_id': self.post.id})).status_code, status.HTTP_200_OK)
+    
+    def test_forwarded_for_cannot_pick_a_bucket(self):
+        # test a spoofed X-Forwarded-For does not give anonymous clients fresh buckets
+        url = reverse('post-comment', kwargs={'post_id': self.post.id})
+        statuses = [
+            self.client.post(url, {'user': 'spoofer', 'content': 'Hi'}, format='json', HTTP_X_FORWARDED_FOR=f'203.0.113.{index}').status_code
+            for index in range(4)
+        ]
+        self.assertEqual(statuses, [201, 201, 429, 429])
+    
+    def test_authenticated_users_have_their_own_buckets(self):
+        # test buckets follow the user, not the shared address
+        url = reverse('post-comment', kwargs={'post_id': self.post.id})
+        other = User.objects.create(username="throttled2", email="throttled2@example.com")
+        for user in (self.user, other):
+            self.client.force_authenticate(user)
+            statuses = [self.client.post(url, {'user': user.username, 'content': 'Hey'}, format='json').status_code for _ in range(3)]
+            self.assertEqual(statuses, [201, 201, 429])
+    
+    def test_only_searches_are_throttled_on_the_user_list(self):
+        # test the user list is throttled when it runs a search
+        url = reverse('users:user-list')
+        self.assertEqual(self.client.get(url, {'search': 'thr'}).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url, {'search': 'thr'}).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+
+@override_settings(CONDITIONAL_REQUESTS_ENABLED=True, TIMELINE_FANOUT_MODE='sync')
+class ConditionalRequestTest(APITestCase):
+    # test ETag / Last-Modified validators and 304 responses
+    
+    def setUp(self):
+        # setup test data
+        from django.core.cache import caches
+        self.cache = caches['responses']
+        self.cache.clear()
+        self.user = User.objects.create(username="etagged", email="etagged@example.com")
+        self.post = Post.objects.create(user=self.user, title="Tagged", content="Body")
+        self.detail = reverse('post-detail', kwargs={'pk': self.post.pk})
+    
+    def tearDown(self):
+        self.cache.clear()
+    
+    def test_matching_etag_is_answered_without_queries(self):
+        # test If-None-Match short-circuits to 304 before the view runs
+        first = self.client.get(self.detail)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertTrue(first['ETag'].startswith('W/"'))
+        self.assertIn('Last-Modified', first)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.content, b'')
+    
+    def test_if_modified_since(self):
+        # test an unchanged post is not modified since its Last-Modified
+        first = self.client.get(self.detail)
+        response = self.client.get(self.detail, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_writes_change_the_etag(self):
+        # test likes and comments revalidate the post and its comments
+        comments = reverse('post-comments-list', kwargs={'post_id': self.post.pk})
+        post_etag = self.client.get(self.detail)['ETag']
+        comments_etag = self.client.get(comments)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(post=self.post, user=self.user)
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['likes_count'], 1)
+        self.assertEqual(self.client.get(comments, HTTP_IF_NONE_MATCH=comments_etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.user, content="New")
+        response = self.client.get(comments, HTTP_IF_NONE_MATCH=comments_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], comments_etag)
+    
+    def test_author_rename_changes_the_etag(self):
+        # test posts, shares and comment lists rendering the old username are revalidated
+        comments = reverse('post-comments-list', kwargs={'post_id': self.post.pk})
+        Comment.objects.create(post=self.post, user=self.user, content="Mine")
+        post_etag = self.client.get(self.detail)['ETag']
+        comments_etag = self.client.get(comments)['ETag']
+        author = User.objects.get(pk=self.user.pk)
+        author.username = "renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        response = self.client.get(self.detail, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['username'], 'renamed')
+        self.assertEqual(self.client.get(comments, HTTP_IF_NONE_MATCH=comments_etag).status_code, status.HTTP_200_OK)
+    
+    def test_etag_depends_on_query_and_credentials(self):
+        # test another page or another viewer does not reuse the validator
+        comments = reverse('post-comments-list', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(comments)['ETag']
+        self.assertNotEqual(self.client.get(comments, {'page_size': 5})['ETag'], etag)
+        self.assertNotEqual(self.client.get(comments, HTTP_X_USERNAME='etagged')['ETag'], etag)
+    
+    def test_profile_revalidates_after_follow(self):
+        # test a new follower changes the profile etag
+        url = reverse('users:user-profile', kwargs={'username': 'etagged'})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        follower = User.objects.create(username="follower", email="follower@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=follower, following=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['followers_count'], 1)
+    
+    def test_missing_objects_carry_no_validators(self):
+        # test a 404 cannot be revalidated once the object exists
+        response = self.client.get(reverse('users:user-profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', response)
+    
+    @override_settings(CONDITIONAL_REQUESTS_ENABLED=False)
+    def test_disabled(self):
+        # test no validators are sent when conditional requests are off
+        self.assertNotIn('ETag', self.client.get(self.detail))
+
+
+class UsernameBenchmarkTest(TransactionTestCase):
+    # new usernames are cached on commit, which TestCase never reaches
+    
+    @override_settings(USERNAME_CACHE_TIMEOUT=60)
+    def test_username_resolution_benchmark(self):
+        # test the resolver creates every name once and then answers from the caches
+        from socialhubapi.benchmark import measure_username_resolution
+        results = measure_username_resolution(distinct=20, requests=100)
+        self.assertEqual(results['get_or_create']['users'], 20)
+        self.assertEqual(results['resolver']['users'], 20)
+        self.assertGreaterEqual(results['get_or_create']['queries'], 100)
+        self.assertLess(results['resolver']['queries'], 100)
+
+
+@override_settings(TIMELINE_FANOUT_MODE='sync', TIMELINE_CELEBRITY_THRESHOLD=3)
+class HomeTimelineTest(APITestCase):
+    # test the materialized home feed and its fan-out on write
+    
+    def setUp(self):
+        # setup test data
+        cache.clear()
+        self.reader = User.objects.create(username="reader", email="reader@example.com")
+        self.author = User.objects.create(username="author", email="author@example.com")
+        self.stranger = User.objects.create(username="stranger", email="stranger@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=self.reader, following=self.author)
+        self.client.force_authenticate(user=self.reader)
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def feed_titles(self, **params):
+        response = self.client.get(reverse('home-feed'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data['posts']]
+    
+    def test_new_post_fans_out_to_followers(self):
+        # test a followed author's post reaches the reader and a stranger's does not
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.author, title="Followed", content="Body")
+            Post.objects.create(user=self.stranger, title="Unrelated", content="Body")
+        self.assertTrue(TimelineEntry.objects.filter(user=self.author, post=post).exists())
+        self.assertEqual(self.feed_titles(), ["Followed"])
+    
+    def test_follow_backfills_and_unfollow_prunes(self):
+        # test following copies recent posts in and unfollowing removes them
+        Post.objects.create(user=self.stranger, title="Older", content="Body")
+        with self.captureOnCommitCallbacks(execute=True):
+            follow = Follow.objects.create(follower=self.reader, following=self.stranger)
+        self.assertEqual(self.feed_titles(), ["Older"])
+        with self.captureOnCommitCallbacks(execute=True):
+            follow.delete()
+        self.assertEqual(self.feed_titles(), [])
+    
+    def test_celebrity_posts_are_merged_on_read(self):
+        # test authors above the threshold skip fan-out but still show up in the feed
+        for index in range(3):
+            fan = User.objects.create(username=f"fan{index}", email=f"fan{index}@example.com")
+            Follow.objects.create(follower=fan, following=self.stranger)
+        Follow.objects.create(follower=self.reader, following=self.stranger)
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.stranger, title="Celebrity", content="Body")
+        self.assertEqual(TimelineEntry.objects.filter(post__title="Celebrity").count(), 1)
+        self.assertEqual(self.feed_titles(), ["Celebrity"])
+    
+    def test_pages_merge_entries_and_celebrity_posts(self):
+        # test cursor pages interleave both sources newest first, each post once, forwards and back
+        from datetime import timedelta
+        from django.utils import timezone
+        for index in range(3):
+            fan = User.objects.create(username=f"fan{index}", email=f"fan{index}@example.com")
+            Follow.objects.create(follower=fan, following=self.stranger)
+        Follow.objects.create(follower=self.reader, following=self.stranger)
+        cache.clear()
+        start = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(6):
+                post = Post.objects.create(user=self.author if index % 2 else self.stranger, title=f"Post {index}", content="Body")
+                Post.objects.filter(pk=post.pk).update(created_datetime=start + timedelta(minutes=index))
+                TimelineEntry.objects.filter(post=post).update(created_datetime=start + timedelta(minutes=index))
+        # an entry delivered before the author became a celebrity overlaps the pulled posts
+        TimelineEntry.objects.create(user=self.reader, post=Post.objects.get(title="Post 4"), created_datetime=start + timedelta(minutes=4))
+        
+        titles, pages = [], []
+        response = self.client.get(reverse('home-feed'), {'page_size': 2})
+        while True:
+            pages.append(response)
+            titles += [post['title'] for post in response.data['posts']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(titles, [f"Post {index}" for index in range(5, -1, -1)])
+        back = self.client.get(pages[-1].data['previous'])
+        self.assertEqual([post['title'] for post in back.data['posts']], ["Post 3", "Post 2"])
+        response = self.client.get(reverse('home-feed'), {'page_size': 2, 'include_total': 'exact'})
+        self.assertEqual(response.data['page_info']['total_posts'], 6)
+        self.assertEqual(self.feed_titles(batch_size=4, batch_number=1), ["Post 1", "Post 0"])
+    
+    def test_feed_is_always_paginated(self):
+        # test a request without parameters gets the first cursor page
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(12):
+                Post.objects.create(user=self.author, title=f"Post {index}", content="Body")
+        response = self.client.get(reverse('home-feed'))
+        self.assertEqual(len(response.data['posts']), 10)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['posts'][0]['title'], "Post 11")
+    
+    def test_feed_requires_authentication(self):
+        # test anonymous users cannot read a home feed
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('home-feed'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_rebuild_command_restores_feed(self):
+        # test rebuild_timelines recreates deleted entries
+        from django.core.management import call_command
+        from io import StringIO
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(user=self.author, title="Followed", content="Body")
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', username=['reader'], stdout=StringIO())
+        self.assertEqual(self.feed_titles(), ["Followed"])
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True, TIMELINE_FANOUT_MODE='sync')
+class ResponseCacheTest(APITestCase):
+    # test anonymous responses are cached and invalidated by model signals
+    
+    def setUp(self):
+        # setup test data
+        from django.core.cache import caches
+        self.cache = caches['responses']
+        self.cache.clear()
+        self.user = User.objects.create(username="cached", email="cached@example.com")
+        self.post = Post.objects.create(user=self.user, title="Cached", content="Body")
+    
+    def tearDown(self):
+        self.cache.clear()
+    
+    def test_second_anonymous_request_is_a_hit(self):
+        # test the same list with reordered params is served from the cache
+        from socialhubapi import response_cache
+        first = self.client.get('/careers/?page_size=5&include_total=exact')
+        second = self.client.get('/careers/?include_total=exact&page_size=5')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(response_cache.stats()['hits'], 1)
+    
+    def test_authenticated_requests_bypass_cache(self):
+        # test requests carrying credentials always reach the view
+        self.client.force_authenticate(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer token')
+        self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        response = self.client.get(reverse('post-detail', kwargs={'pk': self.post.pk}))
+        self.assertNotIn('X-Cache', response)
+    
+    def test_like_invalidates_post_and_list(self):
+        # test a new like is visible on the next anonymous read
+        detail = reverse('post-detail', kwargs={'pk': self.post.pk})
+        self.client.get(detail)
+        self.assertEqual(self.client.get(detail)['X-Cache'], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            Like.objects.create(post=self.post, user=self.user)
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['data']['likes_count'], 1)
+    
+    def test_comment_invalidates_only_its_post(self):
+        # test other posts keep their cached comment lists
+        other = Post.objects.create(user=self.user, title="Other", content="Body")
+        comments = reverse('post-comments-list', kwargs={'post_id': self.post.pk})
+        other_comments = reverse('post-comments-list', kwargs={'post_id': other.pk})
+        self.client.get(comments)
+        self.client.get(other_comments)
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, user=self.user, content="New")
+        self.assertEqual(self.client.get(comments)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(other_comments)['X-Cache'], 'HIT')
+    
+    def test_follow_invalidates_public_stats(self):
+        # test follower counts refresh after a follow
+        fan = User.objects.create(username="fan", email="fan@example.com")
+        stats = reverse('users:public-user-stats', kwargs={'username': 'cached'})
+        self.assertEqual(self.client.get(stats).json()['followers_count'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(follower=fan, following=self.user)
+        self.assertEqual(self.client.get(stats).json()['followers_count'], 1)
+    
+    def test_errors_are_not_cached(self):
+        # test 404 responses are recomputed
+        self.client.get(reverse('post-detail', kwargs={'pk': 999999}))
+        response = self.client.get(reverse('post-detail', kwargs={'pk': 999999}))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+
+@override_settings(STREAM_CHUNK_SIZE=2)
+class StreamingListTest(APITestCase):
+    # test unpaginated lists can be streamed with the same envelope
+    
+    def setUp(self):
+        # setup test data
+        self.user = User.objects.create(username="streamer", email="streamer@example.com")
+        self.posts = [
+            Post.objects.create(user=self.user, title=f"Ação {index}", content="Body")
+            for index in range(5)
+        ]
+        Like.objects.create(post=self.posts[1], user=self.user)
+        Comment.objects.create(post=self.posts[1], user=self.user, content="First")
+    
+    def stream_json(self, url):
+        import json
+        response = self.client.get(url, {'stream': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+    
+    def test_streamed_post_list_matches_buffered(self):
+        # test keys, order and values are identical to the buffered response across chunks
+        import json
+        self.client.force_authenticate(user=self.user)
+        buffered = json.loads(self.client.get(reverse('post-list')).content)
+        streamed = self.stream_json(reverse('post-list'))
+        self.assertEqual(list(streamed), ['message', 'posts', 'total_posts'])
+        self.assertEqual(streamed, buffered)
+        self.assertEqual(streamed['total_posts'], 5)
+        self.assertTrue(streamed['posts'][3]['is_liked'])
+    
+    def test_streamed_child_lists(self):
+        # test likes, comments, shares and users stream their own labels
+        post_id = self.posts[1].pk
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.stream_json(reverse('post-likes-list', kwargs={'post_id': post_id}))['total_likes'], 1)
+        self.assertEqual(self.stream_json(reverse('post-comments-list', kwargs={'post_id': post_id}))['comments'][0]['content'], "First")
+        self.assertEqual(self.stream_json(reverse('post-shares-list', kwargs={'post_id': post_id}))['shares'], [])
+        self.assertEqual(self.stream_json(reverse('users:user-list'))['total_users'], 1)
+    
+    def test_paginated_requests_ignore_stream(self):
+        # test stream only applies when no pagination parameters are sent
+        response = self.client.get(reverse('post-list'), {'stream': 'true', 'page_size': 2})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data['posts']), 2)
+
+
+class BulkInteractionTest(APITestCase):
+    # test the bulk like/share endpoint
+    
+    def setUp(self):
+        # setup test data
+        self.user = User.objects.create(username="offline", email="offline@example.com")
+        self.author = User.objects.create(username="author", email="author@example.com")
+        self.posts = [Post.objects.create(user=self.author, title=f"Post {index}", content="Body") for index in range(3)]
+        Like.objects.create(post=self.posts[2], user=self.user)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('bulk-interactions')
+    
+    def operations(self, *items):
+        return {'operations': [{'post_id': post_id, 'action': action} for post_id, action in items]}
+    
+    def test_mixed_operations_return_per_item_results(self):
+        # test each operation gets its own status and counters follow
+        first, second, third = self.posts
+        response = self.client.post(self.url, self.operations(
+            (first.pk, 'like'), (first.pk, 'like'), (second.pk, 'share'),
+            (third.pk, 'unlike'), (third.pk, 'unlike'), (999999, 'like'),
+        ), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in response.data['results']], [
+            'liked', 'already_liked', 'shared', 'unliked', 'not_liked', 'post_not_found',
+        ])
+        self.assertEqual(response.data['summary']['liked'], 1)
+        for post in self.posts:
+            post.refresh_from_db()
+        self.assertEqual((first.likes_count, second.shares_count, third.likes_count), (1, 1, 0))
+        self.assertTrue(Like.objects.filter(post=first, user=self.user).exists())
+        self.assertFalse(Like.objects.filter(post=third, user=self.user).exists())
+    
+    def test_net_changes_use_constant_queries(self):
+        # test like/unlike on many posts costs the same number of queries as on a few
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        many = [Post.objects.create(user=self.author, title=f"Extra {index}", content="Body") for index in range(20)]
+        with CaptureQueriesContext(connection) as few_queries:
+            self.client.post(self.url, self.operations(*[(post.pk, 'like') for post in self.posts[:2]]), format='json')
+        with CaptureQueriesContext(connection) as many_queries:
+            self.client.post(self.url, self.operations(*[(post.pk, 'like') for post in many]), format='json')
+        self.assertEqual(len(few_queries), len(many_queries))
+        self.assertEqual(Like.objects.filter(user=self.user).count(), 23)
+    
+    def test_concurrent_duplicate_is_not_counted_twice(self):
+        # test a like inserted by another request between the state read and the bulk insert
+        from unittest import mock
+        from django.db.models import F
+        post = self.posts[0]
+        bulk_create = Like.objects.bulk_create
+        
+        def racing(objs, **kwargs):
+            # the other request has committed its like and its counter increment
+            bulk_create([Like(post=post, user=self.user)])
+            Post.objects.filter(pk=post.pk).update(likes_count=F('likes_count') + 1)
+            return bulk_create(objs, **kwargs)
+        
+        with mock.patch.object(Like.objects, 'bulk_create', side_effect=racing):
+            response = self.client.post(self.url, self.operations((post.pk, 'like'), (self.posts[1].pk, 'like')), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Like.objects.filter(post=post).count(), 1)
+        post.refresh_from_db()
+        self.posts[1].refresh_from_db()
+        self.assertEqual((post.likes_count, self.posts[1].likes_count), (1, 1))
+    
+    def test_like_then_unlike_cancels_out(self):
+        # test operations on the same post are replayed in order
+        post = self.posts[0]
+        response = self.client.post(self.url, self.operations((post.pk, 'like'), (post.pk, 'unlike')), format='json')
+        self.assertEqual([result['status'] for result in response.data['results']], ['liked', 'unliked'])
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, 0)
+        self.assertFalse(Like.objects.filter(post=post, user=self.user).exists())
+    
+    def test_invalid_items_do_not_reject_batch(self):
+        # test a malformed item is reported while the others are applied
+        response = self.client.post(self.url, {'operations': [
+            {'post_id': self.posts[0].pk, 'action': 'like'},
+            {'post_id': self.posts[1].pk, 'action': 'explode'},
+        ]}, format='json')
+        self.assertEqual(response.data['results'][0]['status'], 'liked')
+        self.assertEqual(response.data['results'][1]['status'], 'invalid')
+        self.assertIn('action', response.data['results'][1]['errors'])
+    
+    def test_empty_or_anonymous_requests_rejected(self):
+        # test an empty list is a bad request and credentials are required
+        self.assertEqual(self.client.post(self.url, {'operations': []}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.post(self.url, self.operations((self.posts[0].pk, 'like')), format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SearchTest(APITestCase):
+    # test ranked full-text search over posts, comments and users
+    
+    def setUp(self):
+        # setup test data
+        self.user = User.objects.create(username="gardener", email="gardener@example.com", first_name="Rosa", bio="Loves tomatoes")
+        self.other = User.objects.create(username="cook", email="cook@example.com")
+        self.title_match = Post.objects.create(user=self.other, title="Tomato harvest", content="Summer notes")
+        self.content_match = Post.objects.create(user=self.other, title="Summer notes", content="Picked a tomato today")
+        Post.objects.create(user=self.other, title="Unrelated", content="Nothing to see")
+        Comment.objects.create(post=self.content_match, user=self.user, content="Which tomato variety?")
+        self.url = reverse('search')
+    
+    def test_ranks_title_matches_first(self):
+        # test prefix matching across title and content with title weighted higher
+        response = self.client.get(self.url, {'q': 'tomat', 'type': 'posts'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([post['id'] for post in response.data['posts']], [self.title_match.id, self.content_match.id])
+        self.assertEqual(response.data['batch_info']['total_posts'], 2)
+        self.assertNotIn('comments', response.data)
+    
+    def test_all_types_and_every_word_required(self):
+        # test the default type searches every index and all words must match
+        response = self.client.get(self.url, {'q': 'tomato variety'})
+        self.assertEqual(response.data['posts'], [])
+        self.assertEqual(len(response.data['comments']), 1)
+        self.assertEqual(response.data['users'], [])
+        response = self.client.get(self.url, {'q': 'rosa'})
+        self.assertEqual([user['username'] for user in response.data['users']], ['gardener'])
+    
+    def test_index_follows_updates_and_deletes(self):
+        # test edits and deletions are reflected without a rebuild
+        self.title_match.title = "Cucumber harvest"
+        self.title_match.save()
+        self.content_match.delete()
+        response = self.client.get(self.url, {'q': 'tomato', 'type': 'posts'})
+        self.assertEqual(response.data['posts'], [])
+        response = self.client.get(self.url, {'q': 'cucumber', 'type': 'posts'})
+        self.assertEqual(len(response.data['posts']), 1)
+    
+    def test_batches(self):
+        # test batch_size and batch_number page through ranked results
+        first = self.client.get(self.url, {'q': 'summer', 'type': 'posts', 'batch_size': 1})
+        second = self.client.get(self.url, {'q': 'summer', 'type': 'posts', 'batch_size': 1, 'batch_number': 1})
+        self.assertEqual(first.data['batch_info']['total_posts'], 2)
+        self.assertNotEqual(first.data['posts'][0]['id'], second.data['posts'][0]['id'])
+    
+    def test_invalid_requests(self):
+        # test missing query and unknown type are rejected, punctuation only returns nothing
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(self.url, {'q': 'x', 'type': 'groups'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(self.url, {'q': '"*)', 'type': 'posts'})
+        self.assertEqual(response.data['posts'], [])
+
+
+class AsyncReadViewTest(TestCase):
+    # test the async read endpoints answer like their sync counterparts
+    
+    def setUp(self):
+        # setup test data
+        from users.authentication import issue_tokens
+        self.user = User.objects.create(username="asyncuser", email="asyncuser@example.com")
+        self.original = Post.objects.create(user=self.user, title="Original", content="Body")
+        self.shared = Post.objects.create(user=self.user, title="Shared", content="Copy", post_type='shared', original_post=self.original)
+        Like.objects.create(post=self.original, user=self.user)
+        self.token = f'Bearer {issue_tokens(self.user).access_token}'
+    
+    async def test_post_list_matches_sync_view(self):
+        # test keys and values match the drf view for cursor pages
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        sync_response = await sync_to_async(self.client.get)(reverse('post-list'), {'page_size': 1}, HTTP_AUTHORIZATION=self.token)
+        async_response = await AsyncClient().get(reverse('async-post-list'), {'page_size': 1}, headers={'Authorization': self.token})
+        self.assertEqual(async_response.status_code, 200)
+        expected, actual = sync_response.json(), async_response.json()
+        self.assertEqual(actual['posts'], expected['posts'])
+        self.assertEqual(actual['page_info'], expected['page_info'])
+        self.assertEqual(set(actual), set(expected))
+    
+    async def test_post_detail_with_viewer(self):
+        # test is_liked and the shared post fields come from preloaded data
+        from django.test import AsyncClient
+        client = AsyncClient()
+        response = await client.get(reverse('async-post-detail', kwargs={'pk': self.original.pk}), headers={'Authorization': self.token})
+        self.assertTrue(response.json()['data']['is_liked'])
+        response = await client.get(reverse('async-post-detail', kwargs={'pk': self.shared.pk}))
+        self.assertEqual(response.json()['data']['original_title'], "Original")
+        self.assertFalse(response.json()['data']['is_liked'])
+    
+    async def test_errors(self):
+        # test missing posts, bad tokens and writes are rejected like the drf views
+        from django.test import AsyncClient
+        client = AsyncClient()
+        self.assertEqual((await client.get(reverse('async-post-detail', kwargs={'pk': 999999}))).status_code, 404)
+        response = await client.get(reverse('async-post-list'), headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+        self.assertEqual((await client.post(reverse('async-post-list'))).status_code, 405)
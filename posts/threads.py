@@ -0,0 +1,54 @@
+from django.db.models import CharField, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, LPad
+
+
+# threaded comments stored as a materialized path: every comment's path is its parent's path
+# followed by its own id, zero-padded to SEGMENT_WIDTH digits, so ordering by path gives each
+# thread depth-first (replies right under their parent, siblings oldest first) and a subtree is
+# the contiguous range of paths that start with the subtree root's path
+# helpers that touch the database take the model; migration 0013 keeps its own frozen copy
+
+SEGMENT_WIDTH = 10
+MAX_DEPTH = 20
+PATH_MAX_LENGTH = SEGMENT_WIDTH * (MAX_DEPTH + 1)
+
+
+def segment(pk):
+    return str(pk).zfill(SEGMENT_WIDTH)
+
+
+def child_path(parent_path, pk):
+    return f'{parent_path}{segment(pk)}'
+
+
+def subtree_range(path):
+    # (lowest, highest) path of a subtree, for a path__range lookup the path index serves
+    # paths are digits only, so padding with 9s is an upper bound under any collation
+    if not path:
+        raise ValueError('comment has not been placed in its thread yet (see rebuild_paths)')
+    return path, path + '9' * (PATH_MAX_LENGTH - len(path))
+
+
+def _own_segment():
+    return LPad(Cast('pk', output_field=CharField()), SEGMENT_WIDTH, Value('0'))
+
+
+def rebuild_paths(model):
+    # fill path and depth of comments inserted without them (bulk_create, imports, the migration),
+    # one UPDATE per thread level; returns the number of comments placed
+    placed = model.objects.filter(path='', parent__isnull=True).update(path=_own_segment(), depth=0)
+    while True:
+        parents = model.objects.filter(pk=OuterRef('parent_id'))
+        updated = model.objects.filter(path='', parent__isnull=False).exclude(parent__path='').update(
+            path=Concat(Subquery(parents.values('path')), _own_segment(), output_field=CharField()),
+            depth=Subquery(parents.values('depth')) + 1,
+        )
+        if not updated:
+            return placed
+        placed += updated
+
+
+def repair_reply_counts(model):
+    # recompute replies_count from the rows, for comments inserted without signals
+    replies = model.objects.filter(parent=OuterRef('pk')).order_by().values('parent').annotate(total=Count('pk')).values('total')
+    return model.objects.update(replies_count=Coalesce(Subquery(replies), Value(0)))
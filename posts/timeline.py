@@ -0,0 +1,172 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, F, Q
+
+from .models import Post, TimelineEntry
+
+
+# home timelines with fan-out on write
+# new posts are copied into every follower's TimelineEntry rows after the transaction commits;
+# authors above TIMELINE_CELEBRITY_THRESHOLD followers are skipped on write and merged into
+# their followers' feeds on read instead. both paths take the celebrities from the same cached
+# snapshot (celebrity_ids), so an author crossing the threshold is either fanned out or pulled
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHUNK_SIZE = 1000
+CELEBRITY_CACHE_KEY = 'timeline:celebrity-ids'
+CELEBRITY_CACHE_TIMEOUT = 600
+
+_executor = None
+
+
+# ============================================================================
+# BACKGROUND WORKER
+# ============================================================================
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='timeline-fanout')
+    return _executor
+
+
+def _run_job(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception('timeline job %s%r failed', job.__name__, args)
+    finally:
+        # worker threads own their connections, release them after every job
+        connections.close_all()
+
+
+def enqueue(job, *args):
+    # run a timeline job once the surrounding transaction commits
+    def submit():
+        if settings.TIMELINE_FANOUT_MODE == 'sync':
+            job(*args)
+        else:
+            _get_executor().submit(_run_job, job, *args)
+    transaction.on_commit(submit)
+
+
+# ============================================================================
+# CELEBRITY ACCOUNTS
+# ============================================================================
+
+def celebrity_ids():
+    # ids of authors whose posts are merged on read, cached because the scan groups the whole follow table
+    from users.models import Follow
+
+    def compute():
+        return set(
+            Follow.objects.order_by().values('following_id')
+            .annotate(total=Count('id'))
+            .filter(total__gte=settings.TIMELINE_CELEBRITY_THRESHOLD)
+            .values_list('following_id', flat=True)
+        )
+    return cache.get_or_set(CELEBRITY_CACHE_KEY, compute, CELEBRITY_CACHE_TIMEOUT)
+
+
+def is_celebrity(user_id):
+    return user_id in celebrity_ids()
+
+
+def followed_celebrities(user_id):
+    # celebrities user_id follows, whose posts are pulled into the feed on read
+    from users.models import Follow
+    celebrities = celebrity_ids()
+    if not celebrities:
+        return []
+    return list(Follow.objects.filter(follower_id=user_id, following_id__in=celebrities).values_list('following_id', flat=True))
+
+
+# ============================================================================
+# JOBS
+# ============================================================================
+
+def fan_out_post(post_id):
+    # deliver a new post to its author and, unless the author is a celebrity, every follower
+    from users.models import Follow
+    post = Post.objects.filter(pk=post_id).values('user_id', 'created_datetime').first()
+    if post is None or post['user_id'] is None:
+        return
+    author_id = post['user_id']
+
+    _deliver(post_id, post['created_datetime'], [author_id])
+    if is_celebrity(author_id):
+        return
+
+    follower_ids = Follow.objects.filter(following_id=author_id).order_by('follower_id').values_list('follower_id', flat=True)
+    chunk = []
+    for follower_id in follower_ids.iterator(chunk_size=FANOUT_CHUNK_SIZE):
+        chunk.append(follower_id)
+        if len(chunk) >= FANOUT_CHUNK_SIZE:
+            _deliver(post_id, post['created_datetime'], chunk)
+            chunk = []
+    if chunk:
+        _deliver(post_id, post['created_datetime'], chunk)
+
+
+def _deliver(post_id, created_datetime, user_ids):
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, created_datetime=created_datetime) for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(follower_id, following_id):
+    # copy the followed author's recent posts into the follower's feed
+    if is_celebrity(following_id):
+        return
+    recent = (
+        Post.objects.filter(user_id=following_id)
+        .order_by('-created_datetime', '-id')
+        .values_list('pk', 'created_datetime')[:settings.TIMELINE_BACKFILL_LIMIT]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post_id=post_id, created_datetime=created) for post_id, created in recent],
+        ignore_conflicts=True,
+    )
+
+
+def prune(follower_id, following_id):
+    # drop the unfollowed author's posts from the follower's feed
+    TimelineEntry.objects.filter(user_id=follower_id, post__user_id=following_id).delete()
+
+
+def rebuild(user_id):
+    # recompute one feed from scratch: own posts plus the backfill of every non-celebrity followee
+    from users.models import Follow
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    for post_id, created in Post.objects.filter(user_id=user_id).order_by('-created_datetime').values_list('pk', 'created_datetime')[:settings.TIMELINE_BACKFILL_LIMIT]:
+        _deliver(post_id, created, [user_id])
+    for following_id in Follow.objects.filter(follower_id=user_id).values_list('following_id', flat=True):
+        backfill(user_id, following_id)
+
+
+# ============================================================================
+# READ PATH
+# ============================================================================
+
+# feed position of a post: TimelineEntry copies created_datetime, so entries and posts sort alike
+FEED_ORDERING = ('-created_datetime', '-post_id')
+
+
+def home_timeline(user, paginator):
+    # one page of the user's home feed: the TimelineEntry rows read in order through
+    # timeline_user_recent_idx (each joined to its post), merged with the posts of followed
+    # celebrities (fan-out on read)
+    sources = [TimelineEntry.objects.filter(user_id=user.pk).select_related('post__user')]
+    feed = Q(pk__in=TimelineEntry.objects.filter(user_id=user.pk).values('post_id'))
+    followed = followed_celebrities(user.pk)
+    if followed:
+        sources.append(Post.objects.feed().filter(user_id__in=followed).annotate(post_id=F('pk')))
+        feed |= Q(user_id__in=followed)
+    rows = paginator.paginate_merged(sources, TimelineEntry, count=lambda: Post.objects.filter(feed).count())
+    return [row.post if isinstance(row, TimelineEntry) else row for row in rows]
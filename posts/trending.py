@@ -0,0 +1,109 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import FloatField, Func
+from django.utils import timezone
+
+from socialhubapi import response_cache
+
+from .models import Post, Like, Comment, Share, TrendingPost
+
+
+# trending posts: every interaction of the last TRENDING_WINDOW_HOURS adds its weight, halved
+# every TRENDING_HALF_LIFE_HOURS of age; refresh() pulls (post id, timestamp) pairs in chunks,
+# scores them with numpy (np.exp2 over the chunk, np.bincount to sum per post) and rewrites the
+# TrendingPost table, so the endpoint only reads an indexed, precomputed ranking
+# scores are sparse (sorted post ids, sums) pairs: post ids are compressed with np.unique before
+# np.bincount, so memory follows the number of interacted posts, not the largest post id
+
+# interaction model -> weight of one interaction
+WEIGHTS = {
+    Like: 1.0,
+    Comment: 2.0,
+    Share: 3.0,
+}
+CHUNK_SIZE = 50000
+
+
+class Epoch(Func):
+    # seconds since 1970 of a datetime column as a float, computed by the database
+    output_field = FloatField()
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)'
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='((julianday(%(expressions)s) - 2440587.5) * 86400.0)', **extra_context)
+
+
+def interaction_chunks(model, since, chunk_size=CHUNK_SIZE):
+    # (post ids, epoch seconds) numpy arrays for the interactions created after since
+    # rows go straight from the cursor into numpy, skipping the orm's per-row conversion;
+    # chunked_cursor is a server-side cursor on postgresql, so memory stays at one chunk
+    queryset = model.objects.filter(created_datetime__gte=since).order_by().values_list('post_id', Epoch('created_datetime'))
+    sql, params = queryset.query.sql_with_params()
+    connection = connections[queryset.db]
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(chunk_size):
+            block = np.array(rows, dtype=np.float64)
+            yield block[:, 0].astype(np.int64), block[:, 1]
+
+
+def empty_scores():
+    return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+
+def _sum_by_id(post_ids, values):
+    # (sorted distinct post ids, sum of values per id)
+    ids, inverse = np.unique(post_ids, return_inverse=True)
+    return ids, np.bincount(inverse, weights=values, minlength=len(ids))
+
+
+def decayed_scores(post_ids, timestamps, weight, now, half_life):
+    # (post ids, per-post sums of weight * 2^(-age / half_life)) of one chunk
+    return _sum_by_id(post_ids, weight * np.exp2((timestamps - now) / half_life))
+
+
+def merge_scores(total, partial):
+    # sum two (post ids, sums) score vectors
+    return _sum_by_id(np.concatenate((total[0], partial[0])), np.concatenate((total[1], partial[1])))
+
+
+def compute_scores(now=None, chunk_size=CHUNK_SIZE):
+    # (post ids, decayed scores) of every post with recent interactions
+    now = now or timezone.now()
+    since = now - timedelta(hours=settings.TRENDING_WINDOW_HOURS)
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600.0
+    scores = empty_scores()
+    for model, weight in WEIGHTS.items():
+        for post_ids, timestamps in interaction_chunks(model, since, chunk_size):
+            scores = merge_scores(scores, decayed_scores(post_ids, timestamps, weight, now.timestamp(), half_life))
+    return scores
+
+
+def top_posts(scores, size):
+    # [(post id, score)] of the size best scores, highest first, lower id first on ties
+    ids, sums = scores
+    candidates = np.flatnonzero(sums > 0)
+    if len(candidates) > size:
+        candidates = candidates[np.argpartition(sums[candidates], -size)[-size:]]
+    ordered = candidates[np.lexsort((ids[candidates], -sums[candidates]))]
+    return [(int(ids[index]), float(sums[index])) for index in ordered]
+
+
+def refresh(now=None, chunk_size=CHUNK_SIZE):
+    # recompute the ranking and swap it in atomically; returns the number of ranked posts
+    now = now or timezone.now()
+    ranking = top_posts(compute_scores(now, chunk_size), settings.TRENDING_SIZE)
+    # posts deleted while the scores were computed drop out
+    existing = set(Post.objects.filter(pk__in=[post_id for post_id, _score in ranking]).values_list('pk', flat=True))
+    rows = [
+        TrendingPost(post_id=post_id, rank=rank, score=score, computed_at=now)
+        for rank, (post_id, score) in enumerate((entry for entry in ranking if entry[0] in existing), start=1)
+    ]
+    with transaction.atomic():
+        TrendingPost.objects.all().delete()
+        TrendingPost.objects.bulk_create(rows)
+    response_cache.invalidate('trending')
+    return len(rows)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 # explicit urls organized for better maintenance
 urlpatterns = [
@@ -13,6 +13,10 @@ urlpatterns = [
     # post detail operations - GET (retrieve), PATCH (update), DELETE (remove)
     path('<int:pk>/', views.post_detail, name='post-detail'),
     
+    # native async read endpoints (ASGI), same responses as post-list and post-detail
+    path('async/', async_views.post_list, name='async-post-list'),
+    path('async/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    
     # ============================================================================
     # ADDITIONAL SOCIAL INTERACTION ROUTES (my ideas to improve the project)
     # ============================================================================
@@ -25,6 +29,7 @@ urlpatterns = [
     # comments
     path('<int:post_id>/comment/', views.post_comment, name='post-comment'),
     path('<int:post_id>/comments/', views.post_comments_list, name='post-comments-list'),
+    path('<int:post_id>/comments/<int:comment_id>/replies/', views.comment_replies, name='comment-replies'),
     
     # shares
     path('<int:post_id>/share/', views.post_share, name='post-share'),
@@ -33,5 +38,17 @@ urlpatterns = [
     
     # post sharing system
     path('<int:post_id>/share-post/', views.post_share_create, name='post-share-create'),
+    
+    # ranked full-text search over posts, comments and users
+    path('search/', views.search_view, name='search'),
+    
+    # bulk likes and shares in one request
+    path('interactions/bulk/', views.bulk_interactions, name='bulk-interactions'),
+    
+    # home timeline - posts from followed users
+    path('feed/', views.home_feed, name='home-feed'),
+    
+    # trending posts, ranked by refresh_trending
+    path('trending/', views.trending_posts, name='trending-posts'),
 ]
 
@@ -0,0 +1,111 @@
+from django.core.exceptions import ValidationError
+
+
+# length and emptiness rules for post and comment text, in plain python: no database round trips
+# the models run them on save (instead of full_clean, whose foreign key checks cost one query per
+# relation), the serializers run them on input and bulk inserts run the batch versions below
+
+TITLE_MAX_LENGTH = 200
+CONTENT_MAX_LENGTH = 5000
+COMMENT_MAX_LENGTH = 1000
+
+EMPTY_TITLE = 'Título não pode estar vazio.'
+EMPTY_CONTENT = 'Conteúdo não pode estar vazio.'
+
+
+def _too_long(label, limit, length):
+    return f'{label} muito longo! Máximo {limit} caracteres. Atual: {length} caracteres.'
+
+
+def _text_error(value, limit, empty_message, label):
+    # message for a text value breaking the rules, None when it is valid
+    if not value or not value.strip():
+        return empty_message
+    if len(value) > limit:
+        return _too_long(label, limit, len(value))
+    return None
+
+
+def title_error(value):
+    return _text_error(value, TITLE_MAX_LENGTH, EMPTY_TITLE, 'Título')
+
+
+def content_error(value):
+    return _text_error(value, CONTENT_MAX_LENGTH, EMPTY_CONTENT, 'Conteúdo')
+
+
+def comment_error(value):
+    return _text_error(value, COMMENT_MAX_LENGTH, EMPTY_CONTENT, 'Comentário')
+
+
+# ============================================================================
+# SERIALIZER INPUT
+# ============================================================================
+
+def _clean(value, error):
+    # strip an input value and raise its rule violation (drf reports it under the field)
+    value = (value or '').strip()
+    message = error(value)
+    if message:
+        raise ValidationError(message)
+    return value
+
+
+def clean_title(value):
+    return _clean(value, title_error)
+
+
+def clean_content(value):
+    return _clean(value, content_error)
+
+
+def clean_comment(value):
+    return _clean(value, comment_error)
+
+
+# ============================================================================
+# MODEL INSTANCES
+# ============================================================================
+
+def post_errors(post):
+    # {field: message} for one post; shared posts only reference their original, so their
+    # empty title and content are expected
+    errors = {}
+    if post.post_type not in dict(type(post).POST_TYPES):
+        errors['post_type'] = f'Tipo de post inválido: {post.post_type}.'
+    if not (post.post_type == 'shared' and post.original_post_id):
+        for field, error in (('title', title_error), ('content', content_error)):
+            message = error(getattr(post, field))
+            if message:
+                errors[field] = message
+    return errors
+
+
+def validate_post(post):
+    errors = post_errors(post)
+    if errors:
+        raise ValidationError(errors)
+
+
+def validate_comment(comment):
+    message = comment_error(comment.content)
+    if message:
+        raise ValidationError({'content': message})
+
+
+# ============================================================================
+# BATCHES
+# ============================================================================
+
+def invalid_posts(posts):
+    # {index: {field: message}} for the posts of a batch that break the rules; no queries,
+    # so bulk inserts can check thousands of rows before writing any
+    return {index: errors for index, post in enumerate(posts) if (errors := post_errors(post))}
+
+
+def invalid_comments(comments):
+    # {index: {field: message}} for the comments of a batch that break the rules
+    return {
+        index: {'content': message}
+        for index, comment in enumerate(comments) if (message := comment_error(comment.content))
+    }
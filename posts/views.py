@@ -1,66 +1,56 @@
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
 
-from .models import Post, Like, Comment, Share
+from .models import Post, Like, Comment, Share, TrendingPost
 from django.conf import settings
-from .serializers import PostSerializer, PostCreateSerializer, PostUpdateSerializer, LikeSerializer, CommentSerializer, ShareSerializer, PostShareSerializer
+from .serializers import PostSerializer, PostCreateSerializer, PostUpdateSerializer, LikeSerializer, CommentSerializer, ShareSerializer, PostShareSerializer, BulkInteractionSerializer, InteractionOperationSerializer
+from users import usernames
 from users.models import User
+from users.serializers import UserListSerializer
+from socialhubapi import search
+from socialhubapi.pagination import KeysetPaginator
+from socialhubapi.response_cache import cache_anonymous_response, conditional_response
+from socialhubapi.throttling import bucket
+from socialhubapi.viewer import viewer_context
+from . import interactions, threads, timeline
+
+
+# keyset orderings, each ending on the primary key so every row has a unique position
+POST_ORDERING = ('-created_datetime', '-id')
+LIKE_ORDERING = ('-created_datetime', '-id')
+COMMENT_ORDERING = ('path', 'id')
+SHARE_ORDERING = ('-created_datetime', '-id')
+TRENDING_ORDERING = ('rank',)
 
 
 # ============================================================================
 # REQUIRED BASIC ROUTES (from specification)
 # ============================================================================
 
+@cache_anonymous_response(tags=lambda request: ['posts'])
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
-def     post_list(request):
-    # get /careers/ - list posts with optional batch system
-    # parameters: batch_size (max posts per batch), batch_number (batch number, default 0)
-    posts = Post.objects.all().order_by('-created_datetime')  # newest first
-    
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
-    
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        posts = posts[start_index:end_index]
-        
-        # calculate total posts for response info
-        total_posts = Post.objects.count()
-        total_batches = (total_posts + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response({
-            'message': 'Posts retrieved successfully',
-            'posts': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_posts': total_posts,
-                'total_batches': total_batches,
-                'posts_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all posts without batching
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response({
-            'message': 'All posts retrieved successfully',
-            'posts': serializer.data,
-            'total_posts': posts.count()
-        })
+def post_list(request):
+    # get /careers/ - list posts, newest first
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
+    paginator = KeysetPaginator(request, ordering=POST_ORDERING)
+    posts = paginator.paginate_queryset(Post.objects.feed())
+    if paginator.is_streaming:
+        return paginator.get_streaming_response(
+            'posts', posts,
+            lambda rows: PostSerializer(rows, many=True, context=viewer_context(request, posts=rows)).data,
+            'All posts retrieved successfully',
+        )
+    serializer = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts))
+    return paginator.get_response('posts', serializer.data, 'Posts retrieved successfully', 'All posts retrieved successfully')
 
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('posts')])
 def post_create(request):
     # post /careers/create/ - create post
     serializer = PostCreateSerializer(data=request.data, context={'request': request})
@@ -77,12 +67,15 @@ def post_create(request):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@conditional_response(tags=lambda request, pk: [f'post:{pk}'])
+@cache_anonymous_response(tags=lambda request, pk: [f'post:{pk}'])
 @api_view(['GET', 'PATCH', 'DELETE'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('posts')])
 def post_detail(request, pk):
     # get /careers/{id}/ - retrieve post, patch /careers/{id}/ - update post, delete /careers/{id}/ - delete post
     # supports three operations: GET (retrieve), PATCH (update), DELETE (remove)
-    post = get_object_or_404(Post, pk=pk)
+    post = get_object_or_404(Post.objects.feed(), pk=pk)
     
     if request.method == 'GET':
         serializer = PostSerializer(post, context={'request': request})
@@ -142,6 +135,7 @@ def post_detail(request, pk):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([bucket('interactions')])
 def post_like(request, post_id):
     # post /careers/{id}/like/ - like a post
     post = get_object_or_404(Post, pk=post_id)
@@ -171,6 +165,7 @@ def post_like(request, post_id):
 
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([bucket('interactions')])
 def post_unlike(request, post_id):
     # delete /careers/{id}/unlike/ - unlike a post
     post = get_object_or_404(Post, pk=post_id)
@@ -190,98 +185,39 @@ def post_unlike(request, post_id):
 
 @api_view(['GET'])
 def post_likes_list(request, post_id):
-    # get /careers/{id}/likes/ - list all likes for a post with optional batch system
-    # parameters: batch_size (max likes per batch), batch_number (batch number, default 0)
+    # get /careers/{id}/likes/ - list all likes for a post, newest first
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
     post = get_object_or_404(Post, pk=post_id)
     
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
-    
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        likes = post.likes.all()[start_index:end_index]
-        
-        # calculate total likes for response info
-        total_likes = post.likes.count()
-        total_batches = (total_likes + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = LikeSerializer(likes, many=True)
-        return Response({
-            'message': 'Likes retrieved successfully',
-            'likes': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_likes': total_likes,
-                'total_batches': total_batches,
-                'likes_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all likes without batching
-        likes = post.likes.all()
-        serializer = LikeSerializer(likes, many=True)
-        return Response({
-            'message': 'All likes retrieved successfully',
-            'likes': serializer.data,
-            'total_likes': likes.count()
-        })
+    paginator = KeysetPaginator(request, ordering=LIKE_ORDERING)
+    likes = paginator.paginate_queryset(post.likes.select_related('user'))
+    if paginator.is_streaming:
+        return paginator.get_streaming_response(
+            'likes', likes, lambda rows: LikeSerializer(rows, many=True).data, 'All likes retrieved successfully'
+        )
+    serializer = LikeSerializer(likes, many=True)
+    return paginator.get_response('likes', serializer.data, 'Likes retrieved successfully', 'All likes retrieved successfully')
 
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def user_liked_posts(request, username):
     # get /careers/user/{username}/liked-posts/ - list all posts liked by a specific user
-    # parameters: batch_size (max posts per batch), batch_number (batch number, default 0)
-    from users.models import User
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
     user = get_object_or_404(User, username=username)
     
     # get posts liked by this user
-    liked_posts = Post.objects.filter(likes__user=user).distinct().order_by('-created_datetime')
+    liked_posts = Post.objects.feed().filter(likes__user=user).distinct()
     
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
-    
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        posts = liked_posts[start_index:end_index]
-        
-        # calculate total posts for response info
-        total_posts = liked_posts.count()
-        total_batches = (total_posts + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = PostSerializer(posts, many=True, context={'request': request})
-        return Response({
-            'message': f'Posts liked by {username} retrieved successfully',
-            'username': username,
-            'posts': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_posts': total_posts,
-                'total_batches': total_batches,
-                'posts_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all liked posts without batching
-        serializer = PostSerializer(liked_posts, many=True, context={'request': request})
-        return Response({
-            'message': f'All posts liked by {username} retrieved successfully',
-            'username': username,
-            'posts': serializer.data,
-            'total_posts': liked_posts.count()
-        })
+    paginator = KeysetPaginator(request, ordering=POST_ORDERING)
+    posts = paginator.paginate_queryset(liked_posts)
+    serializer = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts))
+    return paginator.get_response(
+        'posts', serializer.data,
+        f'Posts liked by {username} retrieved successfully',
+        f'All posts liked by {username} retrieved successfully',
+        extra={'username': username}
+    )
 
 
 # ============================================================================
@@ -290,6 +226,7 @@ def user_liked_posts(request, username):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('comments')])
 def post_comment(request, post_id):
     # post /careers/{id}/comment/ - add comment to a post
     post = get_object_or_404(Post, pk=post_id)
@@ -306,7 +243,7 @@ def post_comment(request, post_id):
     data = request.data.copy()
     data['user'] = username
     
-    serializer = CommentSerializer(data=data)
+    serializer = CommentSerializer(data=data, context={'post': post})
     
     if serializer.is_valid():
         serializer.save(post=post)
@@ -320,50 +257,48 @@ def post_comment(request, post_id):
     }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _comment_page(request, comments, min_depth, msg, all_msg):
+    # optional ?max_depth= counts levels below min_depth (the top of the listed threads)
+    max_depth = request.query_params.get('max_depth')
+    if max_depth not in (None, ''):
+        try:
+            comments = comments.filter(depth__lte=min_depth + max(int(max_depth), 0))
+        except ValueError:
+            return Response({'message': 'max_depth must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    paginator = KeysetPaginator(request, ordering=COMMENT_ORDERING)
+    comments = paginator.paginate_queryset(comments.select_related('user'))
+    if paginator.is_streaming:
+        return paginator.get_streaming_response(
+            'comments', comments, lambda rows: CommentSerializer(rows, many=True).data, all_msg
+        )
+    serializer = CommentSerializer(comments, many=True)
+    return paginator.get_response('comments', serializer.data, msg, all_msg)
+
+
+@conditional_response(tags=lambda request, post_id: [f'comments:{post_id}'])
+@cache_anonymous_response(tags=lambda request, post_id: [f'comments:{post_id}'])
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def post_comments_list(request, post_id):
-    # get /careers/{id}/comments/ - list all comments for a post with optional batch system
-    # parameters: batch_size (max comments per batch), batch_number (batch number, default 0)
+    # get /careers/{id}/comments/ - list the comment threads of a post, depth-first, oldest threads first
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
+    # max_depth=0 keeps top-level comments only; replies follow their parent, so a page is ready to indent by depth
     post = get_object_or_404(Post, pk=post_id)
-    
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
-    
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        comments = post.comments.all()[start_index:end_index]
-        
-        # calculate total comments for response info
-        total_comments = post.comments.count()
-        total_batches = (total_comments + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = CommentSerializer(comments, many=True)
-        return Response({
-            'message': 'Comments retrieved successfully',
-            'comments': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_comments': total_comments,
-                'total_batches': total_batches,
-                'comments_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all comments without batching
-        comments = post.comments.all()
-        serializer = CommentSerializer(comments, many=True)
-        return Response({
-            'message': 'All comments retrieved successfully',
-            'comments': serializer.data,
-            'total_comments': comments.count()
-        })
+    return _comment_page(request, post.comments.all(), 0, 'Comments retrieved successfully', 'All comments retrieved successfully')
+
+
+@conditional_response(tags=lambda request, post_id, comment_id: [f'comments:{post_id}'])
+@cache_anonymous_response(tags=lambda request, post_id, comment_id: [f'comments:{post_id}'])
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def comment_replies(request, post_id, comment_id):
+    # get /careers/{id}/comments/{comment_id}/replies/ - every reply below a comment, depth-first
+    # one range scan over the (post, path) index; max_depth=0 keeps direct replies only
+    # a bulk-inserted comment waits for rebuild_paths with an empty path, whose range would cover the whole post
+    comment = get_object_or_404(Comment.objects.only('post_id', 'path', 'depth').exclude(path=''), pk=comment_id, post_id=post_id)
+    lowest, highest = threads.subtree_range(comment.path)
+    replies = Comment.objects.filter(post_id=post_id, path__gt=lowest, path__lte=highest)
+    return _comment_page(request, replies, comment.depth + 1, 'Replies retrieved successfully', 'All replies retrieved successfully')
 
 
 # ============================================================================
@@ -371,6 +306,7 @@ def post_comments_list(request, post_id):
 # ============================================================================
 
 @api_view(['POST'])
+@throttle_classes([bucket('posts')])
 def post_share(request, post_id):
     # post /careers/{id}/share/ - share a post
     post = get_object_or_404(Post, pk=post_id)
@@ -383,11 +319,7 @@ def post_share(request, post_id):
         )
     
     try:
-        from users.models import User
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={'email': f'{username}@example.com'}
-        )
+        user = usernames.get_or_create_user(username)
         share, created = Share.objects.get_or_create(
             post=post, 
             user=user
@@ -413,47 +345,18 @@ def post_share(request, post_id):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def post_shares_list(request, post_id):
-    # get /careers/{id}/shares/ - list all shares for a post with optional batch system
-    # parameters: batch_size (max shares per batch), batch_number (batch number, default 0)
+    # get /careers/{id}/shares/ - list all shares for a post, newest first
+    # parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
     post = get_object_or_404(Post, pk=post_id)
     
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
-    
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        shares = post.share_actions.all()[start_index:end_index]
-        
-        # calculate total shares for response info
-        total_shares = post.share_actions.count()
-        total_batches = (total_shares + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = ShareSerializer(shares, many=True)
-        return Response({
-            'message': 'Shares retrieved successfully',
-            'shares': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_shares': total_shares,
-                'total_batches': total_batches,
-                'shares_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all shares without batching
-        shares = post.share_actions.all()
-        serializer = ShareSerializer(shares, many=True)
-        return Response({
-            'message': 'All shares retrieved successfully',
-            'shares': serializer.data,
-            'total_shares': shares.count()
-        })
+    paginator = KeysetPaginator(request, ordering=SHARE_ORDERING)
+    shares = paginator.paginate_queryset(post.share_actions.select_related('user', 'post__user'))
+    if paginator.is_streaming:
+        return paginator.get_streaming_response(
+            'shares', shares, lambda rows: ShareSerializer(rows, many=True).data, 'All shares retrieved successfully'
+        )
+    serializer = ShareSerializer(shares, many=True)
+    return paginator.get_response('shares', serializer.data, 'Shares retrieved successfully', 'All shares retrieved successfully')
 
 
 # ============================================================================
@@ -462,6 +365,7 @@ def post_shares_list(request, post_id):
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('posts')])
 def post_share_create(request, post_id):
     # post /careers/{id}/share-post/ - create a new shared post
     original_post = get_object_or_404(Post, pk=post_id)
@@ -474,24 +378,17 @@ def post_share_create(request, post_id):
     if serializer.is_valid():
         # get or create user
         username = serializer.validated_data['username']
-        from users.models import User
-        user, created = User.objects.get_or_create(
-            username=username,
-            defaults={'email': f'{username}@example.com'}
-        )
+        user = usernames.get_or_create_user(username)
         
         # create the shared post
-        shared_post = Post.objects.create(
+        # a reference to the original, its title and content are resolved on read
+        shared_post = Post(
             user=user,
-            title=f"Shared: {original_post.title}",
-            content=original_post.content,
             post_type='shared',
             original_post=original_post,
             share_comment=serializer.validated_data.get('share_comment', '')
         )
-        
-        # increment share count on original post
-        # (this will be handled by the shares_count property)
+        shared_post.save(validate=False)
         
         response_serializer = PostSerializer(shared_post, context={'request': request})
         return Response({
@@ -513,51 +410,162 @@ def user_shared_posts(request, username):
     """
     try:
         user = User.objects.get(username=username)
-        
-        # get batch parameters
-        batch_size = request.query_params.get('batch_size', None)
-        batch_number = int(request.query_params.get('batch_number', 0))
-        
-        # get posts shared by this user
-        shared_posts = Post.objects.filter(share_actions__user=user).distinct()
-        
-        if batch_size:
-            # apply batch system
-            batch_size = int(batch_size)
-            start_index = max(0, batch_number * batch_size)
-            end_index = start_index + batch_size
-            
-            posts_batch = shared_posts[start_index:end_index]
-            total_posts = shared_posts.count()
-            total_batches = (total_posts + batch_size - 1) // batch_size
-            
-            serializer = PostSerializer(posts_batch, many=True, context={'request': request})
-            
-            return Response({
-                'message': f'Posts compartilhados por {username} (lote {batch_number + 1} de {total_batches})',
-                'count': total_posts,
-                'next': f'?batch_size={batch_size}&batch_number={batch_number + 1}' if end_index < total_posts else None,
-                'previous': f'?batch_size={batch_size}&batch_number={batch_number - 1}' if batch_number > 0 else None,
-                'results': serializer.data,
-                'batch_info': {
-                    'current_batch': batch_number,
-                    'batch_size': batch_size,
-                    'total_posts': total_posts,
-                    'total_batches': total_batches,
-                    'posts_in_current_batch': len(serializer.data)
-                }
-            })
-        else:
-            # return all posts without batching
-            serializer = PostSerializer(shared_posts, many=True, context={'request': request})
-            return Response({
-                'message': f'Todos os posts compartilhados por {username}',
-                'posts': serializer.data,
-                'total_posts': shared_posts.count()
-            })
-            
     except User.DoesNotExist:
         return Response(
             {'error': 'User not found'},
             status=status.HTTP_404_NOT_FOUND
-        )
\ No newline at end of file
+        )
+    
+    # get posts shared by this user
+    shared_posts = Post.objects.feed().filter(share_actions__user=user).distinct()
+    
+    paginator = KeysetPaginator(request, ordering=POST_ORDERING)
+    posts = paginator.paginate_queryset(shared_posts)
+    serializer = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts))
+    
+    if paginator.mode == 'batch':
+        # this route has always answered batches with a count/next/previous/results envelope
+        batch_size = paginator.batch_size
+        batch_number = paginator.batch_number
+        batch_info = paginator.get_batch_info('posts', len(serializer.data))
+        return Response({
+            'message': f'Posts compartilhados por {username} (lote {batch_number + 1} de {batch_info["total_batches"]})',
+            'count': paginator.total,
+            'next': f'?batch_size={batch_size}&batch_number={batch_number + 1}' if paginator.end_index < paginator.total else None,
+            'previous': f'?batch_size={batch_size}&batch_number={batch_number - 1}' if batch_number > 0 else None,
+            'results': serializer.data,
+            'batch_info': batch_info
+        })
+    
+    return paginator.get_response(
+        'posts', serializer.data,
+        f'Posts compartilhados por {username}',
+        f'Todos os posts compartilhados por {username}'
+    )
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+SEARCH_TYPES = ('posts', 'comments', 'users')
+
+
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('search', methods=('GET',))])
+def search_view(request):
+    # get /careers/search/?q= - ranked full-text search over posts, comments and users
+    # parameters: q (required), type (posts, comments, users or all - default all), batch_size (default 10, max 100) + batch_number
+    query = (request.query_params.get('q') or '').strip()
+    if not query:
+        return Response({'message': 'Search query is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    search_type = request.query_params.get('type', 'all')
+    if search_type != 'all' and search_type not in SEARCH_TYPES:
+        return Response(
+            {'message': f"Invalid type - use one of: all, {', '.join(SEARCH_TYPES)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    types = SEARCH_TYPES if search_type == 'all' else (search_type,)
+    
+    try:
+        batch_size = min(max(int(request.query_params.get('batch_size', 10)), 1), 100)
+        batch_number = max(int(request.query_params.get('batch_number', 0)), 0)
+    except ValueError:
+        return Response({'message': 'batch_size and batch_number must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    offset = batch_number * batch_size
+    
+    body = {'message': 'Search results retrieved successfully', 'query': query}
+    batch_info = {'current_batch': batch_number, 'batch_size': batch_size}
+    
+    if 'posts' in types:
+        ids, batch_info['total_posts'] = search.ranked_search(Post, query, batch_size, offset)
+        posts = search.in_rank_order(Post.objects.feed(), ids)
+        body['posts'] = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts)).data
+    if 'comments' in types:
+        ids, batch_info['total_comments'] = search.ranked_search(Comment, query, batch_size, offset)
+        body['comments'] = CommentSerializer(search.in_rank_order(Comment.objects.select_related('user'), ids), many=True).data
+    if 'users' in types:
+        ids, batch_info['total_users'] = search.ranked_search(User, query, batch_size, offset)
+        users = search.in_rank_order(User.objects.all(), ids)
+        body['users'] = UserListSerializer(users, many=True, context=viewer_context(request, users=users)).data
+    
+    body['batch_info'] = batch_info
+    return Response(body)
+
+
+# ============================================================================
+# BULK INTERACTIONS
+# ============================================================================
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+@throttle_classes([bucket('interactions')])
+def bulk_interactions(request):
+    # post /careers/interactions/bulk/ - apply many like/unlike/share/unshare operations in one request
+    # body: {"operations": [{"post_id": 1, "action": "like"}, ...]}, applied in order, max 500
+    serializer = BulkInteractionSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'message': 'Falha ao processar operações. Verifique os erros abaixo:',
+            'errors': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    operations = serializer.validated_data['operations']
+    valid = []
+    results = [None] * len(operations)
+    for index, operation in enumerate(operations):
+        item = InteractionOperationSerializer(data=operation)
+        if item.is_valid():
+            valid.append((index, item.validated_data))
+        else:
+            results[index] = {'post_id': operation.get('post_id'), 'action': operation.get('action'), 'status': 'invalid', 'errors': item.errors}
+    
+    applied = interactions.apply_operations(request.user, [operation for _, operation in valid])
+    for (index, _), result in zip(valid, applied):
+        results[index] = result
+    
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+    return Response({
+        'message': 'Operations processed successfully',
+        'results': results,
+        'summary': summary
+    })
+
+
+# ============================================================================
+# HOME TIMELINE
+# ============================================================================
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def home_feed(request):
+    # get /careers/feed/ - posts from the authenticated user and the people they follow, newest first
+    # parameters: page_size + cursor (keyset pages, first page by default), or legacy batch_size + batch_number
+    paginator = KeysetPaginator(request, ordering=timeline.FEED_ORDERING, allow_all=False)
+    posts = timeline.home_timeline(request.user, paginator)
+    serializer = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts))
+    return paginator.get_response('posts', serializer.data, 'Feed retrieved successfully', 'Feed retrieved successfully')
+
+
+# ============================================================================
+# TRENDING
+# ============================================================================
+
+@cache_anonymous_response(tags=lambda request: ['trending'])
+@api_view(['GET'])
+@permission_classes([permissions.AllowAny])
+def trending_posts(request):
+    # get /careers/trending/ - hottest posts by time-decayed likes, comments and shares
+    # reads the ranking precomputed by refresh_trending; parameters: page_size + cursor (first page by default)
+    paginator = KeysetPaginator(request, ordering=TRENDING_ORDERING, allow_all=False)
+    entries = list(paginator.paginate_queryset(TrendingPost.objects.select_related('post__user')))
+    posts = [entry.post for entry in entries]
+    data = PostSerializer(posts, many=True, context=viewer_context(request, posts=posts)).data
+    for item, entry in zip(data, entries):
+        item['trending_rank'] = entry.rank
+        item['trending_score'] = round(entry.score, 4)
+    return paginator.get_response('posts', data, 'Trending posts retrieved successfully', 'Trending posts retrieved successfully')
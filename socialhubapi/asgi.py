@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialhubapi.settings')
+# tells the settings to turn off persistent database connections (see DB_CONN_MODE)
+os.environ['SERVER_GATEWAY'] = 'asgi'
 
 application = get_asgi_application()
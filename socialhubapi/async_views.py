@@ -0,0 +1,68 @@
+import functools
+
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, JsonResponse
+from rest_framework.exceptions import APIException, AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+# helpers for the native async read endpoints
+# drf views only run synchronously, so the async endpoints are plain django async views that
+# return the same JSON as their drf counterparts: same authentication headers (JWT bearer or
+# token), same error bodies, all database access through the async ORM
+
+
+def json_response(data, status=200, headers=None):
+    return JsonResponse(
+        data, status=status, headers=headers, safe=False,
+        encoder=JSONEncoder, json_dumps_params={'ensure_ascii': False},
+    )
+
+
+async def authenticate(request):
+    # resolve the Authorization header the way the drf authentication classes do, without blocking
+    from rest_framework.authtoken.models import Token
+    from users.authentication import StatelessJWTAuthentication
+
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    parts = header.split()
+    if not parts:
+        return AnonymousUser()
+
+    if parts[0] in jwt_settings.AUTH_HEADER_TYPES:
+        jwt = StatelessJWTAuthentication()
+        raw_token = jwt.get_raw_token(header.encode())
+        if raw_token is None:
+            return AnonymousUser()
+        # token claims only, like the drf views; old tokens without them load the user
+        return await jwt.aget_user(jwt.get_validated_token(raw_token))
+    elif parts[0] == 'Token' and len(parts) == 2:
+        token = await Token.objects.select_related('user').filter(key=parts[1]).afirst()
+        if token is None:
+            raise AuthenticationFailed('Invalid token.')
+        user = token.user
+    else:
+        return AnonymousUser()
+
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+def async_read_view(view):
+    # GET-only async view with request.user resolved and drf-style error responses
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405, headers={'Allow': 'GET, HEAD'})
+        try:
+            request.user = await authenticate(request)
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            headers = {'WWW-Authenticate': 'Bearer realm="api"'} if exc.status_code == 401 else None
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return json_response(detail, status=exc.status_code, headers=headers)
+        except Http404 as exc:
+            return json_response({'detail': str(exc) or 'Not found.'}, status=404)
+    return wrapper
@@ -0,0 +1,787 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+
+# query-count / latency / memory harness for the API routes
+# seed_dataset() builds a synthetic graph with power-law popularity, run_route_benchmarks()
+# drives every route through the django test client and compare_results() turns a
+# stored baseline into a list of regressions
+
+DEFAULT_DATASET = {
+    'users': 200,
+    'posts': 1000,
+    'likes': 5000,
+    'comments': 2000,
+    'follows': 2000,
+}
+
+# about a million rows for the index benchmark
+INDEX_DATASET = {
+    'users': 20000,
+    'posts': 400000,
+    'likes': 400000,
+    'comments': 150000,
+    'follows': 30000,
+}
+
+# password of the viewer, for the login route
+BENCH_PASSWORD = 'bench-login-pass'
+
+
+# ============================================================================
+# SYNTHETIC DATASET
+# ============================================================================
+
+def zipf_weights(size, exponent=1.1):
+    # rank-based power-law weights: a few items get most of the traffic
+    return [1.0 / (rank ** exponent) for rank in range(1, size + 1)]
+
+
+def _unique_pairs(count, left, right, left_weights=None, right_weights=None, rng=None, allow_same=True):
+    # sample up to count distinct (left, right) pairs
+    pairs = set()
+    attempts = 0
+    while len(pairs) < count and attempts < count * 10:
+        batch = count - len(pairs)
+        lefts = rng.choices(left, weights=left_weights, k=batch)
+        rights = rng.choices(right, weights=right_weights, k=batch)
+        for pair in zip(lefts, rights):
+            if allow_same or pair[0] != pair[1]:
+                pairs.add(pair)
+        attempts += batch
+    return list(pairs)
+
+
+def seed_dataset(users=200, posts=1000, likes=5000, comments=2000, follows=2000, seed=42, batch_size=1000):
+    # insert a synthetic dataset with bulk_create and return a summary of the hottest rows
+    from posts.counters import repair_counters
+    from posts.threads import rebuild_paths, repair_reply_counts
+    from posts.timeline import rebuild
+    from posts.trending import refresh as refresh_trending
+    from posts.models import Post, Like, Comment
+    from users.models import User, Follow
+
+    rng = random.Random(seed)
+
+    User.objects.bulk_create(
+        [User(username=f'bench{index}', email=f'bench{index}@example.com', password='!') for index in range(users)],
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(username__startswith='bench').order_by('pk').values_list('pk', flat=True))
+    author_weights = zipf_weights(len(user_ids))
+
+    authors = rng.choices(user_ids, weights=author_weights, k=posts)
+    Post.objects.bulk_create(
+        [Post(user_id=author, title=f'Post {index}', content=f'Synthetic content {index}') for index, author in enumerate(authors)],
+        batch_size=batch_size,
+    )
+    # filter through the username prefix: id lists this long exceed sqlite's bound parameter limit
+    seeded_posts = Post.objects.filter(user__username__startswith='bench')
+    post_ids = list(seeded_posts.order_by('pk').values_list('pk', flat=True))
+    post_weights = zipf_weights(len(post_ids))
+
+    like_pairs = _unique_pairs(likes, post_ids, user_ids, left_weights=post_weights, rng=rng)
+    Like.objects.bulk_create([Like(post_id=post, user_id=user) for post, user in like_pairs], batch_size=batch_size)
+
+    # a quarter of the comments reply to an earlier comment, the rest start threads
+    replies = comments // 4
+    comment_posts = rng.choices(post_ids, weights=post_weights, k=comments - replies)
+    comment_users = rng.choices(user_ids, k=comments)
+    roots = Comment.objects.bulk_create(
+        [Comment(post_id=post, user_id=user, content=f'Comment {index}') for index, (post, user) in enumerate(zip(comment_posts, comment_users))],
+        batch_size=batch_size,
+    )
+    # replies go in batch by batch, each picking a parent that already has an id
+    threaded = list(roots)
+    for start in range(len(roots), comments, batch_size):
+        batch = []
+        for index, user in enumerate(comment_users[start:start + batch_size], start=start):
+            parent = rng.choice(threaded)
+            batch.append(Comment(post_id=parent.post_id, parent=parent, user_id=user, content=f'Comment {index}'))
+        threaded.extend(Comment.objects.bulk_create(batch))
+
+    follow_pairs = _unique_pairs(follows, user_ids, user_ids, right_weights=author_weights, rng=rng, allow_same=False)
+    Follow.objects.bulk_create([Follow(follower_id=a, following_id=b) for a, b in follow_pairs], batch_size=batch_size)
+
+    # bulk_create skips the counter, thread and timeline signals
+    repair_counters(seeded_posts)
+    rebuild_paths(Comment)
+    repair_reply_counts(Comment)
+    rebuild(user_ids[-1])
+    refresh_trending()
+
+    # the viewer logs in with a password and edits and deletes a post of their own
+    viewer = User.objects.get(pk=user_ids[-1])
+    viewer.set_password(BENCH_PASSWORD)
+    viewer.save()
+    own_post = Post.objects.create(user=viewer, title='Own post', content='Synthetic content of the viewer')
+
+    hot_post = seeded_posts.order_by('-likes_count', 'pk').first()
+    celebrity = User.objects.get(pk=user_ids[0])
+    liker = User.objects.filter(likes__isnull=False).order_by('pk').first() or celebrity
+    thread = Comment.objects.filter(depth=0).order_by('-replies_count', 'pk').only('post_id').first()
+    return {
+        'hot_post_id': hot_post.pk,
+        'celebrity': celebrity.username,
+        'celebrity_id': celebrity.pk,
+        'liker': liker.username,
+        'viewer_id': viewer.pk,
+        'viewer': viewer.username,
+        'own_post_id': own_post.pk,
+        'thread': (thread.post_id, thread.pk) if thread else (hot_post.pk, 0),
+        'bulk_post_ids': post_ids[:20],
+    }
+
+
+# ============================================================================
+# ROUTE TABLE
+# ============================================================================
+
+def route_table(context):
+    # (name, url name, method, url kwargs, query params / body, needs auth)
+    from users.authentication import issue_tokens
+    from users.models import User
+
+    hot = context['hot_post_id']
+    celebrity = context['celebrity']
+    thread_post, thread_comment = context['thread']
+    page = {'page_size': 20}
+    # separate refresh tokens: logging out blacklists its token
+    viewer = User.objects.get(pk=context['viewer_id'])
+    refresh, logout = str(issue_tokens(viewer)), str(issue_tokens(viewer))
+    return [
+        # posts
+        ('post-list', 'post-list', 'get', {}, page, False),
+        ('post-list-batch', 'post-list', 'get', {}, {'batch_size': 20, 'batch_number': 5}, False),
+        ('home-feed', 'home-feed', 'get', {}, page, True),
+        ('trending-posts', 'trending-posts', 'get', {}, page, False),
+        ('search', 'search', 'get', {}, {'q': 'synthetic'}, False),
+        ('post-detail', 'post-detail', 'get', {'pk': hot}, {}, False),
+        ('async-post-list', 'async-post-list', 'get', {}, page, False),
+        ('async-post-detail', 'async-post-detail', 'get', {'pk': hot}, {}, False),
+        ('post-create', 'post-create', 'post', {}, {'username': celebrity, 'title': 'Bench', 'content': 'Bench content'}, False),
+        ('post-update', 'post-detail', 'patch', {'pk': context['own_post_id']}, {'content': 'Bench edit'}, True),
+        ('post-delete', 'post-detail', 'delete', {'pk': context['own_post_id']}, {}, True),
+        # interactions
+        ('post-likes-list', 'post-likes-list', 'get', {'post_id': hot}, page, True),
+        ('post-comments-list', 'post-comments-list', 'get', {'post_id': hot}, page, False),
+        ('comment-replies', 'comment-replies', 'get', {'post_id': thread_post, 'comment_id': thread_comment}, page, False),
+        ('post-shares-list', 'post-shares-list', 'get', {'post_id': hot}, page, False),
+        ('user-liked-posts', 'user-liked-posts', 'get', {'username': context['liker']}, page, False),
+        ('user-shared-posts', 'user-shared-posts', 'get', {'username': celebrity}, page, False),
+        ('post-comment', 'post-comment', 'post', {'post_id': hot}, {'user': celebrity, 'content': 'Bench comment'}, False),
+        ('post-like', 'post-like', 'post', {'post_id': hot}, {}, True),
+        ('post-unlike', 'post-unlike', 'delete', {'post_id': hot}, {}, True),
+        ('post-share', 'post-share', 'post', {'post_id': hot}, {'username': celebrity}, True),
+        ('post-share-create', 'post-share-create', 'post', {'post_id': hot}, {'username': celebrity}, False),
+        ('bulk-interactions', 'bulk-interactions', 'post', {}, {
+            'operations': [{'post_id': post_id, 'action': 'like'} for post_id in context['bulk_post_ids']],
+        }, True),
+        # authentication
+        ('user-register', 'users:user-register', 'post', {}, {
+            'username': 'bench_register', 'email': 'bench_register@example.com',
+            'password': BENCH_PASSWORD, 'password_confirm': BENCH_PASSWORD,
+        }, False),
+        ('user-login', 'users:user-login', 'post', {}, {'username': context['viewer'], 'password': BENCH_PASSWORD}, False),
+        ('token-refresh', 'users:token-refresh', 'post', {}, {'refresh': refresh}, False),
+        ('user-logout', 'users:user-logout', 'post', {}, {'refresh': logout}, True),
+        # users
+        ('user-list', 'users:user-list', 'get', {}, page, False),
+        ('user-list-search', 'users:user-list', 'get', {}, {'search': 'bench1', 'page_size': 20}, False),
+        ('user-profile', 'users:user-profile', 'get', {'username': celebrity}, {}, False),
+        ('public-user-stats', 'users:public-user-stats', 'get', {'username': celebrity}, {}, False),
+        ('followers-list', 'users:followers-list', 'get', {'username': celebrity}, {'limit': 20}, False),
+        ('following-list', 'users:following-list', 'get', {'username': celebrity}, {'limit': 20}, False),
+        ('async-user-profile', 'users-async:user-profile', 'get', {'username': celebrity}, {}, False),
+        ('async-public-user-stats', 'users-async:public-user-stats', 'get', {'username': celebrity}, {}, False),
+        ('async-followers-list', 'users-async:followers-list', 'get', {'username': celebrity}, {'limit': 20}, False),
+        ('async-following-list', 'users-async:following-list', 'get', {'username': celebrity}, {'limit': 20}, False),
+        ('user-detail', 'users:user-detail', 'get', {}, {}, True),
+        ('user-update', 'users:user-update', 'patch', {}, {'bio': 'Bench bio'}, True),
+        ('user-stats', 'users:user-stats', 'get', {}, {}, True),
+        ('follow-suggestions', 'users:follow-suggestions', 'get', {}, {'limit': 20}, True),
+        ('follow-list', 'users:follow-list', 'get', {}, {'limit': 20}, True),
+        ('follow-create', 'users:follow-create', 'post', {}, {'following': context['celebrity_id']}, True),
+        ('unfollow-user', 'users:unfollow-user', 'delete', {'username': celebrity}, {}, True),
+    ]
+
+
+def route_resets(context):
+    # {route name: callable} putting back the row a write route consumes, run before every request
+    # of that route outside the measurement so each one does the same work as the first
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+    from posts.models import Post, Like, Share
+    from users.models import User, Follow
+
+    viewer = context['viewer_id']
+    hot = context['hot_post_id']
+
+    def restore_own_post():
+        Post.objects.get_or_create(pk=context['own_post_id'], defaults={
+            'user_id': viewer, 'title': 'Own post', 'content': 'Synthetic content of the viewer',
+        })
+
+    return {
+        'post-delete': restore_own_post,
+        'post-like': lambda: Like.objects.filter(post_id=hot, user_id=viewer).delete(),
+        'post-unlike': lambda: Like.objects.get_or_create(post_id=hot, user_id=viewer),
+        'post-share': lambda: Share.objects.filter(post_id=hot, user__username=context['celebrity']).delete(),
+        'bulk-interactions': lambda: Like.objects.filter(user_id=viewer, post_id__in=context['bulk_post_ids']).delete(),
+        'user-register': lambda: User.objects.filter(username='bench_register').delete(),
+        'user-logout': lambda: BlacklistedToken.objects.filter(token__user_id=viewer).delete(),
+        'follow-create': lambda: Follow.objects.filter(follower_id=viewer, following_id=context['celebrity_id']).delete(),
+        'unfollow-user': lambda: Follow.objects.get_or_create(follower_id=viewer, following_id=context['celebrity_id']),
+    }
+
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure_request(call, repeats=20, reset=None):
+    # one warm-up, one counted run, `repeats` timed runs and one traced run for peak memory;
+    # reset() runs before every call, outside what is measured
+    reset = reset or (lambda: None)
+    reset()
+    call()
+    reset()
+    # a full queries_log (maxlen) would make every capture look empty
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = call()
+    # read the count now, later requests reset the connection's query log
+    query_count = len(queries)
+    timings = []
+    for _ in range(repeats):
+        reset()
+        started = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - started) * 1000)
+    reset()
+    tracemalloc.start()
+    call()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': query_count,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(_percentile(timings, 0.95), 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def _auth_headers(user_id):
+    from users.authentication import issue_tokens
+    from users.models import User
+    token = issue_tokens(User.objects.get(pk=user_id)).access_token
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+class RouteFailed(Exception):
+    pass
+
+
+def run_route_benchmarks(context, repeats=20, only=None):
+    # measure every route in the table and return {name: metrics}
+    # every route is called repeats + 3 times by one client, past the burst of the write throttles;
+    # a route answering 4xx or 5xx raises RouteFailed, so an error path never ends up in a baseline
+    with override_settings(THROTTLE_ENABLED=False):
+        results = _run_routes(context, repeats, only)
+    failed = [f"{name}: status {metrics['status']}" for name, metrics in results.items() if metrics['status'] >= 400]
+    if failed:
+        raise RouteFailed('routes answered with an error:\n  ' + '\n  '.join(failed))
+    return results
+
+
+def _run_routes(context, repeats, only):
+    client = Client()
+    auth = _auth_headers(context['viewer_id'])
+    resets = route_resets(context)
+    results = {}
+    for name, url_name, method, kwargs, params, needs_auth in route_table(context):
+        if only and name not in only:
+            continue
+        url = reverse(url_name, kwargs=kwargs)
+        headers = auth if needs_auth else {}
+        if method == 'get':
+            call = lambda url=url, params=params, headers=headers: client.get(url, params, **headers)
+        else:
+            call = lambda url=url, send=getattr(client, method), params=params, headers=headers: send(
+                url, json.dumps(params), content_type='application/json', **headers
+            )
+        results[name] = measure_request(call, repeats=repeats, reset=resets.get(name))
+    return results
+
+
+# ============================================================================
+# CONNECTION REUSE
+# ============================================================================
+
+def measure_connection_reuse(url, requests=200, max_age=600, using='default'):
+    # drive `url` with a fresh connection per request and then with a persistent one,
+    # returning {mode: metrics} with connections opened, connect time and request latency
+    from django.db import close_old_connections, connections
+    from django.db.backends.signals import connection_created
+
+    connection = connections[using]
+    original_max_age = connection.settings_dict['CONN_MAX_AGE']
+    client = Client()
+    results = {}
+    try:
+        for mode, conn_max_age in (('none', 0), ('persistent', max_age)):
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+            opened = []
+            connect_ms = []
+            original_connect = connection.connect
+
+            def timed_connect():
+                started = time.perf_counter()
+                original_connect()
+                connect_ms.append((time.perf_counter() - started) * 1000)
+
+            def count(sender, connection, **kwargs):
+                opened.append(connection.alias)
+
+            connection.connect = timed_connect
+            connection_created.connect(count)
+            timings = []
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    # the test client skips the request_started/finished connection cleanup a real
+                    # server does, so apply CONN_MAX_AGE the same way around every request
+                    close_old_connections()
+                    client.get(url)
+                    close_old_connections()
+                    timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                connection_created.disconnect(count)
+                del connection.connect
+            results[mode] = {
+                'requests': requests,
+                'connections': len(opened),
+                'connect_ms_total': round(sum(connect_ms), 3),
+                'connect_ms_per_request': round(sum(connect_ms) / requests, 3),
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(_percentile(timings, 0.95), 3),
+            }
+    finally:
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = original_max_age
+    return results
+
+
+def measure_username_resolution(distinct=1000, requests=10000):
+    # authenticate `requests` username-only requests spread over `distinct` names, once with the old
+    # per-request get_or_create and once through the cached resolver; the first pass over the
+    # names creates the users in both modes
+    from django.core.cache import cache
+    from django.test.client import RequestFactory
+    from users import usernames
+    from users.authentication import UsernameAuthentication
+    from users.models import User
+
+    factory = RequestFactory()
+    names = [f'bench_name_{index}' for index in range(distinct)]
+    batch = [factory.get('/', HTTP_X_USERNAME=names[index % distinct]) for index in range(requests)]
+
+    def get_or_create(request):
+        username = request.META['HTTP_X_USERNAME']
+        return User.objects.get_or_create(username=username, defaults={'email': f'{username}@example.com'})[0]
+
+    def resolver(request):
+        return UsernameAuthentication().authenticate(request)[0]
+
+    results = {}
+    for mode, authenticate in (('get_or_create', get_or_create), ('resolver', resolver)):
+        User.objects.filter(username__in=names).delete()
+        cache.clear()
+        usernames.clear_local()
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        # the query log keeps only the last 9000 queries, count every one instead
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            for request in batch:
+                authenticate(request)
+            elapsed = time.perf_counter() - started
+        results[mode] = {
+            'requests': requests,
+            'distinct': distinct,
+            'queries': len(queries),
+            'queries_per_request': round(len(queries) / requests, 3),
+            'requests_per_s': round(requests / elapsed, 1),
+            'users': User.objects.filter(username__in=names).count(),
+        }
+    return results
+
+
+def measure_share_storage(shares=1000, content_chars=4000):
+    # one viral post shared `shares` times: text stored by the share rows when each copies the
+    # original's title and content (the old layout) and after compacting them to references
+    from django.db.models import Sum
+    from django.db.models.functions import Length
+    from posts.models import Post
+    from posts.originals import compact_shared_posts
+    from users.models import User
+
+    author = User.objects.create(username='viral_author', email='viral_author@example.com')
+    title = 'Viral post'
+    content = ('lorem ipsum dolor sit amet ' * (content_chars // 27 + 1))[:content_chars]
+    original = Post.objects.create(user=author, title=title, content=content)
+    sharers = User.objects.bulk_create(
+        [User(username=f'viral_sharer_{index}', email=f'viral_sharer_{index}@example.com') for index in range(shares)]
+    )
+    # bulk_create skips the counter and timeline signals, which do not matter here
+    Post.objects.bulk_create([
+        Post(user=sharer, title=f'Shared: {title}', content=content, post_type='shared', original_post=original)
+        for sharer in sharers
+    ], batch_size=500)
+
+    share_rows = Post.objects.filter(original_post=original)
+
+    def stored_chars():
+        return share_rows.aggregate(total=Sum(Length('title') + Length('content') + Length('share_comment')))['total'] or 0
+
+    before = stored_chars()
+    compacted = compact_shared_posts(Post)
+    after = stored_chars()
+    return {
+        'shares': shares,
+        'content_chars': content_chars,
+        'compacted_rows': compacted,
+        'chars_before': before,
+        'chars_after': after,
+        'chars_saved': before - after,
+        'saved_ratio': round((before - after) / before, 4) if before else 0.0,
+    }
+
+
+# ============================================================================
+# INDEX PLANS
+# ============================================================================
+
+def _indexed_models():
+    from posts.models import Post, Like, Comment, Share
+    from users.models import Follow
+    return (Post, Like, Comment, Share, Follow)
+
+
+def hot_queries(context):
+    # (name, queryset) for the first page of every hot query pattern
+    from posts.models import Post, Like, Comment, Share
+    from posts.threads import subtree_range
+    from posts.views import COMMENT_ORDERING, LIKE_ORDERING, POST_ORDERING, SHARE_ORDERING
+    from users.models import User, Follow
+
+    hot = context['hot_post_id']
+    celebrity = User.objects.get(username=context['celebrity'])
+    liker = User.objects.get(username=context['liker'])
+    # the busiest thread: its replies are one range of paths
+    thread = Comment.objects.filter(depth=0).order_by('-replies_count', 'pk').only('post_id', 'path').first()
+    lowest, highest = subtree_range(thread.path) if thread else ('', '')
+    return [
+        ('post-feed', Post.objects.order_by(*POST_ORDERING)[:20]),
+        ('user-posts', Post.objects.filter(user=celebrity).order_by(*POST_ORDERING)[:20]),
+        ('post-comments', Comment.objects.filter(post_id=hot).order_by(*COMMENT_ORDERING)[:20]),
+        ('comment-replies', Comment.objects.filter(post_id=thread.post_id if thread else hot, path__gt=lowest, path__lte=highest).order_by(*COMMENT_ORDERING)[:20]),
+        ('post-likes', Like.objects.filter(post_id=hot).order_by(*LIKE_ORDERING)[:20]),
+        ('post-shares', Share.objects.filter(post_id=hot).order_by(*SHARE_ORDERING)[:20]),
+        ('user-followers', Follow.objects.filter(following=celebrity).order_by('-created_at').values_list('follower_id', flat=True)[:20]),
+        ('liked-posts', Post.objects.filter(likes__user=liker).distinct().order_by(*POST_ORDERING)[:20]),
+    ]
+
+
+def measure_query_plans(context, repeats=5):
+    # EXPLAIN output and median run time of every hot query, {name: {'plan', 'p50_ms'}}
+    results = {}
+    for name, queryset in hot_queries(context):
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        results[name] = {
+            'plan': queryset.explain(),
+            'p50_ms': round(statistics.median(timings), 3),
+        }
+    return results
+
+
+def compare_index_plans(context, repeats=5):
+    # plans with the Meta.indexes of the hot models dropped, then recreated; must run outside a transaction
+    indexes = [(model, index) for model in _indexed_models() for index in model._meta.indexes]
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        before = measure_query_plans(context, repeats=repeats)
+    finally:
+        with connection.schema_editor() as editor:
+            for model, index in indexes:
+                editor.add_index(model, index)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    after = measure_query_plans(context, repeats=repeats)
+    return {name: {'before': before[name], 'after': after[name]} for name in after}
+
+
+# ============================================================================
+# TRENDING
+# ============================================================================
+
+def _python_ranking(post_ids, timestamps, now, half_life, size):
+    # the per-row loop the numpy job replaces
+    totals = {}
+    for post_id, timestamp in zip(post_ids, timestamps):
+        totals[post_id] = totals.get(post_id, 0.0) + 2 ** ((timestamp - now) / half_life)
+    return sorted(totals.items(), key=lambda item: (-item[1], item[0]))[:size]
+
+
+def measure_trending_scoring(interactions=10_000_000, posts=100_000, python_sample=1_000_000, size=500, seed=42):
+    # score `interactions` synthetic (post id, timestamp) pairs with the numpy job, chunk by chunk,
+    # and a `python_sample` prefix of them with a per-row python loop for comparison
+    import numpy as np
+    from django.conf import settings
+    from posts.trending import CHUNK_SIZE, decayed_scores, empty_scores, merge_scores, top_posts
+
+    rng = np.random.default_rng(seed)
+    now = time.time()
+    half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600.0
+    post_ids = (rng.zipf(1.3, interactions) - 1) % posts
+    timestamps = now - rng.uniform(0, settings.TRENDING_WINDOW_HOURS * 3600.0, interactions)
+
+    def numpy_ranking(count):
+        scores = empty_scores()
+        for start in range(0, count, CHUNK_SIZE):
+            end = min(start + CHUNK_SIZE, count)
+            scores = merge_scores(scores, decayed_scores(post_ids[start:end], timestamps[start:end], 1.0, now, half_life))
+        return top_posts(scores, size)
+
+    started = time.perf_counter()
+    numpy_ranking(interactions)
+    numpy_seconds = time.perf_counter() - started
+
+    sample = min(python_sample, interactions)
+    sample_ids, sample_times = post_ids[:sample].tolist(), timestamps[:sample].tolist()
+    started = time.perf_counter()
+    python_top = _python_ranking(sample_ids, sample_times, now, half_life, size)
+    python_seconds = time.perf_counter() - started
+
+    numpy_rate = interactions / numpy_seconds
+    python_rate = sample / python_seconds
+    return {
+        'interactions': interactions,
+        'numpy_s': round(numpy_seconds, 3),
+        'numpy_per_s': round(numpy_rate),
+        'python_sample': sample,
+        'python_s': round(python_seconds, 3),
+        'python_per_s': round(python_rate),
+        'speedup': round(numpy_rate / python_rate, 1),
+        'same_top_posts': [post_id for post_id, _score in numpy_ranking(sample)[:10]] == [post_id for post_id, _score in python_top[:10]],
+    }
+
+
+def measure_trending_refresh(interactions=1_000_000, posts=10_000, users=1_000, batch_size=5000, seed=42):
+    # seed `interactions` comments and time the full refresh job: database fetch, scoring and table swap
+    from posts.models import Post, Comment, TrendingPost
+    from posts.trending import refresh
+    from users.models import User
+
+    seed_dataset(users=users, posts=posts, likes=0, comments=0, follows=0, seed=seed, batch_size=batch_size)
+    rng = random.Random(seed)
+    post_ids = list(Post.objects.filter(user__username__startswith='bench').order_by('pk').values_list('pk', flat=True))
+    user_ids = list(User.objects.filter(username__startswith='bench').order_by('pk').values_list('pk', flat=True))
+    weights = zipf_weights(len(post_ids))
+    remaining = interactions
+    while remaining:
+        count = min(remaining, 100_000)
+        Comment.objects.bulk_create(
+            [Comment(post_id=post, user_id=user, content='c') for post, user in zip(rng.choices(post_ids, weights=weights, k=count), rng.choices(user_ids, k=count))],
+            batch_size=batch_size,
+        )
+        remaining -= count
+
+    started = time.perf_counter()
+    ranked = refresh()
+    seconds = time.perf_counter() - started
+    return {
+        'interactions': interactions,
+        'refresh_s': round(seconds, 3),
+        'interactions_per_s': round(interactions / seconds),
+        'ranked': ranked,
+        'top_post_id': TrendingPost.objects.values_list('post_id', flat=True).first(),
+    }
+
+
+# ============================================================================
+# FOLLOW GRAPH
+# ============================================================================
+
+def synthetic_follows(users, edges, heavy_follows=0, seed=42):
+    # unique (follower, following) arrays: followers uniform, followed users power-law;
+    # user 0 follows the heavy_follows most followed users
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    # popular accounts draw many duplicates, so oversample and keep `edges` distinct pairs
+    followers = rng.integers(1, users, edges * 3)
+    following = (rng.zipf(1.5, edges * 3) - 1) % users
+    keys = np.unique(followers * users + following)
+    keys = keys[(keys // users) != (keys % users)]
+    keys = rng.permutation(keys)[:edges]
+    heavy = np.arange(1, heavy_follows + 1)
+    return np.concatenate((keys // users, np.zeros(heavy_follows, dtype=np.int64))), np.concatenate((keys % users, heavy))
+
+
+def measure_follow_graph(users=1_000_000, edges=10_000_000, heavy_follows=20000, repeats=50, updates=10000, seed=42):
+    # build a csr follow graph of `edges` synthetic follows, report its memory, and time
+    # suggestions for a user following heavy_follows accounts and for random users
+    import numpy as np
+    from users.graph import FollowGraph
+
+    followers, following = synthetic_follows(users, edges, heavy_follows, seed)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    graph = FollowGraph.from_edges(followers, following)
+    build_seconds = time.perf_counter() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del followers, following
+
+    def timed(user_ids):
+        timings = []
+        for user_id in user_ids:
+            started = time.perf_counter()
+            graph.suggestions(int(user_id))
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    rng = np.random.default_rng(seed + 1)
+    heavy = timed([0] * repeats)
+    typical = timed(rng.integers(1, users, repeats))
+
+    # follows and unfollows of this process, then folding them into the arrays
+    pairs = rng.integers(1, users, (updates, 2))
+    started = time.perf_counter()
+    for follower_id, following_id in pairs.tolist():
+        graph.follow(follower_id, following_id)
+    update_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    graph.compacted()
+    compact_seconds = time.perf_counter() - started
+
+    return {
+        'users': graph.size,
+        'edges': len(graph.targets),
+        'graph_mb': round(graph.nbytes / 1024 / 1024, 1),
+        'build_peak_mb': round(peak / 1024 / 1024, 1),
+        'build_s': round(build_seconds, 3),
+        'heavy_follows': len(graph.follows(0)),
+        'heavy_p50_ms': round(statistics.median(heavy), 3),
+        'heavy_p95_ms': round(_percentile(heavy, 0.95), 3),
+        'typical_p50_ms': round(statistics.median(typical), 3),
+        'typical_p95_ms': round(_percentile(typical, 0.95), 3),
+        'updates': updates,
+        'update_us': round(update_seconds / updates * 1e6, 2),
+        'compact_s': round(compact_seconds, 3),
+    }
+
+
+# ============================================================================
+# HTTP LOAD TEST
+# ============================================================================
+
+def run_load_test(url, concurrency=50, duration=10.0, headers=None):
+    # hammer a running server with `concurrency` keep-alive clients for `duration` seconds
+    import http.client
+    import threading
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    deadline = time.perf_counter() + duration
+    timings, errors = [], []
+    lock = threading.Lock()
+
+    def client():
+        connection = connection_class(parts.netloc, timeout=30)
+        local_timings, local_errors = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers or {})
+                response = connection.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+                else:
+                    local_timings.append((time.perf_counter() - started) * 1000)
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = connection_class(parts.netloc, timeout=30)
+        connection.close()
+        with lock:
+            timings.extend(local_timings)
+            errors.append(local_errors)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(timings),
+        'errors': sum(errors),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3) if timings else None,
+        'p95_ms': round(_percentile(timings, 0.95), 3) if timings else None,
+    }
+
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def compare_results(current, baseline, query_slack=0, latency_factor=None):
+    # list human readable regressions of `current` against `baseline`
+    regressions = []
+    for name, expected in baseline.get('routes', {}).items():
+        actual = current.get('routes', {}).get(name)
+        if actual is None:
+            continue
+        if actual['status'] != expected['status']:
+            regressions.append(f"{name}: status {expected['status']} -> {actual['status']}")
+        if actual['queries'] > expected['queries'] + query_slack:
+            regressions.append(f"{name}: queries {expected['queries']} -> {actual['queries']}")
+        if latency_factor and actual['p95_ms'] > expected['p95_ms'] * latency_factor:
+            regressions.append(f"{name}: p95 {expected['p95_ms']}ms -> {actual['p95_ms']}ms")
+    return regressions
@@ -0,0 +1,372 @@
+import base64
+import binascii
+import datetime
+import functools
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# shared paginator for the list endpoints
+# three modes, picked from the query string:
+#   cursor - keyset pagination (?page_size=, ?cursor=), cost independent of depth
+#   batch  - legacy offset batches (?batch_size=, ?batch_number=) returning the old batch_info shape
+#   all    - no pagination parameters, every row in one response; streamed in chunks when
+#            ?stream=true (or STREAM_UNPAGINATED_LISTS) so the table never sits in memory
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+class KeysetPaginator:
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    total_query_param = 'include_total'
+    stream_query_param = 'stream'
+
+    def __init__(self, request, ordering, default_page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE, allow_all=True):
+        # ordering must end with a unique field (normally id) so every row has a distinct position
+        # allow_all=False makes requests without pagination parameters get the first cursor page
+        self.request = request
+        # drf requests expose query_params, the plain django requests of the async views only GET
+        self.params = getattr(request, 'query_params', request.GET)
+        self.ordering = tuple(ordering)
+        self.default_page_size = default_page_size
+        self.max_page_size = max_page_size
+        self.mode = self._detect_mode()
+        if self.mode == 'all' and not allow_all:
+            self.mode = 'cursor'
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.total = None
+        self.total_is_approximate = False
+
+    def _detect_mode(self):
+        params = self.params
+        if params.get(self.cursor_query_param) or params.get(self.page_size_query_param):
+            return 'cursor'
+        if params.get('batch_size'):
+            return 'batch'
+        return 'all'
+
+    # ------------------------------------------------------------------
+    # queryset slicing
+    # ------------------------------------------------------------------
+
+    def paginate_queryset(self, queryset):
+        # return the rows for the current page (a list in cursor mode, a queryset otherwise)
+        queryset = queryset.order_by(*self.ordering)
+        if self.mode == 'cursor':
+            return self._paginate_cursor(queryset)
+        if self.mode == 'batch':
+            return self._paginate_batch(queryset)
+        return queryset
+
+    async def apaginate_queryset(self, queryset):
+        # async ORM version of paginate_queryset for the async views, always returns a list
+        queryset = queryset.order_by(*self.ordering)
+        if self.mode == 'cursor':
+            self.page_size = self._get_page_size()
+            requested = self._requested_total()
+            if requested == 'exact':
+                self.total = await queryset.acount()
+            elif requested == 'approximate':
+                self.total, self.total_is_approximate = await sync_to_async(approximate_count)(queryset)
+            window, position, reverse = self._cursor_window(queryset)
+            return self._cursor_page([row async for row in window], position, reverse)
+        if self.mode == 'batch':
+            page = self._batch_window(queryset)
+            self.total = await queryset.acount()
+            return [row async for row in page]
+        return [row async for row in queryset]
+
+    def _batch_window(self, queryset):
+        # legacy offset batches, kept for clients that still send batch_size/batch_number
+        params = self.params
+        self.batch_size = int(params.get('batch_size'))
+        self.batch_number = int(params.get('batch_number', 0))
+        start_index = max(0, self.batch_number * self.batch_size)  # prevent negative indexing
+        self.end_index = start_index + self.batch_size
+        return queryset[start_index:self.end_index]
+
+    def _paginate_batch(self, queryset):
+        page = self._batch_window(queryset)
+        self.total = queryset.count()
+        return page
+
+    def _paginate_cursor(self, queryset):
+        self.page_size = self._get_page_size()
+        self._count_total(queryset)
+        window, position, reverse = self._cursor_window(queryset)
+        return self._cursor_page(list(window), position, reverse)
+
+    def paginate_merged(self, querysets, model, count):
+        # one page over several querysets sorted by the same ordering, e.g. materialized rows plus a
+        # fan-out-on-read source: each is read through its own index, at most one page past the
+        # cursor, and the windows are merged in python; rows at the same position are kept once.
+        # model parses cursor positions (querysets may annotate ordering fields), count() returns
+        # the total of the union for include_total and batch mode. returns a list of rows
+        querysets = [queryset.order_by(*self.ordering) for queryset in querysets]
+        if self.mode == 'batch':
+            self._batch_window(querysets[0])
+            start = self.end_index - self.batch_size
+            self.total = count()
+            return self._merge([list(queryset[:max(self.end_index, 0)]) for queryset in querysets], False)[max(start, 0):self.end_index]
+        if self.mode == 'all':
+            return self._merge([list(queryset) for queryset in querysets], False)
+        self.page_size = self._get_page_size()
+        if self._requested_total():
+            self.total = count()
+        position, reverse = self._decode_cursor(self.params.get(self.cursor_query_param))
+        if position is not None:
+            position = self._parse_position(model, position)
+        windows = []
+        for queryset in querysets:
+            if reverse:
+                queryset = queryset.reverse()
+            if position is not None:
+                queryset = queryset.filter(self._after(position, reverse))
+            windows.append(list(queryset[:self.page_size + 1]))
+        return self._cursor_page(self._merge(windows, reverse)[:self.page_size + 1], position, reverse)
+
+    def _merge(self, windows, reverse):
+        # rows of several windows sorted by the ordering (reversed for backward pages), without duplicates
+        fields = self._fields()
+
+        def compare(left, right):
+            for name, descending in fields:
+                a, b = getattr(left, name), getattr(right, name)
+                if a != b:
+                    return (1 if a < b else -1) if descending != reverse else (-1 if a < b else 1)
+            return 0
+
+        merged = []
+        for row in sorted((row for window in windows for row in window), key=functools.cmp_to_key(compare)):
+            if not merged or compare(merged[-1], row):
+                merged.append(row)
+        return merged
+
+    def _cursor_window(self, queryset):
+        # the rows after the request's cursor, one more than a page to detect a next page
+        position, reverse = self._decode_cursor(self.params.get(self.cursor_query_param))
+        if position is not None:
+            position = self._parse_position(queryset.model, position)
+        if reverse:
+            queryset = queryset.reverse()
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        return queryset[:self.page_size + 1], position, reverse
+
+    def _cursor_page(self, rows, position, reverse):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if rows:
+            # a backwards page always has a next page (where we came from), a forwards page
+            # has a previous one whenever it started from a cursor
+            has_next = has_more if not reverse else True
+            has_previous = has_more if reverse else position is not None
+            if has_next:
+                self.next_cursor = self._encode_cursor(self._position(rows[-1]), reverse=False)
+            if has_previous:
+                self.previous_cursor = self._encode_cursor(self._position(rows[0]), reverse=True)
+        return rows
+
+    def _get_page_size(self):
+        try:
+            page_size = int(self.params.get(self.page_size_query_param, self.default_page_size))
+        except (TypeError, ValueError):
+            page_size = self.default_page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def _requested_total(self):
+        requested = self.params.get(self.total_query_param, '').lower()
+        if requested in ('exact', 'true', '1'):
+            return 'exact'
+        if requested == 'approximate':
+            return 'approximate'
+        return None
+
+    def _count_total(self, queryset):
+        requested = self._requested_total()
+        if requested == 'exact':
+            self.total = queryset.count()
+        elif requested == 'approximate':
+            self.total, self.total_is_approximate = approximate_count(queryset)
+
+    # ------------------------------------------------------------------
+    # keyset positions and cursors
+    # ------------------------------------------------------------------
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def _position(self, row):
+        return [getattr(row, name) for name, _descending in self._fields()]
+
+    def _after(self, position, reverse):
+        # lexicographic "comes after" filter: (a > x) or (a = x and b > y) or ...
+        fields = self._fields()
+        condition = Q()
+        for index, (name, descending) in enumerate(fields):
+            if reverse:
+                descending = not descending
+            lookup = 'lt' if descending else 'gt'
+            clause = Q(**{f'{name}__{lookup}': position[index]})
+            for previous_index, (previous_name, _descending) in enumerate(fields[:index]):
+                clause &= Q(**{previous_name: position[previous_index]})
+            condition |= clause
+        return condition
+
+    def _parse_position(self, model, values):
+        # turn json cursor values back into python values for the ordering fields
+        try:
+            return [
+                model._meta.get_field(name).to_python(value)
+                for (name, _descending), value in zip(self._fields(), values)
+            ]
+        except (DjangoValidationError, FieldDoesNotExist):
+            raise NotFound('Invalid cursor')
+
+    def _encode_cursor(self, position, reverse):
+        payload = {'p': [_dump_value(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError('cursor does not match ordering')
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound('Invalid cursor')
+        return values, bool(payload.get('r'))
+
+    def _cursor_url(self, cursor):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'batch_size')
+        url = remove_query_param(url, 'batch_number')
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    # ------------------------------------------------------------------
+    # responses
+    # ------------------------------------------------------------------
+
+    def get_batch_info(self, label, items_in_batch):
+        # the legacy batch_info block, e.g. total_posts / posts_in_current_batch
+        total_batches = (self.total + self.batch_size - 1) // self.batch_size if self.batch_size > 0 else 0  # ceiling division
+        return {
+            'current_batch': self.batch_number,
+            'batch_size': self.batch_size,
+            f'total_{label}': self.total,
+            'total_batches': total_batches,
+            f'{label}_in_current_batch': items_in_batch,
+        }
+
+    def get_page_info(self, label):
+        page_info = {
+            'page_size': self.page_size,
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+        }
+        if self.total is not None:
+            page_info[f'total_{label}'] = self.total
+            page_info['total_is_approximate'] = self.total_is_approximate
+        return page_info
+
+    @property
+    def is_streaming(self):
+        if self.mode != 'all':
+            return False
+        requested = self.params.get(self.stream_query_param)
+        if requested is None:
+            return settings.STREAM_UNPAGINATED_LISTS
+        return requested.lower() in ('true', '1', 'yes')
+
+    def get_streaming_response(self, label, queryset, serialize, all_message, extra=None):
+        # same envelope as get_response in 'all' mode, written chunk by chunk
+        # serialize(rows) turns one chunk of model instances into a list of dicts
+        chunk_size = settings.STREAM_CHUNK_SIZE
+        encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+        def chunks():
+            rows = []
+            for row in queryset.iterator(chunk_size=chunk_size):
+                rows.append(row)
+                if len(rows) >= chunk_size:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+
+        def body():
+            head = {'message': all_message}
+            head.update(extra or {})
+            # reopen the envelope right before its closing brace to append the list
+            yield encoder.encode(head)[:-1] + f',{encoder.encode(label)}:['
+            total = 0
+            for rows in chunks():
+                items = ','.join(encoder.encode(item) for item in serialize(rows))
+                yield (',' if total else '') + items
+                total += len(rows)
+            yield f'],{encoder.encode(f"total_{label}")}:{total}}}'
+
+        return StreamingHttpResponse((part.encode('utf-8') for part in body()), content_type='application/json')
+
+    def get_response(self, label, data, message, all_message, extra=None):
+        return Response(self.get_response_data(label, data, message, all_message, extra))
+
+    def get_response_data(self, label, data, message, all_message, extra=None):
+        # build the standard list envelope for whichever mode the request used
+        body = {'message': message if self.mode != 'all' else all_message}
+        body.update(extra or {})
+        body[label] = data
+        if self.mode == 'cursor':
+            body['next'] = self._cursor_url(self.next_cursor) if self.next_cursor else None
+            body['previous'] = self._cursor_url(self.previous_cursor) if self.previous_cursor else None
+            body['page_info'] = self.get_page_info(label)
+        elif self.mode == 'batch':
+            body['batch_info'] = self.get_batch_info(label, len(data))
+        else:
+            body[f'total_{label}'] = len(data)
+        return body
+
+
+def approximate_count(queryset):
+    # planner row estimate on postgres (no table scan), exact count elsewhere
+    # returns (total, is_approximate)
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows']), True
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
@@ -0,0 +1,219 @@
+import functools
+import hashlib
+import random
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+
+# shared response cache for anonymous read endpoints, and conditional GET validators
+# a cached body is stored under path + normalized query params + the current version of every
+# tag the view depends on; model signals bump those versions, so one write invalidates exactly
+# the responses built from it without scanning or deleting keys. the same versions, with the
+# time of their last bump, give ETag and Last-Modified from one cache read, no query or serializer
+
+CACHE_ALIAS = 'responses'
+VERSION_PREFIX = 'response-cache:version:'
+MODIFIED_PREFIX = 'response-cache:modified:'
+RESPONSE_PREFIX = 'response-cache:body:'
+STATS_KEYS = {'hits': 'response-cache:hits', 'misses': 'response-cache:misses'}
+# request headers that change a conditional response (content type, viewer-specific fields)
+VARY_HEADERS = ('HTTP_ACCEPT', 'HTTP_AUTHORIZATION', 'HTTP_X_USERNAME')
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.RESPONSE_CACHE_ENABLED
+
+
+def tracks_versions():
+    # tag versions are kept while either the body cache or conditional requests rely on them
+    return settings.RESPONSE_CACHE_ENABLED or settings.CONDITIONAL_REQUESTS_ENABLED
+
+
+# ============================================================================
+# TAG VERSIONS
+# ============================================================================
+
+def _increment(key, start=0):
+    cache = _cache()
+    # add() is a no-op when the key exists, so concurrent first bumps cannot lose an increment
+    cache.add(key, start, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # evicted between add() and incr()
+        cache.set(key, start + 1, timeout=None)
+        return start + 1
+
+
+def _first_version():
+    # versions start at a random value: a version evicted and created again must not repeat one
+    # a cached body or a client's ETag was built from
+    return random.getrandbits(48)
+
+
+def bump(*tags):
+    # invalidate every response built from these tags, right now
+    for tag in tags:
+        _increment(VERSION_PREFIX + tag, start=_first_version())
+    if tags:
+        _cache().set_many({MODIFIED_PREFIX + tag: time.time() for tag in tags}, timeout=None)
+
+
+def invalidate(*tags):
+    # invalidate after the surrounding transaction commits, so a concurrent reader cannot
+    # re-cache the old rows between the bump and the commit
+    if tracks_versions() and tags:
+        transaction.on_commit(functools.partial(bump, *tags))
+
+
+def stamps(tags):
+    # [(version, last modified timestamp)] of each tag, one get_many when they all exist
+    # a tag never bumped (or evicted) starts now, so Last-Modified never predates a change
+    cache = _cache()
+    keys = [(VERSION_PREFIX + tag, MODIFIED_PREFIX + tag) for tag in tags]
+    found = cache.get_many([key for pair in keys for key in pair])
+    missing = {}
+    for version_key, modified_key in keys:
+        if version_key not in found:
+            missing[version_key] = _first_version()
+        if modified_key not in found:
+            missing[modified_key] = time.time()
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        # another process may have added them first
+        found.update(cache.get_many(list(missing)))
+    return [(found.get(version_key, 0), found.get(modified_key, 0.0)) for version_key, modified_key in keys]
+
+
+def _versions(tags):
+    return [str(version) for version, _modified in stamps(tags)]
+
+
+# ============================================================================
+# HIT / MISS COUNTERS
+# ============================================================================
+
+def stats():
+    found = _cache().get_many(list(STATS_KEYS.values()))
+    counts = {name: found.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = counts['hits'] + counts['misses']
+    counts['hit_ratio'] = round(counts['hits'] / total, 4) if total else 0.0
+    return counts
+
+
+def reset_stats():
+    _cache().delete_many(list(STATS_KEYS.values()))
+
+
+# ============================================================================
+# VIEW DECORATOR
+# ============================================================================
+
+def _cache_key(request, tags):
+    # query params are sorted (keys and repeated values) so ?a=1&b=2 and ?b=2&a=1 share an entry
+    query = urlencode(sorted((key, value) for key in request.GET for value in request.GET.getlist(key)))
+    raw = '|'.join([request.path, query, *tags, *_versions(tags)])
+    return RESPONSE_PREFIX + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _is_anonymous(request):
+    # authentication is header based (JWT / token), so no header means an anonymous request
+    return 'HTTP_AUTHORIZATION' not in request.META
+
+
+def cache_anonymous_response(tags, timeout=None):
+    # cache successful anonymous GET responses of a view
+    # tags(request, **view_kwargs) returns the invalidation tags the response depends on
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_enabled() or request.method != 'GET' or not _is_anonymous(request):
+                return view(request, *args, **kwargs)
+
+            cache = _cache()
+            key = _cache_key(request, tags(request, *args, **kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                _increment(STATS_KEYS['hits'])
+                status_code, content_type, content = cached
+                response = HttpResponse(content, status=status_code, content_type=content_type)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _increment(STATS_KEYS['misses'])
+            response = view(request, *args, **kwargs)
+            response['X-Cache'] = 'MISS'
+            # streamed bodies are never buffered into the cache
+            if response.status_code == 200 and not response.streaming:
+                cache_timeout = settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+
+                def store(rendered):
+                    cache.set(key, (rendered.status_code, rendered['Content-Type'], rendered.content), cache_timeout)
+
+                if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+                    response.add_post_render_callback(store)
+                else:
+                    store(response)
+            return response
+        return wrapper
+    return decorator
+
+
+# ============================================================================
+# CONDITIONAL REQUESTS
+# ============================================================================
+
+def _conditional_stamps(request, tags, args, kwargs):
+    # the tag stamps of a request, memoized on it: django asks for the etag and last modified separately
+    if not settings.CONDITIONAL_REQUESTS_ENABLED:
+        return None
+    memo = getattr(request, '_conditional_stamps', None)
+    if memo is None:
+        memo = request._conditional_stamps = stamps(tags(request, *args, **kwargs))
+    return memo
+
+
+def conditional_response(tags):
+    # answer If-None-Match / If-Modified-Since with 304 before the view runs
+    # tags(request, **view_kwargs) are the invalidation tags the response depends on (as for
+    # cache_anonymous_response); the weak ETag also covers the path, query and VARY_HEADERS
+    def etag(request, *args, **kwargs):
+        found = _conditional_stamps(request, tags, args, kwargs)
+        if found is None:
+            return None
+        query = urlencode(sorted((key, value) for key in request.GET for value in request.GET.getlist(key)))
+        headers = [request.META.get(name, '') for name in VARY_HEADERS]
+        raw = '|'.join([request.path, query, *headers, *(str(version) for version, _modified in found)])
+        return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+    def last_modified(request, *args, **kwargs):
+        found = _conditional_stamps(request, tags, args, kwargs)
+        if not found:
+            return None
+        return datetime.fromtimestamp(max(modified for _version, modified in found), tz=timezone.utc)
+
+    def decorator(view):
+        conditional = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                # an error must not be revalidated into a 304 once the resource exists
+                response.headers.pop('ETag', None)
+                response.headers.pop('Last-Modified', None)
+            return response
+        return wrapper
+    return decorator
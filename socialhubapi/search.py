@@ -0,0 +1,186 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+
+# full-text search shared by the search endpoint and the user list
+# postgres: stored generated tsvector column (search_vector) with a GIN index on each table
+# sqlite:   external-content FTS5 table (<table>_fts) kept in sync by triggers
+# both backends take the same query: every word must match the start of a word, best matches first;
+# other databases fall back to icontains over the same fields
+
+SEARCH_CONFIG = 'simple'  # no stemming, posts mix portuguese and english
+MAX_TOKENS = 8
+WEIGHTS = {'A': 4.0, 'B': 1.0}
+
+# indexed columns per model and their rank weight
+INDEXED_FIELDS = {
+    'posts.Post': (('title', 'A'), ('content', 'B')),
+    'posts.Comment': (('content', 'A'),),
+    'users.User': (('username', 'A'), ('first_name', 'A'), ('last_name', 'A'), ('bio', 'B')),
+}
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall((query or '').lower())[:MAX_TOKENS]
+
+
+def _fields(model):
+    return INDEXED_FIELDS[model._meta.label]
+
+
+# ============================================================================
+# SCHEMA (called from migrations and post_migrate)
+# ============================================================================
+
+def _sqlite_triggers(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});'
+    return {
+        f'{fts}_ai': f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END',
+        f'{fts}_ad': f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END',
+        # only text changes touch the index, counter updates do not
+        f'{fts}_au': f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} BEGIN {delete_old} {insert_new} END',
+    }
+
+
+def create_index(schema_editor, table, fields):
+    # fields: ((column, weight), ...)
+    vendor = schema_editor.connection.vendor
+    columns = [column for column, _ in fields]
+    if vendor == 'postgresql':
+        document = ' || '.join(
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({column}, '')), '{weight}')" for column, weight in fields
+        )
+        schema_editor.execute(f'ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({document}) STORED')
+        schema_editor.execute(f'CREATE INDEX {table}_search_idx ON {table} USING GIN (search_vector)')
+    elif vendor == 'sqlite':
+        fts = f'{table}_fts'
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({', '.join(columns)}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2')"
+        )
+        for sql in _sqlite_triggers(table, columns).values():
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def drop_index(schema_editor, table, fields):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {table}_search_idx')
+        schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        fts = f'{table}_fts'
+        for name in _sqlite_triggers(table, [column for column, _ in fields]):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def repair_sqlite_triggers(using='default'):
+    # sqlite rebuilds a table (dropping its triggers) whenever a migration alters it,
+    # so restore missing triggers after migrate and resync the index they stopped feeding
+    from django.apps import apps
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        for label, fields in INDEXED_FIELDS.items():
+            table = apps.get_model(label)._meta.db_table
+            fts = f'{table}_fts'
+            if fts not in existing:
+                continue
+            triggers = _sqlite_triggers(table, [column for column, _ in fields])
+            if set(triggers) <= existing:
+                continue
+            for sql in triggers.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def _is_indexed(connection):
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def _match_param(connection, tokens):
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{token}:*' for token in tokens)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _fallback_filter(model, tokens):
+    condition = Q()
+    for token in tokens:
+        condition &= Q(*[Q(**{f'{column}__icontains': token}) for column, _ in _fields(model)], _connector=Q.OR)
+    return condition
+
+
+def filter_queryset(queryset, query):
+    # restrict a queryset to rows matching the query, keeping its own ordering
+    tokens = tokenize(query)
+    model = queryset.model
+    if not tokens:
+        # nothing searchable (e.g. only punctuation), keep the old substring behaviour
+        return queryset.filter(Q(*[Q(**{f'{column}__icontains': query}) for column, _ in _fields(model)], _connector=Q.OR))
+    connection = connections[queryset.db]
+    if not _is_indexed(connection):
+        return queryset.filter(_fallback_filter(model, tokens))
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = f"SELECT id FROM {table} WHERE search_vector @@ to_tsquery('{SEARCH_CONFIG}', %s)"
+    else:
+        sql = f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s'
+    return queryset.filter(pk__in=RawSQL(sql, [_match_param(connection, tokens)]))
+
+
+def ranked_search(model, query, limit, offset=0, using='default'):
+    # (ids ordered by relevance for one page, total matches)
+    tokens = tokenize(query)
+    if not tokens:
+        return [], 0
+    connection = connections[using]
+    if not _is_indexed(connection):
+        matches = model.objects.using(using).filter(_fallback_filter(model, tokens)).order_by('-pk')
+        return list(matches.values_list('pk', flat=True)[offset:offset + limit]), matches.count()
+
+    table = model._meta.db_table
+    param = _match_param(connection, tokens)
+    if connection.vendor == 'postgresql':
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        where = f'FROM {table} WHERE search_vector @@ {tsquery}'
+        page_sql = f'SELECT id {where} ORDER BY ts_rank_cd(search_vector, {tsquery}) DESC, id DESC LIMIT %s OFFSET %s'
+        page_params = [param, param, limit, offset]
+    else:
+        fts = f'{table}_fts'
+        weights = ', '.join(str(WEIGHTS[weight]) for _, weight in _fields(model))
+        where = f'FROM {fts} WHERE {fts} MATCH %s'
+        # bm25 is lower for better matches
+        page_sql = f'SELECT rowid {where} ORDER BY bm25({fts}, {weights}), rowid DESC LIMIT %s OFFSET %s'
+        page_params = [param, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(page_sql, page_params)
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'SELECT count(*) {where}', [param])
+        total = cursor.fetchone()[0]
+    return ids, total
+
+
+def in_rank_order(queryset, ids):
+    # fetch the rows for a page of ids and return them in that order
+    rows = queryset.in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'drf_spectacular',
     'django_filters',
@@ -141,6 +142,38 @@ else:
             }
         }
 
+# Connection reuse
+# DB_CONN_MODE: "none" opens a connection per request, "persistent" keeps it for DB_CONN_MAX_AGE
+# seconds (checked before reuse), "pool" uses a psycopg3 pool (PostgreSQL, Django >= 5.1, psycopg[pool])
+# asgi.py and gunicorn.conf.py (uvicorn workers) set SERVER_GATEWAY=asgi. under ASGI the ORM runs in
+# asgiref's worker threads, each holding its own connection that the end-of-request cleanup never
+# sees, so persistent connections pile up until the database refuses new ones: they are switched off
+# there, use pgbouncer instead ("pool" needs Django 5.1, requirements.txt pins 5.0)
+SERVER_GATEWAY = config('SERVER_GATEWAY', default='wsgi')
+DB_CONN_MODE = config('DB_CONN_MODE', default='none' if SERVER_GATEWAY == 'asgi' else 'persistent')
+if DB_CONN_MODE == 'persistent' and SERVER_GATEWAY == 'asgi':
+    DB_CONN_MODE = 'none'
+if DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=600, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+elif DB_CONN_MODE == 'pool':
+    import django
+    from django.core.exceptions import ImproperlyConfigured
+    if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+        raise ImproperlyConfigured('DB_CONN_MODE=pool requires PostgreSQL')
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured('DB_CONN_MODE=pool requires Django 5.1 or newer, use DB_CONN_MODE=persistent')
+    # pooled connections are returned to the pool after each request, so CONN_MAX_AGE must stay 0
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+elif DB_CONN_MODE != 'none':
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(f'Unknown DB_CONN_MODE "{DB_CONN_MODE}", use none, persistent or pool')
+
 # Skip database checks during build
 import sys
 if 'collectstatic' in sys.argv or 'migrate' in sys.argv:
@@ -204,7 +237,7 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-    'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'users.authentication.StatelessJWTAuthentication',
     'rest_framework.authentication.TokenAuthentication',  # Fallback
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -213,6 +246,9 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
     'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    # reverse proxies in front of the app; client ips (anonymous throttle buckets) are taken from
+    # X-Forwarded-For only when this is set, otherwise any client could pick its own bucket
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # DRF Spectacular settings
@@ -254,6 +290,86 @@ CORS_ALLOWED_METHODS = [
 USE_TZ = True
 TIME_ZONE = config('TZ', default='UTC')
 
+# Home timeline (posts.timeline)
+# fan-out runs after commit on a background thread ("thread") or inline ("sync")
+TIMELINE_FANOUT_MODE = config('TIMELINE_FANOUT_MODE', default='thread')
+# authors with at least this many followers are merged into feeds on read instead of fanned out
+TIMELINE_CELEBRITY_THRESHOLD = config('TIMELINE_CELEBRITY_THRESHOLD', default=5000, cast=int)
+# recent posts copied into a feed when its owner follows someone
+TIMELINE_BACKFILL_LIMIT = config('TIMELINE_BACKFILL_LIMIT', default=200, cast=int)
+
+# Trending posts (posts.trending, recomputed by `manage.py refresh_trending`, e.g. from cron)
+# interactions older than the window are ignored, younger ones lose half their weight every half-life
+TRENDING_WINDOW_HOURS = config('TRENDING_WINDOW_HOURS', default=72, cast=int)
+TRENDING_HALF_LIFE_HOURS = config('TRENDING_HALF_LIFE_HOURS', default=12, cast=float)
+# posts kept in the ranking table
+TRENDING_SIZE = config('TRENDING_SIZE', default=500, cast=int)
+
+# Caches
+# "default" holds token version stamps, usernames, profile stats and shared post originals;
+# "responses" holds anonymous API responses (socialhubapi.response_cache); use a file or
+# shared backend (e.g. django.core.cache.backends.filebased.FileBasedCache) when running several workers
+# backends whose entries live inside one process: the other workers never see their writes
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+CACHES = {
+    'default': {
+        'BACKEND': config('DEFAULT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('DEFAULT_CACHE_LOCATION', default='socialhub-default'),
+    },
+    'responses': {
+        'BACKEND': config('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default='socialhub-responses'),
+        'OPTIONS': {'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    },
+    # token buckets of socialhubapi.throttling, shared by every worker: a database table by default
+    # (created by prestart / createcachetable); django.core.cache.backends.redis.RedisCache updates
+    # a bucket in one round trip. a locmem cache would give each worker its own buckets
+    'throttle': {
+        'BACKEND': config('THROTTLE_CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('THROTTLE_CACHE_LOCATION', default='throttle_cache'),
+    },
+}
+RESPONSE_CACHE_ENABLED = config('RESPONSE_CACHE_ENABLED', default=True, cast=bool)
+# seconds a cached response may live; signals normally invalidate it much earlier
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+# ETag / Last-Modified on post detail, comment lists and profiles, from the same tag versions.
+# versions never expire, so a worker that misses another worker's bump would answer 304 forever:
+# on by default only when the responses cache is shared
+CONDITIONAL_REQUESTS_ENABLED = config(
+    'CONDITIONAL_REQUESTS_ENABLED', default=CACHES['responses']['BACKEND'] not in PROCESS_LOCAL_CACHES, cast=bool,
+)
+# seconds per-user profile stats stay in the default cache (0 disables it); signals drop them on change,
+# but only in the cache of the worker that made the change: with a process-local default cache the
+# other workers keep their copy until it expires, so it is kept for a few seconds only
+USER_STATS_CACHE_TIMEOUT = config(
+    'USER_STATS_CACHE_TIMEOUT', default=600 if CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES else 5, cast=int,
+)
+# Throttling (socialhubapi.throttling): scope -> 'N/period', a bucket of N requests per identity
+# that refills one request every period/N seconds; rejected requests get 429 with Retry-After
+THROTTLE_ENABLED = config('THROTTLE_ENABLED', default=True, cast=bool)
+THROTTLE_RATES = {
+    # post create, edit, delete and shares
+    'posts': config('THROTTLE_POSTS_RATE', default='30/min'),
+    'comments': config('THROTTLE_COMMENTS_RATE', default='60/min'),
+    # likes, unlikes and bulk interaction batches
+    'interactions': config('THROTTLE_INTERACTIONS_RATE', default='120/min'),
+    'follows': config('THROTTLE_FOLLOWS_RATE', default='60/min'),
+    # post/comment/user search and the user list's ?search=
+    'search': config('THROTTLE_SEARCH_RATE', default='30/min'),
+}
+if 'test' in sys.argv:
+    # the test database is rolled back between tests, cached responses would outlive it
+    RESPONSE_CACHE_ENABLED = False
+    CONDITIONAL_REQUESTS_ENABLED = False
+    USER_STATS_CACHE_TIMEOUT = 0
+    # tests drive the same endpoints many times in a row
+    THROTTLE_ENABLED = False
+
+# List endpoints without pagination parameters
+# stream the full list in chunks instead of building it in memory (?stream=true/false overrides)
+STREAM_UNPAGINATED_LISTS = config('STREAM_UNPAGINATED_LISTS', default=False, cast=bool)
+STREAM_CHUNK_SIZE = config('STREAM_CHUNK_SIZE', default=500, cast=int)
+
 # JWT Configuration
 from datetime import timedelta
 
@@ -280,4 +396,35 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
     }
+# seconds a user's token version stamp stays in the default cache (0 reads it on every request)
+# StatelessJWTAuthentication checks only this stamp, not the user row. a revocation only clears the
+# stamp of the worker that made it, so stamps are cached by default only when the default cache
+# is shared (DEFAULT_CACHE_BACKEND); a process-local cache would let other workers accept revoked tokens
+TOKEN_VERSION_CACHE_TIMEOUT = config(
+    'TOKEN_VERSION_CACHE_TIMEOUT', default=300 if CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES else 0, cast=int,
+)
+# username-only mode: seconds a username -> user id mapping is kept in the default cache and
+# the in-process LRU (0 disables both), and how many names the LRU holds. renames and deletions
+# only drop the mapping in the worker that made them, and a stale one acts as the wrong user, so
+# names are cached by default only when the default cache is shared
+USERNAME_CACHE_TIMEOUT = config(
+    'USERNAME_CACHE_TIMEOUT', default=300 if CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES else 0, cast=int,
+)
+USERNAME_LRU_SIZE = config('USERNAME_LRU_SIZE', default=10000, cast=int)
+# seconds the original of a shared post (title, content, author) stays in the default cache (0 disables it);
+# an edit only drops the copy of the worker that saved it, so with a process-local default cache the
+# shares served by other workers would show the old text until it expires: kept for a few seconds only
+ORIGINAL_POST_CACHE_TIMEOUT = config(
+    'ORIGINAL_POST_CACHE_TIMEOUT', default=600 if CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES else 5, cast=int,
+)
+# seconds the in-memory follow graph behind /users/me/suggestions/ (users.graph) is kept before it
+# is reloaded from users_follow; follows made by this process apply immediately, those of other
+# processes once it reloads (0 reloads it on every request)
+FOLLOW_GRAPH_MAX_AGE = config('FOLLOW_GRAPH_MAX_AGE', default=300, cast=int)
+if 'test' in sys.argv:
+    # ids are reused after each test rollback, a cached stamp, id or post would belong to someone else
+    TOKEN_VERSION_CACHE_TIMEOUT = 0
+    USERNAME_CACHE_TIMEOUT = 0
+    FOLLOW_GRAPH_MAX_AGE = 0
+    ORIGINAL_POST_CACHE_TIMEOUT = 0
 
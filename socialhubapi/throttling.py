@@ -0,0 +1,127 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.throttling import BaseThrottle
+
+
+# token-bucket throttling for the write and search endpoints
+# a bucket with rate 'N/period' holds N requests and refills one every period/N seconds. it is
+# stored as a single number, GCRA style: the time at which the bucket will be full again ("tat").
+# a request is admitted while tat + period/N stays within one period of now, and pushes tat
+# forward by period/N. buckets are keyed by scope and identity (the authenticated user, whether
+# from a jwt, a token or a username, otherwise the client ip) and live in the "throttle" cache.
+# updates are atomic across workers: one lua script on the redis backend, and a short add() lock
+# elsewhere (add is atomic on the locmem, memcached and database backends)
+
+CACHE_ALIAS = 'throttle'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+PERIODS = {'s': 1, 'sec': 1, 'second': 1, 'm': 60, 'min': 60, 'minute': 60, 'h': 3600, 'hour': 3600, 'd': 86400, 'day': 86400}
+LOCK_ATTEMPTS = 20
+LOCK_WAIT = 0.001
+
+# KEYS[1] bucket; ARGV now, interval and period in ms; returns the ms to wait, 0 when admitted
+_GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local period = tonumber(ARGV[3])
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now) + interval
+if tat - now > period then
+    return tat - now - period
+end
+redis.call('SET', KEYS[1], tat, 'PX', tat - now)
+return 0
+"""
+
+
+def parse_rate(rate):
+    # 'N/period' -> (capacity, period in seconds), e.g. '30/min'
+    count, period = rate.split('/')
+    return int(count), PERIODS[period.strip().lower()]
+
+
+def _gcra(tat, now, interval, period):
+    # (new tat, seconds to wait) for one request against a bucket last pushed to tat
+    tat = max(tat if tat is not None else now, now) + interval
+    if tat - now > period:
+        return None, tat - now - period
+    return tat, 0.0
+
+
+def _consume_redis(cache, key, now, interval, period):
+    client = cache._cache.get_client(key, write=True)
+    waited = client.eval(
+        _GCRA_SCRIPT, 1, cache.make_and_validate_key(key),
+        int(now * 1000), math.ceil(interval * 1000), int(period * 1000),
+    )
+    return int(waited) / 1000
+
+
+def _consume_locked(cache, key, now, interval, period):
+    lock = f'{key}:lock'
+    for _attempt in range(LOCK_ATTEMPTS):
+        if cache.add(lock, 1, timeout=1):
+            break
+        time.sleep(LOCK_WAIT)
+    else:
+        # the bucket is busy with concurrent requests of the same identity, the case throttling
+        # exists for: reject rather than admit a request that consumed nothing
+        return interval
+    try:
+        tat, wait = _gcra(cache.get(key), now, interval, period)
+        if tat is not None:
+            cache.set(key, tat, timeout=math.ceil(tat - now))
+        return wait
+    finally:
+        cache.delete(lock)
+
+
+def consume(key, rate, now=None):
+    """take one request from the bucket at key; returns 0 when admitted, else the seconds to wait"""
+    capacity, period = parse_rate(rate)
+    now = time.time() if now is None else now
+    cache = caches[CACHE_ALIAS]
+    key = f'throttle:{key}'
+    if isinstance(cache, RedisCache):
+        return _consume_redis(cache, key, now, period / capacity, period)
+    return _consume_locked(cache, key, now, period / capacity, period)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    drf throttle drawing from the THROTTLE_RATES[scope] bucket of the requesting identity
+    """
+    scope = None
+    methods = WRITE_METHODS
+    # when set, only requests carrying this query parameter are throttled
+    param = None
+
+    def applies(self, request):
+        if request.method not in self.methods:
+            return False
+        return self.param is None or bool(request.query_params.get(self.param))
+
+    def identity(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        self.waiting = 0.0
+        if not settings.THROTTLE_ENABLED or not self.applies(request):
+            return True
+        self.waiting = consume(f'{self.scope}:{self.identity(request)}', settings.THROTTLE_RATES[self.scope])
+        return not self.waiting
+
+    def wait(self):
+        # drf turns this into the Retry-After header of the 429 response
+        return self.waiting
+
+
+def bucket(scope, methods=WRITE_METHODS, param=None):
+    """TokenBucketThrottle subclass for a scope, for throttle_classes"""
+    name = ''.join(part.capitalize() for part in scope.split('-'))
+    return type(f'{name}Throttle', (TokenBucketThrottle,), {'scope': scope, 'methods': methods, 'param': param})
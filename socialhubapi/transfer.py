@@ -0,0 +1,219 @@
+import csv
+import datetime
+import json
+from contextlib import contextmanager
+from itertools import islice
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts import validators
+
+
+# streaming import/export of users, posts, interactions and follows as NDJSON or CSV
+# users are referenced by username; posts and comments keep their ids so likes, comments, shares,
+# reposts and replies can point at them. export reads through .iterator() (a server-side cursor on
+# postgresql) and import inserts chunk by chunk, so memory stays flat whatever the row count
+
+FORMATS = ('ndjson', 'csv')
+
+# table -> (model, columns), in dependency order; a column holding a foreign key to the user
+# model carries the username, one pointing at a post or comment carries its id
+TABLES = {
+    'users': ('users.User', ('username', 'email', 'password', 'first_name', 'last_name', 'bio', 'avatar', 'is_active', 'created_at')),
+    'posts': ('posts.Post', ('id', 'user', 'title', 'content', 'post_type', 'original_post', 'share_comment', 'created_datetime')),
+    'likes': ('posts.Like', ('post', 'user', 'created_datetime')),
+    'comments': ('posts.Comment', ('id', 'post', 'parent', 'user', 'content', 'created_datetime')),
+    'shares': ('posts.Share', ('post', 'user', 'created_datetime')),
+    'follows': ('users.Follow', ('follower', 'following', 'created_at')),
+}
+
+# batch versions of the model rules, bulk_create skips save() and with it the checks
+BATCH_VALIDATORS = {
+    'posts': validators.invalid_posts,
+    'comments': validators.invalid_comments,
+}
+
+
+def _table(name):
+    label, columns = TABLES[name]
+    return apps.get_model(label), columns
+
+
+def _field(model, column):
+    return model._meta.get_field(column)
+
+
+def _points_at_user(field):
+    return field.is_relation and field.related_model._meta.label == 'users.User'
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def _lookup(model, column):
+    field = _field(model, column)
+    if _points_at_user(field):
+        return f'{column}__username'
+    return field.attname
+
+
+def _dump(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def export_table(name, stream, fmt='ndjson', chunk_size=2000):
+    # write every row of a table to stream in primary key order and return the row count
+    model, columns = _table(name)
+    rows = model._base_manager.order_by('pk').values_list(*[_lookup(model, column) for column in columns])
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+    count = 0
+    for row in rows.iterator(chunk_size=chunk_size):
+        values = [_dump(value) for value in row]
+        if writer is not None:
+            writer.writerow(['' if value is None else value for value in values])
+        else:
+            stream.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def read_rows(stream, fmt='ndjson'):
+    # one dict per row; csv cells are strings, empty meaning missing
+    if fmt == 'csv':
+        for row in csv.DictReader(stream):
+            yield {column: value for column, value in row.items() if value != ''}
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+@contextmanager
+def _keeping_timestamps(model):
+    # bulk_create runs pre_save, which stamps auto_now_add fields with the current time;
+    # switch that off while importing so exported timestamps survive (commands run single-threaded)
+    fields = [field for field in model._meta.concrete_fields if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield {field.name for field in fields}
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _references(model, columns, chunk):
+    # resolve the usernames and related ids of a chunk with one query per referenced model;
+    # returns ({username: user id}, {related model: set of existing ids})
+    from users.models import User
+
+    usernames, wanted = set(), {}
+    for column in columns:
+        field = _field(model, column)
+        if not field.is_relation:
+            continue
+        values = {row[column] for row in chunk if row.get(column) is not None}
+        if _points_at_user(field):
+            usernames |= {str(value) for value in values}
+        else:
+            wanted.setdefault(field.related_model, set()).update(int(value) for value in values)
+    users = dict(User.objects.filter(username__in=usernames).values_list('username', 'pk')) if usernames else {}
+    known = {related: set(related._base_manager.filter(pk__in=ids).values_list('pk', flat=True)) for related, ids in wanted.items()}
+    return users, known
+
+
+def _instance(model, columns, row, users, known, stamped):
+    # model instance for one row, None when it references an unknown user, post or comment
+    values = {}
+    for column in columns:
+        field = _field(model, column)
+        value = row.get(column)
+        if field.is_relation:
+            if value is not None:
+                value = users.get(str(value)) if _points_at_user(field) else (int(value) if int(value) in known[field.related_model] else None)
+                if value is None:
+                    return None
+            elif not field.null:
+                return None
+            values[field.attname] = value
+        elif value is not None:
+            values[column] = field.to_python(value)
+        elif column in stamped:
+            values[column] = timezone.now()
+    if 'password' in columns and not values.get('password'):
+        values['password'] = make_password(None)
+    return model(**values)
+
+
+def _build(model, columns, chunk, stamped, check=None):
+    # model instances of a chunk that will be inserted, the number of rows dropped for unknown
+    # references and the number breaking the rules
+    users, known = _references(model, columns, chunk)
+    stored = known.get(model)
+    # reposts and replies may point at rows of the same chunk, but only at rows that are inserted:
+    # drop the rows whose target was dropped, until no more rows go
+    inserted = {int(row['id']) for row in chunk if row.get('id') is not None}
+    while True:
+        if stored is not None:
+            known[model] = stored | inserted
+        built = [instance for row in chunk if (instance := _instance(model, columns, row, users, known, stamped)) is not None]
+        invalid = check(built) if check is not None else {}
+        valid = [instance for index, instance in enumerate(built) if index not in invalid]
+        kept = {instance.pk for instance in valid}
+        if stored is None or kept == inserted:
+            return valid, len(chunk) - len(built), len(invalid)
+        inserted = kept
+
+
+def _reset_sequence(model):
+    # rows were inserted with explicit ids, move the id sequence past them (postgresql)
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_table(name, stream, fmt='ndjson', batch_size=1000):
+    # insert the rows of a table chunk by chunk; rows that already exist (same id or unique key)
+    # are left untouched, rows referencing unknown or dropped users, posts or comments are skipped,
+    # and rows breaking the post or comment rules are counted as invalid. 'rows' counts the rows
+    # actually inserted (ignore_conflicts does not report them, so the table is counted around the import)
+    model, columns = _table(name)
+    check = BATCH_VALIDATORS.get(name)
+    counts = {'rows': 0, 'existing': 0, 'skipped': 0, 'invalid': 0}
+    before = model._base_manager.count()
+    read = 0
+    with _keeping_timestamps(model) as stamped:
+        for chunk in _chunks(read_rows(stream, fmt), batch_size):
+            instances, skipped, invalid = _build(model, columns, chunk, stamped, check)
+            with transaction.atomic():
+                model._base_manager.bulk_create(instances, batch_size=batch_size, ignore_conflicts=True)
+            read += len(chunk)
+            counts['skipped'] += skipped
+            counts['invalid'] += invalid
+    counts['rows'] = model._base_manager.count() - before
+    counts['existing'] = read - counts['rows'] - counts['skipped'] - counts['invalid']
+    if 'id' in columns:
+        _reset_sequence(model)
+    return counts
@@ -20,6 +20,8 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    # async profile reads live below the async post routes, where no username can shadow them
+    path('careers/async/users/', include('users.async_urls')),
     path('careers/', include('posts.urls')),
     path('careers/users/', include('users.urls')),
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
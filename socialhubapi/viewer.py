@@ -0,0 +1,95 @@
+# per-request viewer state for list serializers
+# instead of asking "did the viewer like this post?" once per row, the views load the
+# viewer's likes and follows for the whole page in one query each and serializers
+# answer with set membership
+
+
+class ViewerState:
+
+    def __init__(self, user):
+        self.user = user if user is not None and user.is_authenticated else None
+        self.liked_post_ids = None
+        self.followed_user_ids = None
+        self._loaded_post_ids = set()
+        self._loaded_user_ids = set()
+
+    @property
+    def is_authenticated(self):
+        return self.user is not None
+
+    def _likes_query(self, posts):
+        # (query of liked ids or None when nothing needs loading, ids being loaded)
+        from posts.models import Like
+        post_ids = {post.pk for post in posts} - self._loaded_post_ids
+        self.liked_post_ids = self.liked_post_ids or set()
+        self._loaded_post_ids |= post_ids
+        if not (self.is_authenticated and post_ids):
+            return None
+        return Like.objects.filter(user_id=self.user.pk, post_id__in=post_ids).values_list('post_id', flat=True)
+
+    def _follows_query(self, users):
+        from users.models import Follow
+        user_ids = {user.pk for user in users} - self._loaded_user_ids
+        self.followed_user_ids = self.followed_user_ids or set()
+        self._loaded_user_ids |= user_ids
+        if not (self.is_authenticated and user_ids):
+            return None
+        return Follow.objects.filter(follower_id=self.user.pk, following_id__in=user_ids).values_list('following_id', flat=True)
+
+    def load_likes(self, posts):
+        # one query for every post on the page
+        query = self._likes_query(posts)
+        if query is not None:
+            self.liked_post_ids.update(query)
+
+    def load_follows(self, users):
+        # one query for every user on the page
+        query = self._follows_query(users)
+        if query is not None:
+            self.followed_user_ids.update(query)
+
+    async def aload_likes(self, posts):
+        query = self._likes_query(posts)
+        if query is not None:
+            self.liked_post_ids.update([post_id async for post_id in query])
+
+    async def aload_follows(self, users):
+        query = self._follows_query(users)
+        if query is not None:
+            self.followed_user_ids.update([user_id async for user_id in query])
+
+    def has_liked(self, post):
+        # True/False when known, None when the post was not preloaded
+        if not self.is_authenticated:
+            return False
+        if post.pk not in self._loaded_post_ids:
+            return None
+        return post.pk in self.liked_post_ids
+
+    def is_following(self, user):
+        # True/False when known, None when the user was not preloaded
+        if not self.is_authenticated:
+            return False
+        if user.pk not in self._loaded_user_ids:
+            return None
+        return user.pk in self.followed_user_ids
+
+
+def viewer_context(request, posts=None, users=None):
+    # serializer context carrying a viewer state preloaded for the given page
+    viewer = ViewerState(getattr(request, 'user', None))
+    if posts is not None:
+        viewer.load_likes(posts)
+    if users is not None:
+        viewer.load_follows(users)
+    return {'request': request, 'viewer': viewer}
+
+
+async def aviewer_context(request, posts=None, users=None):
+    # viewer_context for the async views (request.user must already be resolved)
+    viewer = ViewerState(getattr(request, 'user', None))
+    if posts is not None:
+        await viewer.aload_likes(posts)
+    if users is not None:
+        await viewer.aload_follows(users)
+    return {'request': request, 'viewer': viewer}
@@ -13,7 +13,5 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'socialhubapi.settings')
 
-# Import auto_migrate to run migrations automatically
-import auto_migrate
-
+# migrations are applied once before the workers start (manage.py prestart, see gunicorn.conf.py)
 application = get_wsgi_application()
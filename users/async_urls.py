@@ -0,0 +1,14 @@
+from django.urls import path
+from . import async_views
+
+app_name = 'users-async'
+
+# native async read endpoints (ASGI), same responses as their users:* counterparts
+# mounted under /careers/async/users/, outside /careers/users/<username>/ where a user named
+# "async" would shadow them
+urlpatterns = [
+    path('<str:username>/', async_views.user_profile, name='user-profile'),
+    path('<str:username>/stats/', async_views.public_user_stats, name='public-user-stats'),
+    path('<str:username>/followers/', async_views.followers_list, name='followers-list'),
+    path('<str:username>/following/', async_views.following_list, name='following-list'),
+]
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.shortcuts import aget_object_or_404
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from posts.models import Post
+from socialhubapi.async_views import async_read_view, json_response
+from socialhubapi.viewer import aviewer_context
+
+from . import stats as profile_stats
+from .stats import related_count
+from .models import User, Follow
+from .serializers import UserListSerializer, UserProfileCountsSerializer
+
+
+# native async versions of the hot profile read endpoints, served under /careers/async/users/
+# same parameters and response bodies as UserProfileView, public_user_stats and the follower lists
+
+
+@async_read_view
+async def user_profile(request, username):
+    """
+    get /careers/async/users/{username}/ - public profile with post and follow counts in one query
+    """
+    user = await aget_object_or_404(
+        User.objects.annotate(
+            posts_total=related_count(Post, 'user'),
+            followers_total=related_count(Follow, 'following'),
+            following_total=related_count(Follow, 'follower'),
+        ),
+        username=username,
+    )
+    return json_response(UserProfileCountsSerializer(user).data)
+
+
+@async_read_view
+async def public_user_stats(request, username):
+    """
+    get /careers/async/users/{username}/stats/ - public user statistics
+    """
+    user = await User.objects.filter(username=username).values('pk').afirst()
+    if user is None:
+        return json_response({'error': 'User not found'}, status=404)
+    return json_response(await profile_stats.aget_stats(user['pk']))
+
+
+def _positive_int(value, default, strict=False):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    if number < 0 or (strict and number == 0):
+        return default
+    return number
+
+
+async def _limit_offset_response(request, queryset):
+    """
+    the limit/offset envelope of the drf list views (count, next, previous, results)
+    """
+    limit = _positive_int(request.GET.get('limit'), settings.REST_FRAMEWORK['PAGE_SIZE'], strict=True)
+    offset = _positive_int(request.GET.get('offset'), 0)
+    count = await queryset.acount()
+    users = [user async for user in queryset[offset:offset + limit]]
+
+    url = request.build_absolute_uri()
+    next_url = None
+    if offset + limit < count:
+        next_url = replace_query_param(replace_query_param(url, 'limit', limit), 'offset', offset + limit)
+    previous_url = None
+    if offset > 0:
+        previous_url = replace_query_param(url, 'limit', limit)
+        if offset - limit <= 0:
+            previous_url = remove_query_param(previous_url, 'offset')
+        else:
+            previous_url = replace_query_param(previous_url, 'offset', offset - limit)
+
+    serializer = UserListSerializer(users, many=True, context=await aviewer_context(request, users=users))
+    return json_response({'count': count, 'next': next_url, 'previous': previous_url, 'results': serializer.data})
+
+
+@async_read_view
+async def followers_list(request, username):
+    """
+    get /careers/async/users/{username}/followers/ - users who follow the given user
+    """
+    user = await aget_object_or_404(User, username=username)
+    follower_ids = Follow.objects.filter(following=user).values('follower_id')
+    return await _limit_offset_response(request, User.objects.filter(id__in=follower_ids))
+
+
+@async_read_view
+async def following_list(request, username):
+    """
+    get /careers/async/users/{username}/following/ - users the given user follows
+    """
+    user = await aget_object_or_404(User, username=username)
+    following_ids = Follow.objects.filter(follower=user).values('following_id')
+    return await _limit_offset_response(request, User.objects.filter(id__in=following_ids))
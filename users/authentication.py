@@ -1,6 +1,17 @@
 from rest_framework import authentication
 from rest_framework import exceptions
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.base import ModelState
+from django.utils.functional import SimpleLazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import usernames
 
 User = get_user_model()
 
@@ -32,19 +43,197 @@ class UsernameAuthentication(authentication.BaseAuthentication):
             return None
         
         try:
-            # get or create user with just username
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={
-                    'email': f'{username}@example.com',  # dummy email
-                    'is_active': True,
-                }
-            )
-            return (user, None)  # no credentials needed
-        except User.DoesNotExist:
-            raise exceptions.AuthenticationFailed('invalid username')
+            # cached username -> id, the user row is created once on first use
+            return (usernames.get_or_create_user(username), None)  # no credentials needed
         except Exception as e:
             raise exceptions.AuthenticationFailed(f'authentication error: {str(e)}')
     
     def authenticate_header(self, request):
         return 'Username'
+
+
+# ============================================================================
+# STATELESS JWT AUTHENTICATION
+# ============================================================================
+
+USERNAME_CLAIM = 'username'
+TOKEN_VERSION_CLAIM = 'ver'
+TOKEN_VERSION_PREFIX = 'token-version:'
+REVOKED = -1  # cached for inactive or deleted users
+
+
+def issue_tokens(user):
+    """
+    refresh token (and its access token) carrying the claims StatelessJWTAuthentication trusts
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh[USERNAME_CLAIM] = user.username
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return refresh
+
+
+def _version_key(user_id):
+    return f'{TOKEN_VERSION_PREFIX}{user_id}'
+
+
+def _version_query(user_id):
+    return User.objects.filter(pk=user_id).values_list('token_version', 'is_active')
+
+
+def _as_version(row):
+    return row[0] if row is not None and row[1] else REVOKED
+
+
+def current_token_version(user_id):
+    """
+    the version tokens of this user must carry (REVOKED for inactive or missing users)
+    read from the default cache, so a valid request costs no query once the stamp is cached
+    """
+    timeout = settings.TOKEN_VERSION_CACHE_TIMEOUT
+    key = _version_key(user_id)
+    version = cache.get(key) if timeout else None
+    if version is None:
+        version = _as_version(_version_query(user_id).first())
+        if timeout:
+            cache.set(key, version, timeout)
+    return version
+
+
+async def acurrent_token_version(user_id):
+    """
+    async version of current_token_version
+    """
+    timeout = settings.TOKEN_VERSION_CACHE_TIMEOUT
+    key = _version_key(user_id)
+    version = await cache.aget(key) if timeout else None
+    if version is None:
+        version = _as_version(await _version_query(user_id).afirst())
+        if timeout:
+            await cache.aset(key, version, timeout)
+    return version
+
+
+def forget_token_version(user_id):
+    """
+    drop the cached stamp once the change that made it stale commits
+    """
+    key = _version_key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class TokenUser(SimpleLazyObject):
+    """
+    request.user built from verified token claims
+    id, username and the authentication flags come from the token; anything else
+    (profile fields, save(), relations) loads the User row on first access
+    """
+    
+    def __init__(self, user_id, username):
+        # LazyObject.__setattr__ would load the user, write the claims directly
+        self.__dict__['_claims'] = {'id': user_id, 'username': username}
+        super().__init__(lambda: User.objects.get(pk=user_id))
+    
+    def _claim(self, name):
+        if self._wrapped is not empty:
+            return getattr(self._wrapped, name)
+        return self._claims[name]
+    
+    @property
+    def id(self):
+        return self._claim('id')
+    
+    @property
+    def pk(self):
+        return self._claim('id')
+    
+    @property
+    def username(self):
+        return self._claim('username')
+    
+    @property
+    def is_active(self):
+        # inactive users never get past the version check
+        return True
+    
+    @property
+    def is_authenticated(self):
+        return True
+    
+    @property
+    def is_anonymous(self):
+        return False
+    
+    @property
+    def __class__(self):
+        return User
+    
+    @property
+    def _meta(self):
+        # with __class__ and _state, the ORM can use the instance in filters and
+        # foreign key assignments without loading it
+        return User._meta
+    
+    @property
+    def _state(self):
+        if self._wrapped is not empty:
+            return self._wrapped._state
+        if '_token_state' not in self.__dict__:
+            state = ModelState()
+            state.db, state.adding = DEFAULT_DB_ALIAS, False
+            self.__dict__['_token_state'] = state
+        return self.__dict__['_token_state']
+    
+    def __bool__(self):
+        return True
+    
+    def __eq__(self, other):
+        return isinstance(other, User) and other.pk == self.pk
+    
+    def __hash__(self):
+        return hash(self.pk)
+    
+    def __str__(self):
+        return self.username
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the claims of a verified access token instead of loading
+    the user on every request; the only check is the cached version stamp, so revoking
+    tokens or deactivating the user still takes effect
+    tokens issued before the claims existed fall back to the database lookup
+    """
+    
+    def _claims(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        if USERNAME_CLAIM not in validated_token or TOKEN_VERSION_CLAIM not in validated_token:
+            return user_id, None
+        return user_id, validated_token[TOKEN_VERSION_CLAIM]
+    
+    def _check_version(self, version, current):
+        if current == REVOKED:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+        if version != current:
+            raise exceptions.AuthenticationFailed('Token has been revoked', code='token_revoked')
+    
+    def get_user(self, validated_token):
+        user_id, version = self._claims(validated_token)
+        if version is None:
+            return super().get_user(validated_token)
+        self._check_version(version, current_token_version(user_id))
+        return TokenUser(user_id, validated_token[USERNAME_CLAIM])
+    
+    async def aget_user(self, validated_token):
+        user_id, version = self._claims(validated_token)
+        if version is None:
+            user = await User.objects.filter(pk=user_id).afirst()
+            if user is None:
+                raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+            return user
+        self._check_version(version, await acurrent_token_version(user_id))
+        return TokenUser(user_id, validated_token[USERNAME_CLAIM])
@@ -0,0 +1,251 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+
+from .models import Follow
+
+
+# "who to follow" suggestions from an in-memory copy of users_follow
+# the follows are held as a compressed sparse row (CSR) graph: targets lists every followed id
+# grouped by follower and offsets[u]:offsets[u + 1] is the slice holding the follows of user u,
+# so friends of friends are one vectorized gather over the slices of the people u follows.
+# follows and unfollows made by this process land in a small overlay that is folded into the
+# arrays once it grows. follows made by other processes are not applied incrementally: they only
+# show up when the whole graph is reloaded from the table, every FOLLOW_GRAPH_MAX_AGE seconds
+# memory: 4 bytes per follow (int32 targets) plus 8 bytes per user id (int64 offsets), 46 MiB
+# for 10M follows between 1M users; building it peaks at about 3.5x that (benchmark_follow_graph)
+
+CHUNK_SIZE = 100000
+# overlay pairs kept before they are folded into the arrays
+COMPACT_AFTER = 10000
+
+
+def _target_dtype(size):
+    return np.int32 if size <= np.iinfo(np.int32).max else np.int64
+
+
+def _tally(values, size):
+    """(sorted distinct ids, occurrences) of an array of user ids, size being the number of ids"""
+    if len(values) * 8 < size:
+        # sorting a few ids beats allocating a counter for every user id
+        return np.unique(values, return_counts=True)
+    counts = np.bincount(values)
+    present = np.flatnonzero(counts)
+    return present, counts[present]
+
+
+class FollowGraph:
+    """
+    csr arrays of follower -> followed ids, plus the follows changed since they were built
+    """
+
+    def __init__(self, offsets, targets, built_at=None):
+        self.offsets = offsets
+        self.targets = targets
+        self.built_at = time.monotonic() if built_at is None else built_at
+        # follower id -> followed ids missing from / removed from the arrays
+        self.added = {}
+        self.removed = {}
+        self.pending = 0
+
+    @classmethod
+    def from_edges(cls, followers, following, built_at=None):
+        """graph of the (followers[i], following[i]) pairs, which must be unique"""
+        followers = np.asarray(followers, dtype=np.int64)
+        following = np.asarray(following, dtype=np.int64)
+        size = int(max(followers.max(initial=-1), following.max(initial=-1))) + 1
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(followers, minlength=size), out=offsets[1:])
+        targets = following[np.argsort(followers, kind='stable')].astype(_target_dtype(size))
+        return cls(offsets, targets, built_at)
+
+    @property
+    def size(self):
+        """number of user ids the arrays cover"""
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + self.targets.nbytes
+
+    def _row(self, user_id):
+        if 0 <= user_id < self.size:
+            return self.targets[self.offsets[user_id]:self.offsets[user_id + 1]]
+        return self.targets[:0]
+
+    def follows(self, user_id):
+        """ids followed by user_id"""
+        row = self._row(user_id)
+        removed = self.removed.get(user_id)
+        if removed:
+            row = row[~np.isin(row, list(removed))]
+        added = self.added.get(user_id)
+        if added:
+            row = np.concatenate((row, np.fromiter(added, dtype=np.int64, count=len(added)).astype(row.dtype)))
+        return row
+
+    def follow(self, follower_id, following_id):
+        removed = self.removed.get(follower_id)
+        if removed and following_id in removed:
+            removed.discard(following_id)
+        elif not np.any(self._row(follower_id) == following_id):
+            self.added.setdefault(follower_id, set()).add(following_id)
+        self.pending += 1
+
+    def unfollow(self, follower_id, following_id):
+        added = self.added.get(follower_id)
+        if added and following_id in added:
+            added.discard(following_id)
+        elif np.any(self._row(follower_id) == following_id):
+            self.removed.setdefault(follower_id, set()).add(following_id)
+        self.pending += 1
+
+    def compacted(self):
+        """a new graph with the overlay folded into the arrays"""
+        followers = np.repeat(np.arange(self.size, dtype=np.int64), np.diff(self.offsets))
+        keep = np.ones(len(self.targets), dtype=bool)
+        for follower_id, removed in self.removed.items():
+            start, end = self.offsets[follower_id], self.offsets[follower_id + 1]
+            keep[start:end] = ~np.isin(self.targets[start:end], list(removed))
+        added = [(follower_id, following_id) for follower_id, ids in self.added.items() for following_id in ids]
+        added = np.array(added, dtype=np.int64).reshape(-1, 2)
+        return FollowGraph.from_edges(
+            np.concatenate((followers[keep], added[:, 0])),
+            np.concatenate((self.targets[keep], added[:, 1])),
+            built_at=self.built_at,
+        )
+
+    def suggestions(self, user_id, limit=20):
+        """
+        [(user id, mutual count)] of the users followed by the people user_id follows, most
+        mutuals first and lower ids first on ties; user_id and whoever they follow are left out
+        """
+        direct = self.follows(user_id).astype(np.int64)
+        if not len(direct):
+            return []
+        # gather the slices of every followed user without a python loop: positions of slice i
+        # run from offsets[row] upwards, shifted by the lengths of the slices before it
+        rows = direct[direct < self.size]
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        second = self.targets[np.arange(int(lengths.sum()), dtype=np.int64) + shifts]
+
+        # followed users whose follows changed since the arrays were built
+        added, removed = [], []
+        changed = set(self.added) | set(self.removed)
+        if changed:
+            for friend in direct[np.isin(direct, list(changed))].tolist():
+                added.extend(self.added.get(friend, ()))
+                removed.extend(self.removed.get(friend, ()))
+        if added:
+            second = np.concatenate((second.astype(np.int64), np.array(added, dtype=np.int64)))
+        candidates, counts = _tally(second, self.size)
+        if removed:
+            # removed follows are still in the arrays, so they were counted above
+            gone, times = np.unique(np.array(removed, dtype=np.int64), return_counts=True)
+            counts[np.searchsorted(candidates, gone)] -= times
+
+        keep = (counts > 0) & (candidates != user_id) & ~np.isin(candidates, direct)
+        candidates, counts = candidates[keep], counts[keep]
+        if len(candidates) > limit:
+            best = np.argpartition(-counts, limit - 1)[:limit]
+            candidates, counts = candidates[best], counts[best]
+        order = np.lexsort((candidates, -counts))
+        return [(int(candidate), int(count)) for candidate, count in zip(candidates[order], counts[order])]
+
+
+# ============================================================================
+# PROCESS-WIDE GRAPH
+# ============================================================================
+
+_graph = None
+_lock = threading.Lock()
+# held by the thread reloading the graph
+_reload_lock = threading.Lock()
+# follows and unfollows committed while the graph is reloaded, None when no reload runs
+_replay = None
+
+
+def load(using='default', chunk_size=CHUNK_SIZE):
+    """graph of every row of users_follow, streamed from the cursor straight into numpy"""
+    queryset = Follow.objects.using(using).order_by().values_list('follower_id', 'following_id')
+    sql, params = queryset.query.sql_with_params()
+    chunks = []
+    with connections[using].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(chunk_size):
+            chunks.append(np.array(rows, dtype=np.int64))
+    edges = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.int64)
+    return FollowGraph.from_edges(edges[:, 0], edges[:, 1])
+
+
+def get_graph():
+    """
+    the process graph, reloaded once older than FOLLOW_GRAPH_MAX_AGE (0 loads it every call);
+    one thread reloads while the others wait for its graph, and the follows and unfollows
+    committed during the load are replayed onto it
+    """
+    global _graph, _replay
+    max_age = settings.FOLLOW_GRAPH_MAX_AGE
+    if not max_age:
+        return load()
+    with _lock:
+        if _graph is not None and time.monotonic() - _graph.built_at < max_age:
+            return _graph
+    with _reload_lock:
+        with _lock:
+            # another thread may have reloaded it while this one waited
+            if _graph is not None and time.monotonic() - _graph.built_at < max_age:
+                return _graph
+            _replay = []
+        try:
+            graph = load()
+            with _lock:
+                # replaying is safe for changes the load already saw: following twice or
+                # unfollowing a missing pair leaves the graph as it is
+                for change, follower_id, following_id in _replay:
+                    change(graph, follower_id, following_id)
+                _graph = graph
+        finally:
+            with _lock:
+                _replay = None
+        return graph
+
+
+def reset():
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def _apply(change, follower_id, following_id):
+    global _graph
+    with _lock:
+        if _replay is not None:
+            _replay.append((change, follower_id, following_id))
+        if _graph is None:
+            return
+        change(_graph, follower_id, following_id)
+        if _graph.pending >= COMPACT_AFTER:
+            _graph = _graph.compacted()
+
+
+def follow(follower_id, following_id):
+    """record a committed follow in the loaded graph"""
+    _apply(FollowGraph.follow, follower_id, following_id)
+
+
+def unfollow(follower_id, following_id):
+    """record a committed unfollow in the loaded graph"""
+    _apply(FollowGraph.unfollow, follower_id, following_id)
+
+
+def suggestions(user_id, limit=20):
+    """[(user id, mutual count)] of the best second-degree connections of user_id"""
+    graph = get_graph()
+    with _lock:
+        return graph.suggestions(user_id, limit)
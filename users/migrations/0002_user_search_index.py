@@ -0,0 +1,28 @@
+# Generated by Django 5.0.8 on 2026-10-17 09:12
+
+from django.db import migrations
+
+from socialhubapi import search
+
+
+# columns frozen here so later changes to search.INDEXED_FIELDS need their own migration
+USER_FIELDS = (('username', 'A'), ('first_name', 'A'), ('last_name', 'A'), ('bio', 'B'))
+
+
+def create_index(apps, schema_editor):
+    search.create_index(schema_editor, 'users_user', USER_FIELDS)
+
+
+def drop_index(apps, schema_editor):
+    search.drop_index(schema_editor, 'users_user', USER_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.8 on 2026-10-17 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['following', '-created_at', 'follower'], name='follow_following_recent_idx'),
+        ),
+    ]
@@ -20,6 +20,8 @@ class User(AbstractUser):
     avatar = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # stamped into every JWT; bumping it revokes all tokens issued before
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     
     # social features
     followers = models.ManyToManyField(
@@ -42,6 +44,34 @@ class User(AbstractUser):
     def __str__(self):
         return self.username
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """remember the loaded username, so a save can tell it is a rename"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_username = instance.username if 'username' in field_names else None
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """a new password also revokes the tokens issued with the old one"""
+        # set_password() leaves the raw password in _password until the next save; hash upgrades
+        # at login clear it first, so they keep the tokens they are about to be issued
+        password_changed = self._password is not None and not self._state.adding
+        if password_changed:
+            self.token_version = models.F('token_version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_version'}
+        super().save(*args, **kwargs)
+        if password_changed:
+            self.refresh_from_db(fields=['token_version'])
+    
+    def revoke_tokens(self):
+        """invalidate every JWT issued to this user so far"""
+        User.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.token_version += 1
+        from .authentication import forget_token_version
+        forget_token_version(self.pk)
+    
     @property
     def posts_count(self):
         """return total number of posts by this user"""
@@ -77,6 +107,10 @@ class Follow(models.Model):
     class Meta:
         db_table = 'users_follow'
         unique_together = ['follower', 'following']
+        # follower lists start from the followed user; carrying follower_id makes the index covering
+        indexes = [
+            models.Index(fields=['following', '-created_at', 'follower'], name='follow_following_recent_idx'),
+        ]
         verbose_name = 'Follow'
         verbose_name_plural = 'Follows'
         ordering = ['-created_at']
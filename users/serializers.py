@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.conf import settings
+from . import usernames
 from .models import User, Follow
 
 
@@ -72,6 +73,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'created_at']
 
 
+class UserProfileCountsSerializer(UserProfileSerializer):
+    """
+    user profile built from annotated counts (posts_total, followers_total, following_total)
+    so serializing runs no queries, used by the async profile view
+    """
+    posts_count = serializers.IntegerField(source='posts_total', read_only=True)
+    followers_count = serializers.IntegerField(source='followers_total', read_only=True)
+    following_count = serializers.IntegerField(source='following_total', read_only=True)
+
+
 class UserDetailSerializer(serializers.ModelSerializer):
     """
     serializer for detailed user information (private)
@@ -157,6 +168,12 @@ class UserListSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'first_name', 'last_name', 'avatar', 'is_following']
     
     def get_is_following(self, obj):
+        # use the page's preloaded follows when the view provided them
+        viewer = self.context.get('viewer')
+        if viewer is not None:
+            following = viewer.is_following(obj)
+            if following is not None:
+                return following
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Follow.objects.filter(
@@ -220,14 +237,7 @@ class SimpleUserLoginSerializer(serializers.Serializer):
         
         try:
             # get or create user
-            user, created = User.objects.get_or_create(
-                username=username,
-                defaults={
-                    'email': f'{username}@example.com',
-                    'is_active': True,
-                }
-            )
-            attrs['user'] = user
+            attrs['user'] = User.objects.get(pk=usernames.get_or_create_id(username))
         except Exception as e:
             raise serializers.ValidationError(f'error creating user: {str(e)}')
         
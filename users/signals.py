@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import graph, usernames
+from .authentication import forget_token_version
+from .models import User, Follow
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_token_version(sender, instance, update_fields=None, **kwargs):
+    # deactivation, password changes and deletions must reach StatelessJWTAuthentication;
+    # logins only touch last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    forget_token_version(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_username(sender, instance, created=False, update_fields=None, **kwargs):
+    # renamed or deleted users must not resolve from a cached username
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    usernames.forget(instance.pk, instance.username)
+
+
+@receiver(post_save, sender=Follow)
+def add_graph_edge(sender, instance, created, raw=False, **kwargs):
+    # keep the in-memory follow graph of this process current once the follow commits
+    if created and not raw:
+        follower_id, following_id = instance.follower_id, instance.following_id
+        transaction.on_commit(lambda: graph.follow(follower_id, following_id))
+
+
+@receiver(post_delete, sender=Follow)
+def remove_graph_edge(sender, instance, **kwargs):
+    follower_id, following_id = instance.follower_id, instance.following_id
+    transaction.on_commit(lambda: graph.unfollow(follower_id, following_id))
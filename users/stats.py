@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from posts.models import Post
+
+from .models import User, Follow
+
+
+# profile statistics for /users/me/stats/ and /users/{username}/stats/
+# all five numbers come from one query: correlated subqueries for posts and follows, and sums of the
+# denormalized post counters (likes_count, comments_count) instead of joining likes and comments;
+# results are cached per user id and dropped by the post, like, comment and follow signals
+
+CACHE_PREFIX = 'user-stats:'
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count', 'likes_received', 'comments_received')
+
+
+def _cache_key(user_id):
+    return f'{CACHE_PREFIX}{user_id}'
+
+
+def related_count(model, field):
+    """correlated COUNT(*) of model rows pointing at the outer user through field"""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def _sum(field):
+    """correlated SUM of a post counter over the outer user's posts"""
+    rows = Post.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def stats_queryset():
+    """users annotated with every stats field"""
+    return User.objects.annotate(
+        posts_count_total=related_count(Post, 'user'),
+        followers_count_total=related_count(Follow, 'following'),
+        following_count_total=related_count(Follow, 'follower'),
+        likes_received_total=_sum('likes_count'),
+        comments_received_total=_sum('comments_count'),
+    ).values(*[f'{field}_total' for field in STATS_FIELDS])
+
+
+def _as_stats(row):
+    return {field: row[f'{field}_total'] for field in STATS_FIELDS}
+
+
+def compute(user_id):
+    """stats for one user straight from the database, None if the user does not exist"""
+    row = stats_queryset().filter(pk=user_id).first()
+    return _as_stats(row) if row is not None else None
+
+
+def get_stats(user_id):
+    """cached stats for one user"""
+    if not settings.USER_STATS_CACHE_TIMEOUT:
+        return compute(user_id)
+    key = _cache_key(user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute(user_id)
+        if stats is not None:
+            cache.set(key, stats, settings.USER_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+async def aget_stats(user_id):
+    """async version of get_stats"""
+    timeout = settings.USER_STATS_CACHE_TIMEOUT
+    key = _cache_key(user_id)
+    stats = await cache.aget(key) if timeout else None
+    if stats is None:
+        row = await stats_queryset().filter(pk=user_id).afirst()
+        if row is None:
+            return None
+        stats = _as_stats(row)
+        if timeout:
+            await cache.aset(key, stats, timeout)
+    return stats
+
+
+def invalidate(*user_ids):
+    """drop cached stats once the surrounding transaction commits"""
+    keys = [_cache_key(user_id) for user_id in user_ids if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_post_authors(post_ids):
+    """drop cached stats of the authors of these posts (likes and comments received)"""
+    post_ids = [post_id for post_id in post_ids if post_id]
+    if post_ids:
+        transaction.on_commit(lambda: cache.delete_many([
+            _cache_key(user_id)
+            for user_id in set(Post.objects.filter(pk__in=post_ids).values_list('user_id', flat=True))
+            if user_id
+        ]))
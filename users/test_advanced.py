@@ -159,6 +159,339 @@ class PublicUserProfileTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
 
+class UserStatsCacheTests(APITestCase):
+    """test profile stats come from one query and are cached until something changes"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='statsowner', email='statsowner@example.com', password='testpass123')
+        self.fan = User.objects.create_user(username='statsfan', email='statsfan@example.com', password='testpass123')
+        Follow.objects.create(follower=self.fan, following=self.user)
+        self.posts = [Post.objects.create(user=self.user, title=f'Post {index}', content='Body') for index in range(3)]
+        for post in self.posts:
+            Like.objects.create(post=post, user=self.fan)
+        Comment.objects.create(post=self.posts[0], user=self.fan, content='Nice')
+    
+    def test_stats_in_one_query(self):
+        """test all five numbers are computed in a single query regardless of activity"""
+        from .stats import compute
+        with self.assertNumQueries(1):
+            stats = compute(self.user.pk)
+        self.assertEqual(stats, {
+            'posts_count': 3, 'followers_count': 1, 'following_count': 0,
+            'likes_received': 3, 'comments_received': 1,
+        })
+        self.assertIsNone(compute(0))
+    
+    def test_cached_until_interaction(self):
+        """test cached stats are reused and dropped when a like or follow commits"""
+        from django.test import override_settings
+        from .stats import get_stats
+        with override_settings(USER_STATS_CACHE_TIMEOUT=60):
+            self.assertEqual(get_stats(self.user.pk)['likes_received'], 3)
+            with self.assertNumQueries(0):
+                get_stats(self.user.pk)
+            other = User.objects.create_user(username='statsother', email='statsother@example.com', password='testpass123')
+            with self.captureOnCommitCallbacks(execute=True):
+                Like.objects.create(post=self.posts[1], user=other)
+            self.assertEqual(get_stats(self.user.pk)['likes_received'], 4)
+            with self.captureOnCommitCallbacks(execute=True):
+                Follow.objects.create(follower=self.user, following=other)
+            self.assertEqual(get_stats(self.user.pk)['following_count'], 1)
+            self.assertEqual(get_stats(other.pk)['followers_count'], 1)
+    
+    def test_public_stats_endpoint(self):
+        """test the public endpoint serves the same numbers"""
+        response = self.client.get(reverse('users:public-user-stats', kwargs={'username': 'statsowner'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_received'], 3)
+        self.assertEqual(response.data['comments_received'], 1)
+        response = self.client.get(reverse('users:public-user-stats', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StatelessJWTTests(APITestCase):
+    """test jwt requests are authenticated from token claims and revocation still applies"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='stateless', email='stateless@example.com', password='testpass123')
+        response = self.client.post(reverse('users:user-login'), {'username': 'stateless', 'password': 'testpass123'})
+        self.access, self.refresh = response.data['access'], response.data['refresh']
+    
+    def _authenticate(self, access):
+        from rest_framework.test import APIRequestFactory
+        from .authentication import StatelessJWTAuthentication
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        return StatelessJWTAuthentication().authenticate(request)[0]
+    
+    def test_user_comes_from_claims(self):
+        """test only the cached version stamp is read until a profile field is touched"""
+        from django.test import override_settings
+        with override_settings(TOKEN_VERSION_CACHE_TIMEOUT=60):
+            self._authenticate(self.access)
+            with self.assertNumQueries(0):
+                user = self._authenticate(self.access)
+                self.assertTrue(user and user.is_authenticated)
+                self.assertEqual((user.pk, user.username), (self.user.pk, 'stateless'))
+                self.assertIsInstance(user, User)
+                self.assertEqual(user, self.user)
+                post = Post(user=user, title='Claims', content='Body')
+                self.assertEqual(post.user_id, self.user.pk)
+            with self.assertNumQueries(1):
+                self.assertEqual(user.email, 'stateless@example.com')
+    
+    def test_revoked_and_inactive_tokens_rejected(self):
+        """test revoking tokens or deactivating the user rejects tokens already issued"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.revoke_tokens()
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        response = self.client.post(reverse('users:token-refresh'), {'refresh': self.refresh})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        response = self.client.post(reverse('users:user-login'), {'username': 'stateless', 'password': 'testpass123'})
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_password_change_revokes_tokens(self):
+        """test a saved new password bumps the stored version, even with update_fields"""
+        self.user.set_password('newpass456')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save(update_fields=['password'])
+        self.assertEqual(User.objects.get(pk=self.user.pk).token_version, 1)
+        self.assertEqual(self.user.token_version, 1)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_hash_upgrade_at_login_keeps_tokens_valid(self):
+        """test rehashing an outdated password hash at login does not revoke the new tokens"""
+        from django.contrib.auth.hashers import make_password
+        from django.test import override_settings
+        hashers = ['django.contrib.auth.hashers.PBKDF2PasswordHasher', 'django.contrib.auth.hashers.MD5PasswordHasher']
+        with override_settings(PASSWORD_HASHERS=hashers):
+            User.objects.filter(pk=self.user.pk).update(password=make_password('testpass123', hasher='md5'))
+            response = self.client.post(reverse('users:user-login'), {'username': 'stateless', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stored = User.objects.get(pk=self.user.pk)
+        self.assertTrue(stored.password.startswith('pbkdf2_'))
+        self.assertEqual(stored.token_version, 0)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.data["access"]}')
+        self.assertEqual(self.client.get(reverse('users:user-stats')).status_code, status.HTTP_200_OK)
+    
+    def test_tokens_without_claims_still_accepted(self):
+        """test tokens issued before the version claim fall back to loading the user"""
+        from rest_framework_simplejwt.tokens import RefreshToken
+        access = RefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(1):
+            user = self._authenticate(str(access))
+        self.assertEqual(type(user), User)
+
+
+class FollowSuggestionTests(APITestCase):
+    """test friend-of-friend suggestions from the in-memory follow graph"""
+    
+    def setUp(self):
+        from . import graph
+        graph.reset()
+        self.addCleanup(graph.reset)
+        self.users = {
+            name: User.objects.create_user(username=f'graph{name}', email=f'graph{name}@example.com', password='testpass123')
+            for name in ('me', 'ana', 'bia', 'cid', 'dan', 'eva')
+        }
+        # me follows ana and bia; both follow cid, only bia follows dan, ana also follows me
+        for follower, following in (('me', 'ana'), ('me', 'bia'), ('ana', 'cid'), ('bia', 'cid'), ('bia', 'dan'), ('ana', 'me')):
+            Follow.objects.create(follower=self.users[follower], following=self.users[following])
+    
+    def _ids(self, *names):
+        return [self.users[name].pk for name in names]
+    
+    def test_ranked_by_mutual_count(self):
+        """test second-degree users rank by mutuals and known users are left out"""
+        from .graph import load
+        self.assertEqual(load().suggestions(self.users['me'].pk), list(zip(self._ids('cid', 'dan'), [2, 1])))
+        self.assertEqual(load().suggestions(self.users['me'].pk, limit=1), [(self.users['cid'].pk, 2)])
+        self.assertEqual(load().suggestions(self.users['eva'].pk), [])
+    
+    def test_graph_follows_and_unfollows_incrementally(self):
+        """test committed follows and unfollows change the loaded graph without a reload"""
+        from django.test import override_settings
+        from . import graph
+        with override_settings(FOLLOW_GRAPH_MAX_AGE=60, TIMELINE_FANOUT_MODE='sync'):
+            graph.get_graph()
+            with self.captureOnCommitCallbacks(execute=True):
+                Follow.objects.create(follower=self.users['ana'], following=self.users['eva'])
+                Follow.objects.filter(follower=self.users['bia'], following=self.users['cid']).delete()
+            with self.assertNumQueries(0):
+                suggested = graph.suggestions(self.users['me'].pk)
+            self.assertEqual(suggested, list(zip(self._ids('cid', 'dan', 'eva'), [1, 1, 1])))
+            
+            # folding the overlay into the arrays keeps the same answers
+            compacted = graph.get_graph().compacted()
+            self.assertEqual(compacted.suggestions(self.users['me'].pk), suggested)
+            self.assertEqual(sorted(compacted.follows(self.users['ana'].pk).tolist()), sorted(self._ids('cid', 'me', 'eva')))
+    
+    def test_reload_runs_once_and_keeps_changes_made_during_it(self):
+        """test concurrent callers share one reload and follows committed during it are replayed"""
+        import threading
+        from unittest import mock
+        from django.test import override_settings
+        from . import graph
+        me, ana, eva = self._ids('me', 'ana', 'eva')
+        started, release, loads = threading.Event(), threading.Event(), []
+        
+        def slow_load():
+            loads.append(1)
+            started.set()
+            release.wait(5)
+            return graph.FollowGraph.from_edges([me], [ana])
+        
+        with override_settings(FOLLOW_GRAPH_MAX_AGE=60), mock.patch.object(graph, 'load', slow_load):
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(graph.get_graph())) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            started.wait(5)
+            # committed after the load read the table
+            graph.follow(ana, eva)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len({id(result) for result in results}), 1)
+        self.assertEqual(results[0].suggestions(me), [(eva, 1)])
+    
+    def test_suggestions_endpoint(self):
+        """test the endpoint returns the ranked users with their mutual counts"""
+        token = Token.objects.create(user=self.users['me'])
+        url = reverse('users:follow-suggestions')
+        self.assertIn(self.client.get(url).status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(user['username'], user['mutual_count']) for user in response.data['data']], [('graphcid', 2), ('graphdan', 1)])
+        self.assertFalse(response.data['data'][0]['is_following'])
+        self.assertEqual(self.client.get(url, {'limit': 'many'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UsernameResolverTests(TestCase):
+    """test username-only requests resolve through the caches and create each user once"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from . import usernames
+        cache.clear()
+        usernames.clear_local()
+    
+    def test_created_once_then_cached(self):
+        """test the first request creates the user and later ones skip the database"""
+        from django.test import override_settings
+        from rest_framework.test import APIRequestFactory
+        from . import usernames
+        from .authentication import UsernameAuthentication
+        request = APIRequestFactory().get('/', HTTP_X_USERNAME='resolved')
+        with override_settings(USERNAME_CACHE_TIMEOUT=60):
+            self.assertIsNone(usernames.resolve_id('resolved'))
+            with self.captureOnCommitCallbacks(execute=True):
+                first = UsernameAuthentication().authenticate(request)[0]
+            with self.assertNumQueries(0):
+                second = UsernameAuthentication().authenticate(request)[0]
+                self.assertEqual((second.pk, second.username), (first.pk, 'resolved'))
+            usernames.clear_local()
+            with self.assertNumQueries(0):
+                # still in the shared cache
+                self.assertEqual(usernames.resolve_id('resolved'), first.pk)
+        self.assertEqual(User.objects.filter(username='resolved').count(), 1)
+    
+    def test_renamed_user_forgotten(self):
+        """test a renamed user no longer resolves from the old name"""
+        from django.test import override_settings
+        from . import usernames
+        with override_settings(USERNAME_CACHE_TIMEOUT=60):
+            user_id = usernames.get_or_create_id('oldname')
+            user = User.objects.get(pk=user_id)
+            user.username = 'newname'
+            user.save()
+            self.assertIsNone(usernames.resolve_id('oldname'))
+            self.assertEqual(usernames.get_or_create_id('newname'), user_id)
+    
+    def test_posts_api_reuses_resolved_user(self):
+        """test posts created by username share one user row"""
+        for title in ('First', 'Second'):
+            response = self.client.post('/careers/create/', {'username': 'poster', 'title': title, 'content': 'Body'})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(response.data['data']['username'], 'poster')
+        self.assertEqual(User.objects.filter(username='poster').count(), 1)
+        self.assertEqual(Post.objects.filter(user__username='poster').count(), 2)
+
+
+class AsyncProfileTests(TestCase):
+    """test the async profile endpoints answer like the drf views"""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncprofile', email='asyncprofile@example.com', password='testpass123')
+        self.fans = [
+            User.objects.create_user(username=f'fan{index}', email=f'fan{index}@example.com', password='testpass123')
+            for index in range(3)
+        ]
+        for fan in self.fans:
+            Follow.objects.create(follower=fan, following=self.user)
+        post = Post.objects.create(user=self.user, title='Post', content='Body')
+        Like.objects.create(post=post, user=self.fans[0])
+        Comment.objects.create(post=post, user=self.fans[1], content='Nice')
+    
+    async def test_profile_and_stats_match_sync_views(self):
+        """test the profile and stats bodies are identical"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        client = AsyncClient()
+        for sync_name, async_name in (('users:user-profile', 'users-async:user-profile'), ('users:public-user-stats', 'users-async:public-user-stats')):
+            url_kwargs = {'username': 'asyncprofile'}
+            expected = await sync_to_async(self.client.get)(reverse(sync_name, kwargs=url_kwargs))
+            actual = await client.get(reverse(async_name, kwargs=url_kwargs))
+            self.assertEqual(actual.status_code, 200)
+            self.assertEqual(actual.json(), expected.json())
+    
+    async def test_follower_lists_use_limit_offset(self):
+        """test the follower list pages like the drf list view"""
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncClient
+        url_kwargs = {'username': 'asyncprofile'}
+        params = {'limit': 2, 'offset': 1}
+        expected = await sync_to_async(self.client.get)(reverse('users:followers-list', kwargs=url_kwargs), params)
+        actual = await AsyncClient().get(reverse('users-async:followers-list', kwargs=url_kwargs), params)
+        expected, actual = expected.json(), actual.json()
+        self.assertEqual(actual['results'], expected['results'])
+        self.assertEqual(actual['count'], 3)
+        self.assertTrue(actual['previous'].endswith('/async/users/asyncprofile/followers/?limit=2'))
+        self.assertIsNone(actual['next'])
+        following = await AsyncClient().get(reverse('users-async:following-list', kwargs={'username': 'fan0'}))
+        self.assertEqual([user['username'] for user in following.json()['results']], ['asyncprofile'])
+    
+    async def test_unknown_user(self):
+        """test missing users return 404"""
+        from django.test import AsyncClient
+        response = await AsyncClient().get(reverse('users-async:user-profile', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, 404)
+    
+    def test_user_named_async_keeps_their_routes(self):
+        """test the async routes do not shadow the profile routes of a user called async"""
+        from django.urls import resolve
+        User.objects.create_user(username='async', email='async@example.com', password='testpass123')
+        for name in ('user-profile', 'public-user-stats', 'followers-list', 'following-list'):
+            self.assertEqual(resolve(reverse(f'users:{name}', kwargs={'username': 'async'})).view_name, f'users:{name}')
+        self.assertEqual(self.client.get(reverse('users:public-user-stats', kwargs={'username': 'async'})).status_code, 200)
+
+
 class UserListTests(APITestCase):
     """test user list functionality"""
     
@@ -276,6 +609,32 @@ class UserListTests(APITestCase):
         self.assertEqual(response.data['count'], 0)
         self.assertEqual(len(response.data['results']), 0)
 
+    
+    def test_cursor_pages_follow_ordering(self):
+        """test keyset pages of the user list keep the requested ordering"""
+        url = reverse('users:user-list')
+        first = self.client.get(url, {'ordering': 'username', 'page_size': 2})
+        second = self.client.get(first.data['next'])
+        
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        usernames = [user['username'] for user in first.data['users'] + second.data['users']]
+        self.assertEqual(usernames, ['alice', 'bob', 'charlie'])
+        self.assertIsNone(second.data['next'])
+    
+    def test_is_following_preloaded_for_page(self):
+        """test is_following flags come from one follow query per page"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        Follow.objects.create(follower=self.user1, following=self.user2)
+        self.client.force_authenticate(user=self.user1)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('users:user-list'))
+        
+        following = {user['username']: user['is_following'] for user in response.data['users']}
+        self.assertEqual(following, {'alice': False, 'bob': True, 'charlie': False})
+        follow_queries = [q for q in queries if 'users_follow' in q['sql']]
+        self.assertEqual(len(follow_queries), 1)
 
 class FollowTests(APITestCase):
     """test follow/unfollow functionality"""
@@ -17,6 +17,7 @@ urlpatterns = [
     path('me/', views.UserDetailView.as_view(), name='user-detail'),
     path('me/update/', views.UserUpdateView.as_view(), name='user-update'),
     path('me/stats/', views.user_stats, name='user-stats'),
+    path('me/suggestions/', views.follow_suggestions, name='follow-suggestions'),
     
     # follow/unfollow endpoints
     path('follow/', views.FollowCreateView.as_view(), name='follow-create'),
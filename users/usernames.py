@@ -0,0 +1,145 @@
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+
+from .models import User
+
+
+# username -> user id resolution for the username-only mode (X-Username, Authorization: Username,
+# ?username=, and the "username" field of the posts api)
+# lookups go through an in-process LRU, then the shared default cache, then one indexed SELECT;
+# unknown usernames are created through get_or_create_id, the only place that inserts them
+
+CACHE_PREFIX = 'username:'
+REVERSE_PREFIX = 'username-of:'
+_CREATION_LOCK_STRIPES = 64
+
+
+class _LRU:
+    """
+    thread-safe LRU of username -> (user id, expiry)
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return user_id
+
+    def set(self, username, user_id, timeout):
+        with self._lock:
+            self._entries[username] = (user_id, time.monotonic() + timeout)
+            self._entries.move_to_end(username)
+            while len(self._entries) > settings.USERNAME_LRU_SIZE:
+                self._entries.popitem(last=False)
+
+    def discard(self, *usernames):
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_local = _LRU()
+_creation_locks = [threading.Lock() for _ in range(_CREATION_LOCK_STRIPES)]
+
+
+def _remember(username, user_id):
+    timeout = settings.USERNAME_CACHE_TIMEOUT
+    if timeout:
+        _local.set(username, user_id, timeout)
+        cache.set_many({CACHE_PREFIX + username: user_id, f'{REVERSE_PREFIX}{user_id}': username}, timeout)
+
+
+def _cached_id(username):
+    timeout = settings.USERNAME_CACHE_TIMEOUT
+    if not timeout:
+        return None
+    user_id = _local.get(username)
+    if user_id is None:
+        user_id = cache.get(CACHE_PREFIX + username)
+        if user_id is not None:
+            _local.set(username, user_id, timeout)
+    return user_id
+
+
+def _stored_id(username):
+    return User.objects.filter(username=username).values_list('pk', flat=True).first()
+
+
+def resolve_id(username):
+    """user id for a username, None when no such user exists"""
+    user_id = _cached_id(username)
+    if user_id is None:
+        user_id = _stored_id(username)
+        if user_id is not None:
+            _remember(username, user_id)
+    return user_id
+
+
+def get_or_create_id(username):
+    """
+    user id for a username, creating the user on first use
+    threads of this process creating the same name wait on one lock; other processes
+    racing on the unique index lose with an IntegrityError and read the winner's row
+    """
+    user_id = _cached_id(username)
+    if user_id is not None:
+        return user_id
+    with _creation_locks[zlib.crc32(username.encode()) % _CREATION_LOCK_STRIPES]:
+        user_id = _stored_id(username)
+        if user_id is None:
+            try:
+                with transaction.atomic():
+                    user_id = User.objects.create(username=username, email=f'{username}@example.com').pk
+            except IntegrityError:
+                user_id = _stored_id(username)
+                if user_id is None:
+                    # the conflict was not on the username (e.g. the email is taken)
+                    raise
+            else:
+                # an outer transaction may still roll the new row back
+                transaction.on_commit(lambda: _remember(username, user_id))
+                return user_id
+    _remember(username, user_id)
+    return user_id
+
+
+def get_or_create_user(username):
+    """
+    user for a username, creating it on first use; only id and username are known
+    until another field is read, so assigning it to a foreign key costs no query
+    """
+    from .authentication import TokenUser
+    return TokenUser(get_or_create_id(username), username)
+
+
+def forget(user_id, *usernames):
+    """drop cached entries of a user (renamed or deleted)"""
+    reverse_key = f'{REVERSE_PREFIX}{user_id}'
+    usernames = {*usernames, cache.get(reverse_key)} - {None}
+    _local.discard(*usernames)
+    cache.delete_many([reverse_key, *[CACHE_PREFIX + username for username in usernames]])
+
+
+def clear_local():
+    """empty the in-process LRU (benchmarks and tests)"""
+    _local.clear()
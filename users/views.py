@@ -1,17 +1,26 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate, login
 from django.db.models import Q
-from django.db import models
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from django.conf import settings
 from django_filters import rest_framework as django_filters
 from datetime import datetime, timedelta
 
+from socialhubapi.pagination import KeysetPaginator
+from socialhubapi import search
+from socialhubapi.response_cache import cache_anonymous_response, conditional_response
+from socialhubapi.throttling import bucket
+from socialhubapi.viewer import viewer_context
+
+from . import graph as follow_graph
+from . import stats as profile_stats
+from .authentication import TOKEN_VERSION_CLAIM, current_token_version, issue_tokens
 from .models import User, Follow
 from .serializers import (
     UserRegistrationSerializer,
@@ -44,8 +53,7 @@ class UserRegistrationView(generics.CreateAPIView):
         user = serializer.save()
         
         # return token
-        from rest_framework_simplejwt.tokens import RefreshToken
-        refresh = RefreshToken.for_user(user)
+        refresh = issue_tokens(user)
         return Response({
             'user': UserDetailSerializer(user).data,
             'access': str(refresh.access_token),
@@ -62,8 +70,7 @@ def user_login(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        from rest_framework_simplejwt.tokens import RefreshToken
-        refresh = RefreshToken.for_user(user)
+        refresh = issue_tokens(user)
         
         return Response({
             'user': UserDetailSerializer(user).data,
@@ -102,6 +109,9 @@ def token_refresh(request):
             return Response({'error': 'refresh token is required'}, status=status.HTTP_400_BAD_REQUEST)
         
         token = RefreshToken(refresh_token)
+        # a refresh token from before a revocation would only mint rejected access tokens
+        if TOKEN_VERSION_CLAIM in token and token[TOKEN_VERSION_CLAIM] != current_token_version(token['user_id']):
+            return Response({'error': 'invalid refresh token: token has been revoked'}, status=status.HTTP_400_BAD_REQUEST)
         return Response({
             'access': str(token.access_token),
         })
@@ -111,26 +121,20 @@ def token_refresh(request):
 
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
+@throttle_classes([bucket('search', methods=('GET',), param='search')])
 def user_list(request):
     """
     get /users/ - list users with optional batch system and filtering
-    parameters: batch_size (max users per batch), batch_number (batch number, default 0)
+    parameters: page_size + cursor (keyset pages), or legacy batch_size + batch_number (batch number, default 0)
     additional filters: search, first_name, last_name, ordering
     """
-    from django.db.models import Q
-    
     # get base queryset
     users = User.objects.all()
     
-    # apply search filter
+    # apply search filter (full-text index over username, names and bio)
     search_query = request.query_params.get('search', None)
     if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(bio__icontains=search_query)
-        )
+        users = search.filter_queryset(users, search_query)
     
     # apply name filters
     first_name = request.query_params.get('first_name', None)
@@ -143,51 +147,38 @@ def user_list(request):
     
     # apply ordering
     ordering = request.query_params.get('ordering', 'username')
-    if ordering in ['username', 'created_at', 'first_name', 'last_name']:
-        users = users.order_by(ordering)
-    else:
-        users = users.order_by('username')  # default ordering
-    
-    # get batch parameters
-    batch_size = request.query_params.get('batch_size', None)
-    batch_number = int(request.query_params.get('batch_number', 0))
+    if ordering not in ['username', 'created_at', 'first_name', 'last_name']:
+        ordering = 'username'  # default ordering
     
-    if batch_size:
-        # apply batch system
-        batch_size = int(batch_size)
-        start_index = max(0, batch_number * batch_size)  # prevent negative indexing
-        end_index = start_index + batch_size
-        
-        users_batch = users[start_index:end_index]
-        
-        # calculate total users for response info
-        total_users = users.count()
-        total_batches = (total_users + batch_size - 1) // batch_size if batch_size > 0 else 0  # ceiling division
-        
-        serializer = UserListSerializer(users_batch, many=True)
-        return Response({
-            'message': 'Users retrieved successfully',
-            'users': serializer.data,
-            'batch_info': {
-                'current_batch': batch_number,
-                'batch_size': batch_size,
-                'total_users': total_users,
-                'total_batches': total_batches,
-                'users_in_current_batch': len(serializer.data)
-            }
-        })
-    else:
-        # return all users without batching
-        serializer = UserListSerializer(users, many=True)
-        return Response({
-            'message': 'All users retrieved successfully',
-            'users': serializer.data,
-            'total_users': users.count()
-        })
+    # id breaks ties so keyset cursors always have a unique position
+    paginator = KeysetPaginator(request, ordering=(ordering, 'id'))
+    users_page = paginator.paginate_queryset(users)
+    if paginator.is_streaming:
+        return paginator.get_streaming_response(
+            'users', users_page,
+            lambda rows: UserListSerializer(rows, many=True, context=viewer_context(request, users=rows)).data,
+            'All users retrieved successfully',
+        )
+    serializer = UserListSerializer(users_page, many=True, context=viewer_context(request, users=users_page))
+    return paginator.get_response('users', serializer.data, 'Users retrieved successfully', 'All users retrieved successfully')
 
 
 
 
+class ViewerStateMixin:
+    """
+    preloads the viewer's follows for the page of users being serialized
+    """
+    
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            context = self.get_serializer_context()
+            context.update(viewer_context(self.request, users=args[0]))
+            kwargs['context'] = context
+        return super().get_serializer(*args, **kwargs)
+
+
+@method_decorator(conditional_response(tags=lambda request, username: [f'user-stats:{username}']), name='dispatch')
 class UserProfileView(generics.RetrieveAPIView):
     """
     view for retrieving user profile (public information)
@@ -220,7 +211,7 @@ class UserUpdateView(generics.UpdateAPIView):
         return self.request.user
 
 
-class FollowListView(generics.ListAPIView):
+class FollowListView(ViewerStateMixin, generics.ListAPIView):
     """
     view for listing users that the current user follows
     """
@@ -233,7 +224,7 @@ class FollowListView(generics.ListAPIView):
         return User.objects.filter(id__in=following_ids)
 
 
-class FollowersListView(generics.ListAPIView):
+class FollowersListView(ViewerStateMixin, generics.ListAPIView):
     """
     view for listing user's followers
     """
@@ -256,7 +247,7 @@ class FollowersListView(generics.ListAPIView):
         return User.objects.filter(id__in=follower_ids)
 
 
-class FollowingListView(generics.ListAPIView):
+class FollowingListView(ViewerStateMixin, generics.ListAPIView):
     """
     view for listing users that a user follows
     """
@@ -277,10 +268,12 @@ class FollowCreateView(generics.CreateAPIView):
     """
     serializer_class = FollowCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [bucket('follows')]
 
 
 @api_view(['DELETE'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([bucket('follows')])
 def unfollow_user(request, username):
     """
     view for unfollowing a user
@@ -303,44 +296,41 @@ def user_stats(request):
     """
     view for getting user statistics
     """
-    user = request.user
-    stats = {
-        'posts_count': user.posts_count,
-        'followers_count': user.followers_count,
-        'following_count': user.following_count,
-        'likes_received': user.posts.aggregate(
-            total_likes=models.Count('likes')
-        )['total_likes'] or 0,
-        'comments_received': user.posts.aggregate(
-            total_comments=models.Count('comments')
-        )['total_comments'] or 0,
-    }
+    stats = profile_stats.get_stats(request.user.pk)
     return Response(stats)
 
 
+@cache_anonymous_response(tags=lambda request, username: [f'user-stats:{username}'])
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def public_user_stats(request, username):
     """
     view for getting public user statistics (no authentication required)
     """
-    try:
-        user = User.objects.get(username=username)
-        stats = {
-            'posts_count': user.posts_count,
-            'followers_count': user.followers_count,
-            'following_count': user.following_count,
-            'likes_received': user.posts.aggregate(
-                total_likes=models.Count('likes')
-            )['total_likes'] or 0,
-            'comments_received': user.posts.aggregate(
-                total_comments=models.Count('comments')
-            )['total_comments'] or 0,
-        }
-        return Response(stats)
-    except User.DoesNotExist:
+    user = User.objects.filter(username=username).values('pk').first()
+    if user is None:
         return Response(
             {'error': 'User not found'}, 
             status=status.HTTP_404_NOT_FOUND
         )
+    return Response(profile_stats.get_stats(user['pk']))
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def follow_suggestions(request):
+    """
+    get /users/me/suggestions/ - users followed by the people you follow, most mutual follows first
+    parameters: limit (default 20, max 100)
+    """
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    mutuals = dict(follow_graph.suggestions(request.user.pk, limit))
+    users = User.objects.in_bulk(list(mutuals))
+    ranked = [users[user_id] for user_id in mutuals if user_id in users and users[user_id].is_active]
+    data = UserListSerializer(ranked, many=True, context=viewer_context(request, users=ranked)).data
+    for row in data:
+        row['mutual_count'] = mutuals[row['id']]
+    return Response({'message': 'Suggestions retrieved successfully', 'data': data})